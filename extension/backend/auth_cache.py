@@ -0,0 +1,82 @@
+"""
+In-process cache of verified Google access tokens, shared by the
+@require_auth (check_text.py) and @require_auth_and_paid_tier (check_media.py)
+decorators.
+
+Verifying a token costs a round trip to Google's userinfo endpoint plus a
+Cloud SQL lookup in get_or_create_user. Both results are stable for the life
+of the token, so the decorators keep the resulting user record here, keyed by
+a SHA-256 hash of the token (raw tokens are never stored).
+
+Entries are bounded (LRU eviction past AUTH_CACHE_MAX_ENTRIES) and expire a
+fixed AUTH_CACHE_TTL_SECONDS after verification. The token's own expiry is not
+looked up (that would be a second blocking call to Google on every miss), so
+the TTL is a staleness window: a token that expires or is revoked upstream is
+still accepted for up to AUTH_CACHE_TTL_SECONDS, and a cached user's tier is
+only re-read from the database once the entry expires. Keep the TTL short.
+"""
+import os
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+
+# --- Configuration ---
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "1024"))
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "300")) # 0 disables the cache; also the revocation staleness window
+
+
+class TokenCache:
+    """Thread-safe TTL + LRU map from access-token hash to a user record."""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict() # key -> (expires_at, user)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def hash_token(access_token: str) -> str:
+        return hashlib.sha256(access_token.encode("utf-8")).hexdigest()
+
+    def get(self, access_token: str) -> Optional[Dict[str, Any]]:
+        """Returns a copy of the cached user record, or None if absent or expired."""
+        if self.ttl_seconds <= 0:
+            return None
+        key = self.hash_token(access_token)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, user = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(user)
+
+    def put(self, access_token: str, user: Dict[str, Any]) -> None:
+        """Caches the user record of a just-verified token for ttl_seconds."""
+        if self.ttl_seconds <= 0:
+            return
+        key = self.hash_token(access_token)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, dict(user))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Shared instance used by the authentication decorators
+user_cache = TokenCache(AUTH_CACHE_MAX_ENTRIES, AUTH_CACHE_TTL_SECONDS)
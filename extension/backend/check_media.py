@@ -4,12 +4,15 @@ import json
 import traceback
 import base64
 import io
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait as futures_wait, FIRST_COMPLETED
 from functools import wraps
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Iterator
 
 import requests
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify, g
+from flask import Flask, request, jsonify, g, Response, stream_with_context
 from flask_cors import CORS
 
 # --- Google Cloud Platform Imports ---
@@ -17,12 +20,27 @@ from google.cloud import aiplatform
 from google.cloud import vision
 from google.cloud import speech_v1 as speech
 from google.cloud.sql.connector import Connector
+from vertexai.generative_models import Part
 import pg8000
 
 # --- Google Auth ---
 from google.oauth2 import id_token
 from google.auth.transport import requests as google_requests
 
+# --- Shared Backend Modules ---
+from auth_cache import user_cache
+from db_pool import ConnectionPool
+from single_flight import SingleFlight
+from image_ingest import IngestedImage, ImageIngestError, REASONS, IMAGE_MAX_REQUEST_BYTES, ingest_image
+from fingerprint import HammingIndex, to_signed64, from_signed64
+from model_registry import registry as model_registry
+from response_parsing import (
+    parse_model_json, ResponseParseError,
+    IMAGE_ANALYSIS_SCHEMA, VIDEO_ANALYSIS_SCHEMA, AUDIO_ANALYSIS_SCHEMA
+)
+import http_session
+import metrics
+
 # --- Load Environment Variables ---
 load_dotenv()
 logging.critical("--- check_media.py script started ---")
@@ -43,15 +61,43 @@ DB_PASSWORD = os.getenv("DB_PASSWORD", "password")
 
 # Database Constants
 USERS_TABLE = "users"
+IMAGE_RESULTS_TABLE = "image_results"
 DEFAULT_USER_TIER = "free"
 PAID_TIER = "paid"
 
 # API Constants
 API_TIMEOUT_SECONDS = 20
+IMAGE_ANALYSIS_DEADLINE_SECONDS = float(os.getenv("IMAGE_ANALYSIS_DEADLINE_SECONDS", "25")) # Shared by the Vision and Gemini branches
+MEDIA_EXECUTOR_MAX_WORKERS = int(os.getenv("MEDIA_EXECUTOR_MAX_WORKERS", "16")) # Threads for concurrent upstream calls
+
+# Image Result Cache Constants (perceptual hashes, see image_ingest.dhash)
+IMAGE_CACHE_TTL_SECONDS = int(os.getenv("IMAGE_CACHE_TTL_SECONDS", str(7 * 86400))) # 0 disables the cache
+IMAGE_HASH_MAX_DISTANCE = int(os.getenv("IMAGE_HASH_MAX_DISTANCE", "6")) # Max differing dHash bits of 64
+IMAGE_HASH_INDEX_MAX_ENTRIES = int(os.getenv("IMAGE_HASH_INDEX_MAX_ENTRIES", "100000"))
+IMAGE_HASH_INDEX_REFRESH_SECONDS = int(os.getenv("IMAGE_HASH_INDEX_REFRESH_SECONDS", "300")) # Picks up rows stored by other instances
+IMAGE_HASH_INDEX_REFRESH_OVERLAP_SECONDS = 60 # Re-reads recent rows whose transaction committed after a refresh
+
+# Provenance Verdict Constants (images media_triage answers from their XMP, see triage_verdict_result)
+PROVENANCE_AI_GENERATED_CONFIDENCE = 0.95 # XMP declares trainedAlgorithmicMedia (unsigned, but rarely added falsely)
+PROVENANCE_AI_EDITED_CONFIDENCE = 0.6 # XMP declares compositeWithTrainedAlgorithmicMedia: a real capture with generative edits
+
+# Batch Image Analysis Constants (/analyze_images)
+IMAGE_BATCH_MAX_ITEMS = int(os.getenv("IMAGE_BATCH_MAX_ITEMS", "50"))
+IMAGE_BATCH_DEADLINE_SECONDS = float(os.getenv("IMAGE_BATCH_DEADLINE_SECONDS", "60"))
+IMAGE_BATCH_GEMINI_CONCURRENCY = int(os.getenv("IMAGE_BATCH_GEMINI_CONCURRENCY", "4")) # Process-wide
+VISION_BATCH_MAX_IMAGES = 16 # batch_annotate_images limit
+VISION_BATCH_MAX_BYTES = IMAGE_MAX_REQUEST_BYTES # Keeps the base64-encoded request under Vision's 10 MB; ingest never returns a larger image
+
+# Vision features requested for an image, in one annotate_image call
+IMAGE_VISION_FEATURES = [
+    vision.Feature(type_=vision.Feature.Type.SAFE_SEARCH_DETECTION),
+    vision.Feature(type_=vision.Feature.Type.WEB_DETECTION),
+]
 
 # Gemini Model Configuration
-GEMINI_MODEL_NAME = "gemini-2.5-flash"  # For multi-modal analysis
-GEMINI_TEMPERATURE = 0.2
+# Per-endpoint models and generation settings live in model_registry.py
+# (GEMINI_MODEL, GEMINI_MODEL_IMAGE, GEMINI_MODEL_VIDEO, GEMINI_MODEL_AUDIO)
+MEDIA_ENDPOINTS = ["image", "video", "audio"]
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(message)s')
 logging.info("Logging configured with level DEBUG.")
@@ -67,63 +113,78 @@ CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True, method
 logging.info("Flask app created and CORS configured.")
 
 connector = None
+db_pool = None
+
+def create_cloud_sql_connection():
+    """Opens a new connection through the Cloud SQL Python Connector (used by the pool)."""
+    return connector.connect(
+        CLOUD_SQL_CONNECTION_NAME,
+        "pg8000",
+        user=DB_USER,
+        password=DB_PASSWORD,
+        db=DB_NAME
+    )
 
 def initialize_cloud_sql_connector():
-    """Initializes the Cloud SQL Python Connector."""
-    global connector
-    if connector is not None:
+    """Initializes the Cloud SQL Python Connector and the connection pool on top of it."""
+    global connector, db_pool
+    if connector is not None and db_pool is not None:
         logging.debug("Cloud SQL Connector already initialized.")
         return
-    logging.info(f"Initializing Cloud SQL Connector for {DB_NAME}...")
+    if connector is None:
+        logging.info(f"Initializing Cloud SQL Connector for {DB_NAME}...")
+        try:
+            connector = Connector()
+            logging.info("Cloud SQL Connector initialized successfully.")
+        except Exception as e:
+            logging.error(f"FATAL: Error initializing Cloud SQL Connector: {e}", exc_info=True)
+            connector = None
+            raise DatabaseError(f"Failed to initialize Cloud SQL Connector: {e}")
+    db_pool = ConnectionPool(create_cloud_sql_connection)
     try:
-        connector = Connector()
-        logging.info("Cloud SQL Connector initialized successfully.")
+        db_pool.prewarm()
+        logging.info(f"Cloud SQL connection pool ready: {db_pool.stats()}")
     except Exception as e:
-        logging.error(f"FATAL: Error initializing Cloud SQL Connector: {e}", exc_info=True)
-        connector = None
-        raise DatabaseError(f"Failed to initialize Cloud SQL Connector: {e}")
+        logging.error(f"Error prewarming Cloud SQL connection pool: {e}", exc_info=True)
 
 def get_db_connection():
-    """Gets a connection using the Cloud SQL Python Connector."""
-    if connector is None:
+    """Checks out a connection from the Cloud SQL connection pool."""
+    if db_pool is None:
         logging.error("Attempted to get DB connection, but connector is not initialized.")
         try:
             initialize_cloud_sql_connector()
         except DatabaseError:
              logging.error("Initialization of Cloud SQL Connector failed.")
              raise DatabaseError("Cloud SQL Connector is not available and initialization failed.")
-        if connector is None:
+        if db_pool is None:
              raise DatabaseError("Cloud SQL Connector is not available.")
     
     try:
-        logging.debug("Attempting to get Cloud SQL connection...")
-        conn = connector.connect(
-            CLOUD_SQL_CONNECTION_NAME,
-            "pg8000",
-            user=DB_USER,
-            password=DB_PASSWORD,
-            db=DB_NAME
-        )
+        logging.debug("Attempting to get Cloud SQL connection from pool...")
+        conn = db_pool.getconn()
         logging.debug(f"Successfully got Cloud SQL connection (ID: {id(conn)}).")
         return conn
     except Exception as e:
         logging.error(f"Error getting Cloud SQL connection: {e}", exc_info=True)
         raise DatabaseError(f"Failed to get Cloud SQL connection: {e}")
 
-def release_db_connection(conn):
-    """Closes a Cloud SQL connection."""
+def release_db_connection(conn, discard: bool = False):
+    """Returns a Cloud SQL connection to the pool (or closes it if `discard` is set)."""
     if conn:
         conn_id = id(conn)
         try:
-            logging.debug(f"Closing Cloud SQL connection (ID: {conn_id}).")
-            conn.close()
-            logging.debug(f"Connection (ID: {conn_id}) closed successfully.")
+            logging.debug(f"Releasing Cloud SQL connection (ID: {conn_id}).")
+            db_pool.putconn(conn, discard=discard)
         except Exception as e:
-            logging.error(f"Error closing connection (ID: {conn_id}): {e}", exc_info=True)
+            logging.error(f"Error releasing connection (ID: {conn_id}): {e}", exc_info=True)
 
 def close_cloud_sql_connector():
-    """Closes the Cloud SQL Connector."""
-    global connector
+    """Closes the connection pool and the Cloud SQL Connector."""
+    global connector, db_pool
+    if db_pool:
+        logging.info("Closing Cloud SQL connection pool.")
+        db_pool.close()
+        db_pool = None
     if connector:
         logging.info("Closing Cloud SQL Connector.")
         try:
@@ -159,15 +220,16 @@ def check_configuration():
     # Initialize Vertex AI
     aiplatform.init(project=GCP_PROJECT_ID, location=GCP_LOCATION)
     logging.info(f"Vertex AI initialized for project {GCP_PROJECT_ID} in {GCP_LOCATION}")
+    model_registry.warm(MEDIA_ENDPOINTS)
 
 def verify_google_access_token(access_token: str) -> Dict[str, Any]:
     logging.debug("Verifying Google access token...")
     userinfo_url = 'https://www.googleapis.com/oauth2/v1/userinfo?alt=json'
     try:
-        response = requests.get(
+        response = http_session.get(
+            "userinfo",
             userinfo_url,
-            headers={'Authorization': f'Bearer {access_token}'},
-            timeout=API_TIMEOUT_SECONDS
+            headers={'Authorization': f'Bearer {access_token}'}
         )
         response.raise_for_status()
         user_info = response.json()
@@ -266,23 +328,29 @@ def require_auth_and_paid_tier(f):
             return jsonify({"error": "Empty token provided"}), 401
 
         try:
-            user_info = verify_google_access_token(access_token)
-            google_id = user_info.get('sub')
-            email = user_info.get('email')
+            cached_user = user_cache.get(access_token)
+            if cached_user:
+                g.user = cached_user
+                logging.info(f"@{endpoint}: User authenticated from token cache. DB User ID: {g.user['id']}, Tier: {g.user['tier']}")
+            else:
+                user_info = verify_google_access_token(access_token)
+                google_id = user_info.get('sub')
+                email = user_info.get('email')
 
-            if not google_id:
-                 raise AuthenticationError("Verified token info missing user ID ('sub').")
+                if not google_id:
+                     raise AuthenticationError("Verified token info missing user ID ('sub').")
 
-            logging.info(f"@{endpoint}: Token verified for Google ID: {google_id}")
+                logging.info(f"@{endpoint}: Token verified for Google ID: {google_id}")
 
-            db_user = get_or_create_user(google_id=google_id, email=email)
-            g.user = {
-                "id": db_user.get('id'),
-                "tier": db_user.get('tier'),
-                "google_id": google_id,
-                "email": email
-            }
-            logging.info(f"@{endpoint}: User authenticated successfully. DB User ID: {g.user['id']}, Tier: {g.user['tier']}")
+                db_user = get_or_create_user(google_id=google_id, email=email)
+                g.user = {
+                    "id": db_user.get('id'),
+                    "tier": db_user.get('tier'),
+                    "google_id": google_id,
+                    "email": email
+                }
+                user_cache.put(access_token, g.user)
+                logging.info(f"@{endpoint}: User authenticated successfully. DB User ID: {g.user['id']}, Tier: {g.user['tier']}")
 
         except AuthenticationError as auth_err:
             logging.warning(f"@{endpoint}: Authentication failed (token verification or user lookup). Error: {auth_err}")
@@ -309,7 +377,6 @@ def require_auth_and_paid_tier(f):
 # --- GCP Vision and Gemini Helper Functions ---
 
 vision_client = None
-gemini_model = None
 
 def get_vision_client():
     """Lazily initializes and returns the Google Cloud Vision client."""
@@ -323,62 +390,54 @@ def get_vision_client():
             raise ConfigurationError(f"Failed to initialize Vision client: {e}")
     return vision_client
 
-def get_gemini_model():
-    """Lazily initializes and returns the Gemini multi-modal model."""
-    global gemini_model
-    if gemini_model is None:
-        try:
-            gemini_model = aiplatform.GenerativeModel(
-                GEMINI_MODEL_NAME,
-                generation_config={
-                    "temperature": GEMINI_TEMPERATURE,
-                    "top_p": 0.95,
-                    "top_k": 40,
-                    "max_output_tokens": 8192,
-                }
-            )
-            logging.info(f"Gemini multi-modal model '{GEMINI_MODEL_NAME}' initialized.")
-        except Exception as e:
-            logging.error(f"Error initializing Gemini model: {e}")
-            raise ConfigurationError(f"Failed to initialize Gemini model: {e}")
-    return gemini_model
+def get_gemini_model(endpoint: str):
+    """Returns the shared Gemini model handle for a media endpoint ("image", "video" or "audio")."""
+    try:
+        return model_registry.for_endpoint(endpoint)
+    except Exception as e:
+        logging.error(f"Error initializing Gemini model for '{endpoint}': {e}")
+        raise ConfigurationError(f"Failed to initialize Gemini model: {e}")
+
+def vision_result_from_response(response: Any) -> Dict[str, Any]:
+    """Converts an AnnotateImageResponse (SafeSearch + web detection) into the vision result dictionary."""
+    if response.error.message:
+        return {"status": "error", "error": f"Vision API error: {response.error.message}"}
+
+    safe_search = response.safe_search_annotation
+    web_detection = response.web_detection
+    return {
+        "status": "success",
+        "safe_search": {
+            "adult": safe_search.adult.name,
+            "medical": safe_search.medical.name,
+            "violence": safe_search.violence.name,
+            "racy": safe_search.racy.name,
+            "spoof": safe_search.spoof.name,
+        },
+        "web_detection": {
+            "full_matching_images": len(web_detection.full_matching_images) if web_detection.full_matching_images else 0,
+            "partial_matching_images": len(web_detection.partial_matching_images) if web_detection.partial_matching_images else 0,
+            "pages_with_matching_images": [page.url for page in (web_detection.pages_with_matching_images[:5] if web_detection.pages_with_matching_images else [])],
+            "visually_similar_images": len(web_detection.visually_similar_images) if web_detection.visually_similar_images else 0,
+        }
+    }
 
-def analyze_image_with_vision_api(image_url: str) -> Dict[str, Any]:
+def analyze_image_with_vision_api(image: IngestedImage, timeout: Optional[float] = None) -> Dict[str, Any]:
     """
     Analyzes an image using Google Cloud Vision API.
-    Returns SafeSearch annotations and web detection results.
+    Returns SafeSearch annotations and web detection results, requested together
+    in a single annotate_image call on the ingested image bytes.
     """
+    image_url = image.url
     logging.debug(f"Calling Cloud Vision API for image URL: {image_url}")
     
     try:
         client = get_vision_client()
-        image = vision.Image()
-        image.source.image_uri = image_url
-        
-        # Perform safe search detection
-        safe_search_response = client.safe_search_detection(image=image)
-        safe_search = safe_search_response.safe_search_annotation
-        
-        # Perform web detection
-        web_detection_response = client.web_detection(image=image)
-        web_detection = web_detection_response.web_detection
-        
-        result = {
-            "status": "success",
-            "safe_search": {
-                "adult": safe_search.adult.name,
-                "medical": safe_search.medical.name,
-                "violence": safe_search.violence.name,
-                "racy": safe_search.racy.name,
-                "spoof": safe_search.spoof.name,
-            },
-            "web_detection": {
-                "full_matching_images": len(web_detection.full_matching_images) if web_detection.full_matching_images else 0,
-                "partial_matching_images": len(web_detection.partial_matching_images) if web_detection.partial_matching_images else 0,
-                "pages_with_matching_images": [page.url for page in (web_detection.pages_with_matching_images[:5] if web_detection.pages_with_matching_images else [])],
-                "visually_similar_images": len(web_detection.visually_similar_images) if web_detection.visually_similar_images else 0,
-            }
-        }
+        response = client.annotate_image(
+            {"image": vision.Image(content=image.content), "features": IMAGE_VISION_FEATURES},
+            timeout=timeout
+        )
+        result = vision_result_from_response(response)
         
         logging.debug(f"Cloud Vision API analysis completed for {image_url}")
         return result
@@ -387,14 +446,17 @@ def analyze_image_with_vision_api(image_url: str) -> Dict[str, Any]:
         logging.error(f"Error calling Cloud Vision API for {image_url}: {e}", exc_info=True)
         return {"status": "error", "error": f"Vision API error: {str(e)}"}
 
-def analyze_image_with_gemini(image_url: str) -> Dict[str, Any]:
+def analyze_image_with_gemini(image: IngestedImage) -> Dict[str, Any]:
     """
     Analyzes an image using Gemini multi-modal to check for AI generation and context.
+    The ingested bytes are sent inline; formats Gemini cannot read inline (e.g. GIF
+    when Pillow is not installed) fall back to a URL-only prompt.
     """
+    image_url = image.url
     logging.debug(f"Calling Gemini multi-modal for image URL: {image_url}")
     
     try:
-        model = get_gemini_model()
+        model = get_gemini_model("image")
         
         prompt = f"""Analyze this image and determine:
 1. Is this image AI-generated or manipulated? Provide a confidence score (0.0-1.0).
@@ -413,41 +475,329 @@ Respond in JSON format:
 }}
 """
         
-        # For Vertex AI, we need to pass the image differently
-        # This is a simplified version - in production, you'd download and encode the image
-        response = model.generate_content(prompt)
+        if image.gemini_compatible:
+            response = model.generate_content([Part.from_data(data=image.content, mime_type=image.mime_type), prompt])
+        else:
+            logging.warning(f"{image.mime_type} cannot be sent to Gemini inline, analyzing {image_url} from its URL only")
+            response = model.generate_content(prompt)
         
         if hasattr(response, 'text') and response.text:
-            result_text = response.text.strip()
-            if result_text.startswith("```json"):
-                result_text = result_text.removeprefix("```json").removesuffix("```").strip()
-            elif result_text.startswith("```"):
-                result_text = result_text.removeprefix("```").removesuffix("```").strip()
-            
-            result = json.loads(result_text)
+            result = parse_model_json(IMAGE_ANALYSIS_SCHEMA, response.text)
             result["status"] = "success"
             logging.debug(f"Gemini multi-modal analysis completed for {image_url}")
             return result
         else:
             return {"status": "error", "error": "No response from Gemini model"}
             
-    except json.JSONDecodeError as e:
+    except ResponseParseError as e:
         logging.error(f"Error decoding Gemini response: {e}")
         return {"status": "error", "error": f"JSON decode error: {str(e)}"}
     except Exception as e:
         logging.error(f"Error calling Gemini multi-modal for {image_url}: {e}", exc_info=True)
         return {"status": "error", "error": f"Gemini API error: {str(e)}"}
 
+# --- Image Result Cache ---
+# Results are stored per perceptual hash in IMAGE_RESULTS_TABLE. The hashes of
+# fresh rows are kept in a HammingIndex (multi-index hashing, see fingerprint.py),
+# loaded lazily on first use and topped up every IMAGE_HASH_INDEX_REFRESH_SECONDS
+# with rows other instances stored, so near-duplicates are found without a table scan.
+
+image_hash_index = HammingIndex(IMAGE_HASH_MAX_DISTANCE, IMAGE_HASH_INDEX_MAX_ENTRIES)
+image_hash_index_loaded = False
+image_hash_index_newest = 0.0 # Epoch of the newest row loaded
+image_hash_index_refreshed_at = 0.0 # time.monotonic() of the last load attempt
+image_hash_index_lock = threading.Lock()
+
+def load_image_hash_index() -> None:
+    """
+    Fills image_hash_index from IMAGE_RESULTS_TABLE on first use, then reloads rows
+    stored since the last load at most every IMAGE_HASH_INDEX_REFRESH_SECONDS.
+    Raises DatabaseError only if the first load fails; a failed refresh keeps the
+    current index and is retried after the next interval.
+    """
+    global image_hash_index_loaded, image_hash_index_newest, image_hash_index_refreshed_at
+    if image_hash_index_loaded and time.monotonic() - image_hash_index_refreshed_at < IMAGE_HASH_INDEX_REFRESH_SECONDS:
+        return
+    # The first load blocks concurrent lookups; a refresh already running is not waited for
+    if not image_hash_index_lock.acquire(blocking=not image_hash_index_loaded):
+        return
+    try:
+        if image_hash_index_loaded and time.monotonic() - image_hash_index_refreshed_at < IMAGE_HASH_INDEX_REFRESH_SECONDS:
+            return
+        image_hash_index_refreshed_at = time.monotonic()
+        since = image_hash_index_newest - IMAGE_HASH_INDEX_REFRESH_OVERLAP_SECONDS if image_hash_index_loaded else 0.0
+        conn = None
+        cursor = None
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                SELECT phash, EXTRACT(EPOCH FROM timestamp) FROM {IMAGE_RESULTS_TABLE}
+                WHERE timestamp > NOW() - (%s * INTERVAL '1 second')
+                  AND timestamp > TO_TIMESTAMP(%s)
+                ORDER BY timestamp DESC
+                LIMIT %s;
+                """,
+                (IMAGE_CACHE_TTL_SECONDS, since, IMAGE_HASH_INDEX_MAX_ENTRIES)
+            )
+            rows = cursor.fetchall()
+        except Exception as e:
+            if image_hash_index_loaded:
+                logging.error(f"Image hash index refresh failed, keeping {len(image_hash_index)} entries: {e}")
+                return
+            if isinstance(e, DatabaseError):
+                raise
+            raise DatabaseError(f"DB error loading image hashes: {e}")
+        finally:
+            if cursor:
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+            if conn:
+                release_db_connection(conn)
+        for phash, stored_at in reversed(rows): # Oldest first, so the newest survive eviction
+            image_hash_index.add(from_signed64(int(phash)), from_signed64(int(phash)), added_at=float(stored_at))
+        if rows:
+            image_hash_index_newest = max(image_hash_index_newest, float(rows[0][1]))
+        logging.info(f"{'Refreshed' if image_hash_index_loaded else 'Loaded'} {len(rows)} image hashes.")
+        image_hash_index_loaded = True
+    finally:
+        image_hash_index_lock.release()
+
+def get_cached_image_result(image: IngestedImage) -> Optional[Dict[str, Any]]:
+    """
+    Returns the stored result of the same or a near-identical image (within
+    IMAGE_HASH_MAX_DISTANCE bits), adapted to image.url and marked "cached", or None.
+    """
+    if image.phash is None or IMAGE_CACHE_TTL_SECONDS <= 0:
+        return None
+    conn = None
+    cursor = None
+    try:
+        load_image_hash_index()
+        started = time.monotonic()
+        match = image_hash_index.nearest(image.phash, max_age_seconds=IMAGE_CACHE_TTL_SECONDS)
+        metrics.observe("image_cache.index_lookup_seconds", time.monotonic() - started)
+        if match is None:
+            metrics.increment("image_cache.misses")
+            return None
+        stored_hash, _, distance = match
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""
+            SELECT result_json, source_url FROM {IMAGE_RESULTS_TABLE}
+            WHERE phash = %s AND timestamp > NOW() - (%s * INTERVAL '1 second');
+            """,
+            (to_signed64(stored_hash), IMAGE_CACHE_TTL_SECONDS)
+        )
+        row = cursor.fetchone()
+    except Exception as e:
+        logging.error(f"Image result cache lookup failed for {image.url}: {e}")
+        return None
+    finally:
+        if cursor:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        if conn:
+            release_db_connection(conn)
+    if not row:
+        image_hash_index.remove(stored_hash)
+        metrics.increment("image_cache.misses")
+        return None
+
+    result = row[0] if isinstance(row[0], dict) else json.loads(row[0])
+    for media in result.get("manipulated_media", []):
+        media["url"] = image.url
+    result["cached"] = True
+    if row[1] != image.url:
+        result["near_duplicate_of"] = {"url": row[1], "distance": distance}
+    metrics.increment("image_cache.hits")
+    logging.info(f"Serving stored image result of '{row[1]}' for '{image.url}' ({distance} bits apart).")
+    return result
+
+def store_image_result(image: IngestedImage, result: Dict[str, Any]) -> None:
+    """Stores a successful image result under its perceptual hash (errors are logged, not raised)."""
+    if image.phash is None or IMAGE_CACHE_TTL_SECONDS <= 0 or result.get("status") != "success":
+        return
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""
+            INSERT INTO {IMAGE_RESULTS_TABLE} (phash, source_url, result_json, timestamp)
+            VALUES (%s, %s, %s, NOW())
+            ON CONFLICT (phash) DO UPDATE SET
+                source_url = EXCLUDED.source_url,
+                result_json = EXCLUDED.result_json,
+                timestamp = NOW();
+            """,
+            (to_signed64(image.phash), image.url, json.dumps(result))
+        )
+        conn.commit()
+        image_hash_index.add(image.phash, image.phash)
+    except Exception as e:
+        logging.error(f"Failed to store image result for {image.url}: {e}")
+        if conn:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+    finally:
+        if cursor:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        if conn:
+            release_db_connection(conn)
+
 # --- Analysis Logic ---
+
+media_executor = ThreadPoolExecutor(max_workers=MEDIA_EXECUTOR_MAX_WORKERS, thread_name_prefix="media-branch")
+
+def branch_result(future: Any, name: str, deadline: float) -> Dict[str, Any]:
+    """Returns a finished branch's result, or an error result if it missed the deadline."""
+    if future.done():
+        return future.result() # The helpers catch their own exceptions
+    future.cancel()
+    metrics.increment(f"image.branch_timeouts.{name.lower()}")
+    logging.warning(f"{name} branch did not finish within {deadline}s")
+    return {"status": "error", "error": f"Timeout calling {name} after {deadline}s"}
+
+def triage_verdict_result(image_url: str, triage: Any) -> Dict[str, Any]:
+    """
+    Builds the cheap verdict for an image that media_triage did not escalate
+    (no paid call was made). Images whose XMP declares AI generation are
+    reported as AI-generated, images declaring generative edits of a capture as
+    edited, and skipped images as not analyzed.
+    """
+    ai_generated = triage.decision == "provenance" and triage.reason == "ai_generated_metadata"
+    ai_edited = triage.decision == "provenance" and triage.reason == "ai_edited_metadata"
+    confidence = PROVENANCE_AI_GENERATED_CONFIDENCE if ai_generated else PROVENANCE_AI_EDITED_CONFIDENCE if ai_edited else 0.0
+    indicators = []
+    if ai_generated:
+        indicators = ["Provenance metadata declares AI generation"]
+    elif ai_edited:
+        indicators = ["Provenance metadata declares generative AI edits of a captured image"]
+    summaries = {
+        "ai_generated_metadata": "Detected as AI Generated: the image's XMP metadata (IPTC DigitalSourceType, not verified) declares it AI-generated.",
+        "ai_edited_metadata": "Edited with AI: the image's XMP metadata (IPTC DigitalSourceType, not verified) declares a captured image with generative AI edits.",
+        "c2pa_manifest": "Likely Authentic: the image carries a C2PA provenance manifest (signature not verified).",
+        "too_small": "Skipped: image is too small to be meaningful content (icon, avatar or tracking pixel).",
+        "extreme_aspect_ratio": "Skipped: image looks like a banner, divider or sprite.",
+        "low_entropy": "Skipped: small flat image, likely a logo or badge.",
+    }
+    metrics.increment(f"triage.{triage.decision}.{triage.reason}")
+    return {
+        "status": "success",
+        "images_analyzed": 1 if triage.decision == "provenance" else 0,
+        "manipulated_images_found": 1 if ai_generated or ai_edited else 0,
+        "manipulation_confidence": confidence,
+        "manipulated_media": [
+            {
+                "url": image_url,
+                "type": "image",
+                "description": "",
+                "ai_generated": PROVENANCE_AI_GENERATED_CONFIDENCE if ai_generated else None,
+                "ai_edited": ai_edited,
+                "manipulation_indicators": indicators,
+                "vision_api_result": None,
+                "manipulation_error": None
+            }
+        ],
+        "triage": triage.to_dict(),
+        "analysis_summary": summaries.get(triage.reason, f"Skipped by local triage ({triage.reason}).")
+    }
+
+def image_ingest_error_result(image_url: str, error: ImageIngestError) -> Dict[str, Any]:
+    """Builds the image result for an image that could not be ingested (no paid call was made)."""
+    return {
+        "status": "error",
+        "images_analyzed": 0,
+        "manipulated_images_found": 0,
+        "manipulation_confidence": 0.0,
+        "manipulated_media": [
+            {
+                "url": image_url,
+                "type": "image",
+                "description": "",
+                "ai_generated": None,
+                "manipulation_indicators": [],
+                "vision_api_result": None,
+                "manipulation_error": str(error)
+            }
+        ],
+        "ingest_error": error.reason,
+        "analysis_summary": f"Analysis failed. Error: {error}"
+    }
+
+def analyze_images_with_vision_batch(images: List[IngestedImage], timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Runs SafeSearch and web detection for up to VISION_BATCH_MAX_IMAGES images in one
+    batch_annotate_images call. Returns the vision result per image URL.
+    """
+    logging.debug(f"Calling Cloud Vision batch annotate for {len(images)} images")
+    try:
+        client = get_vision_client()
+        response = client.batch_annotate_images(
+            requests=[{"image": vision.Image(content=image.content), "features": IMAGE_VISION_FEATURES} for image in images],
+            timeout=timeout
+        )
+        metrics.increment("image_batch.vision_calls")
+        return {image.url: vision_result_from_response(annotation) for image, annotation in zip(images, response.responses)}
+    except Exception as e:
+        logging.error(f"Error calling Cloud Vision batch annotate for {len(images)} images: {e}", exc_info=True)
+        return {image.url: {"status": "error", "error": f"Vision API error: {str(e)}"} for image in images}
+
 def analyze_image_logic(image_url: str) -> Dict[str, Any]:
     """
     Analyzes an image using Google Cloud Vision API and Gemini multi-modal.
+    Images that local triage does not escalate get a cheap verdict instead, and
+    near-duplicates of stored images reuse the stored result.
+    Both branches run concurrently on the media executor under one shared deadline
+    (IMAGE_ANALYSIS_DEADLINE_SECONDS); a branch that misses it counts as failed.
     Returns a structured result compatible with the frontend.
     """
     logging.info(f"Starting GCP-based image analysis for: {image_url}")
 
-    vision_result = analyze_image_with_vision_api(image_url)
-    gemini_result = analyze_image_with_gemini(image_url)
+    # Download once; both branches get the same (possibly downscaled) bytes
+    try:
+        image = ingest_image(image_url)
+    except ImageIngestError as e:
+        logging.warning(f"Image ingestion failed for {image_url} ({e.reason}): {e}")
+        return image_ingest_error_result(image_url, e)
+
+    # Logos, pixels, sprites and provenance-declared images get a cheap local verdict
+    if image.triage is not None and image.triage.decision != "analyze":
+        logging.info(f"Local triage for {image_url}: {image.triage.decision} ({image.triage.reason})")
+        return triage_verdict_result(image_url, image.triage)
+
+    # Same or near-identical image analyzed before (other URL, size or encoding)
+    cached_result = get_cached_image_result(image)
+    if cached_result:
+        return cached_result
+
+    started = time.monotonic()
+    deadline = IMAGE_ANALYSIS_DEADLINE_SECONDS
+    vision_future = media_executor.submit(analyze_image_with_vision_api, image, deadline)
+    gemini_future = media_executor.submit(analyze_image_with_gemini, image)
+    futures_wait([vision_future, gemini_future], timeout=deadline)
+    vision_result = branch_result(vision_future, "Vision", deadline)
+    gemini_result = branch_result(gemini_future, "Gemini", deadline)
+    metrics.observe("image.branches_seconds", time.monotonic() - started)
+    result = combine_image_results(image_url, vision_result, gemini_result)
+    store_image_result(image, result)
+    return result
+
+def combine_image_results(image_url: str, vision_result: Dict[str, Any], gemini_result: Dict[str, Any]) -> Dict[str, Any]:
+    """Merges the Vision and Gemini branch results into the frontend's image result format."""
 
     ai_generated_prob = 0.0
     manipulation_confidence = 0.0
@@ -517,7 +867,8 @@ def analyze_image_logic(image_url: str) -> Dict[str, Any]:
                 "manipulation_error": manipulation_error
             }
         ],
-        "analysis_summary": analysis_summary
+        "analysis_summary": analysis_summary,
+        "cached": False
     }
 
     logging.info(f"Image analysis complete for {image_url}. Summary: {analysis_summary}")
@@ -538,7 +889,7 @@ def analyze_video_logic(video_url: str) -> Dict[str, Any]:
         # 3. Sample video frames
         # 4. Process with Speech-to-Text and Vision APIs
         
-        model = get_gemini_model()
+        model = get_gemini_model("video")
         
         prompt = f"""Analyze this video for potential misinformation or manipulation:
 
@@ -563,15 +914,9 @@ Respond in JSON format:
         response = model.generate_content(prompt)
         
         if hasattr(response, 'text') and response.text:
-            result_text = response.text.strip()
-            if result_text.startswith("```json"):
-                result_text = result_text.removeprefix("```json").removesuffix("```").strip()
-            elif result_text.startswith("```"):
-                result_text = result_text.removeprefix("```").removesuffix("```").strip()
-            
-            analysis = json.loads(result_text)
+            analysis = parse_model_json(VIDEO_ANALYSIS_SCHEMA, response.text)
             
-            manipulation_score = analysis.get("manipulation_score", 0.0)
+            manipulation_score = analysis["manipulation_score"]
             manipulated_found = 1 if manipulation_score >= 0.5 else 0
             
             result = {
@@ -605,7 +950,7 @@ Respond in JSON format:
                 "error": "Model did not provide a response"
             }
             
-    except json.JSONDecodeError as e:
+    except ResponseParseError as e:
         logging.error(f"Error decoding Gemini response for video {video_url}: {e}")
         return {
             "status": "error",
@@ -643,7 +988,7 @@ def analyze_audio_logic(audio_url: str) -> Dict[str, Any]:
         # 3. Use Speech-to-Text API for transcription
         # 4. Analyze transcription with Gemini
         
-        model = get_gemini_model()
+        model = get_gemini_model("audio")
         
         prompt = f"""Analyze this audio file for potential scam or deceptive content:
 
@@ -668,15 +1013,9 @@ Respond in JSON format:
         response = model.generate_content(prompt)
         
         if hasattr(response, 'text') and response.text:
-            result_text = response.text.strip()
-            if result_text.startswith("```json"):
-                result_text = result_text.removeprefix("```json").removesuffix("```").strip()
-            elif result_text.startswith("```"):
-                result_text = result_text.removeprefix("```").removesuffix("```").strip()
-            
-            analysis = json.loads(result_text)
+            analysis = parse_model_json(AUDIO_ANALYSIS_SCHEMA, response.text)
             
-            scam_score = analysis.get("scam_score", 0.0)
+            scam_score = analysis["scam_score"]
             manipulated_found = 1 if scam_score >= 0.5 else 0
             
             result = {
@@ -710,7 +1049,7 @@ Respond in JSON format:
                 "error": "Model did not provide a response"
             }
             
-    except json.JSONDecodeError as e:
+    except ResponseParseError as e:
         logging.error(f"Error decoding Gemini response for audio {audio_url}: {e}")
         return {
             "status": "error",
@@ -733,9 +1072,129 @@ Respond in JSON format:
             "error": str(e)
         }
 
+# --- Batch Image Analysis ---
+
+# Gemini calls for batches run here; the pool size is the process-wide concurrency limit
+image_batch_gemini_executor = ThreadPoolExecutor(max_workers=IMAGE_BATCH_GEMINI_CONCURRENCY, thread_name_prefix="batch-gemini")
+
+def image_batch_item(index: int, url: Any, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Wraps one image's result with its position in the batch and HTTP-equivalent status."""
+    return {"index": index, "url": url, "status": image_status_code(result), "result": result}
+
+def run_image_batch(image_urls: List[Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Analyzes a list of image URLs and yields one image_batch_item per URL, in
+    completion order:
+    - invalid URLs get an error result immediately; duplicates share one analysis;
+    - every image is ingested once (image_ingest.py) on the media executor;
+      images that local triage (media_triage.py) does not escalate, and images
+      with a stored result, are answered without any paid call;
+    - ingested images are packed into Vision batch_annotate_images calls of up to
+      VISION_BATCH_MAX_IMAGES images (and VISION_BATCH_MAX_BYTES);
+    - Gemini runs per image on image_batch_gemini_executor, which caps concurrent
+      calls at IMAGE_BATCH_GEMINI_CONCURRENCY across all batches;
+    - an image is reported as soon as both its branches are done. Branches still
+      running at IMAGE_BATCH_DEADLINE_SECONDS count as timed out.
+    """
+    started = time.monotonic()
+    deadline = started + IMAGE_BATCH_DEADLINE_SECONDS
+    groups: Dict[str, List[int]] = {}
+    for index, image_url in enumerate(image_urls):
+        if not isinstance(image_url, str) or not image_url.startswith(('http://', 'https://')):
+            error = ImageIngestError("invalid_url", REASONS["invalid_url"])
+            yield image_batch_item(index, image_url, image_ingest_error_result(image_url, error))
+            continue
+        groups.setdefault(image_url, []).append(index)
+    metrics.increment("image_batch.items", len(image_urls))
+
+    pending: Dict[Any, Any] = {} # future -> ("ingest", url) | ("vision", [urls]) | ("gemini", url)
+    for image_url in groups:
+        pending[media_executor.submit(ingest_image, image_url)] = ("ingest", image_url)
+    vision_results: Dict[str, Dict[str, Any]] = {}
+    gemini_results: Dict[str, Dict[str, Any]] = {}
+    vision_chunk: List[IngestedImage] = []
+    ingested: Dict[str, IngestedImage] = {} # Images being analyzed, for storing their results
+
+    def flush_vision_chunk():
+        if vision_chunk:
+            timeout = max(deadline - time.monotonic(), 1)
+            pending[media_executor.submit(analyze_images_with_vision_batch, list(vision_chunk), timeout)] = ("vision", [image.url for image in vision_chunk])
+            vision_chunk.clear()
+
+    def finished(image_url: str) -> Iterator[Dict[str, Any]]:
+        if image_url in vision_results and image_url in gemini_results:
+            result = combine_image_results(image_url, vision_results.pop(image_url), gemini_results.pop(image_url))
+            if image_url in ingested:
+                store_image_result(ingested.pop(image_url), result)
+            for index in groups[image_url]:
+                yield image_batch_item(index, image_url, result)
+
+    while pending:
+        done, _ = futures_wait(pending, timeout=max(deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+        if not done: # Deadline passed: report whatever is still outstanding as timed out
+            outstanding: Dict[str, set] = {} # url -> branches without a result
+            for future, (kind, target) in pending.items():
+                future.cancel()
+                for image_url in (target if kind == "vision" else [target]):
+                    outstanding.setdefault(image_url, set()).update(("vision", "gemini") if kind == "ingest" else (kind,))
+            for image in vision_chunk:
+                outstanding.setdefault(image.url, set()).add("vision")
+            for image_url, branches in outstanding.items():
+                for branch in branches:
+                    name = "Vision" if branch == "vision" else "Gemini"
+                    (vision_results if branch == "vision" else gemini_results)[image_url] = {
+                        "status": "error", "error": f"Timeout calling {name} after {IMAGE_BATCH_DEADLINE_SECONDS}s"
+                    }
+                yield from finished(image_url)
+            metrics.increment("image_batch.deadline_exceeded")
+            break
+
+        for future in done:
+            kind, target = pending.pop(future)
+            if kind == "ingest":
+                try:
+                    image = future.result()
+                except ImageIngestError as e:
+                    logging.warning(f"Image ingestion failed for {target} ({e.reason}): {e}")
+                    for index in groups[target]:
+                        yield image_batch_item(index, target, image_ingest_error_result(target, e))
+                    continue
+                if image.triage is not None and image.triage.decision != "analyze":
+                    result = triage_verdict_result(target, image.triage)
+                    for index in groups[target]:
+                        yield image_batch_item(index, target, result)
+                    continue
+                cached_result = get_cached_image_result(image)
+                if cached_result:
+                    for index in groups[target]:
+                        yield image_batch_item(index, target, cached_result)
+                    continue
+                ingested[target] = image
+                pending[image_batch_gemini_executor.submit(analyze_image_with_gemini, image)] = ("gemini", target)
+                if vision_chunk and (len(vision_chunk) >= VISION_BATCH_MAX_IMAGES or
+                                     sum(len(queued.content) for queued in vision_chunk) + len(image.content) > VISION_BATCH_MAX_BYTES):
+                    flush_vision_chunk()
+                vision_chunk.append(image)
+            elif kind == "vision":
+                vision_results.update(future.result())
+                for image_url in target:
+                    yield from finished(image_url)
+            else:
+                gemini_results[target] = future.result()
+                yield from finished(target)
+
+        # Send a partial chunk once no more images are being downloaded
+        if not any(kind == "ingest" for kind, _ in pending.values()):
+            flush_vision_chunk()
+
+    metrics.observe("image_batch.seconds", time.monotonic() - started)
+
 # --- Flask Endpoints ---
 
+media_flight = SingleFlight("media") # Coalesces concurrent analyses of the same media URL
+
 @app.route('/analyze_image', methods=['OPTIONS'])
+@app.route('/analyze_images', methods=['OPTIONS'])
 @app.route('/analyze_video', methods=['OPTIONS'])
 @app.route('/analyze_audio', methods=['OPTIONS'])
 def handle_options():
@@ -744,6 +1203,22 @@ def handle_options():
     response.headers.add('Access-Control-Allow-Methods', 'GET,POST,OPTIONS')
     return response, 200
 
+def image_status_code(result: Dict[str, Any]) -> int:
+    """Maps an image analysis result to its HTTP status code."""
+    http_status = 200 if result.get("status") == "success" else 500
+    if result.get("ingest_error") in ("invalid_url", "blocked_url"):
+        http_status = 400
+    elif result.get("ingest_error") in ("too_large", "not_image"):
+        http_status = 422
+    elif result.get("ingest_error"):
+        http_status = 502
+    elif result.get("status") == "error" and result.get("manipulated_media", [{}])[0].get("manipulation_error"):
+        if "API returned HTTP error" in result["manipulated_media"][0]["manipulation_error"] or \
+           "Timeout calling" in result["manipulated_media"][0]["manipulation_error"] or \
+           "Network error calling" in result["manipulated_media"][0]["manipulation_error"]:
+            http_status = 502
+    return http_status
+
 @app.route('/analyze_image', methods=['POST'])
 @require_auth_and_paid_tier
 def handle_analyze_image():
@@ -769,14 +1244,9 @@ def handle_analyze_image():
     logging.info(f"@{endpoint}: Processing image analysis for URL: {media_url} by User ID: {user_id} (Tier: {user_tier})")
 
     try:
-        result = analyze_image_logic(media_url)
+        result, _ = media_flight.do(f"image:{media_url}", lambda: analyze_image_logic(media_url))
 
-        http_status = 200 if result.get("status") == "success" else 500
-        if result.get("status") == "error" and result.get("manipulated_media", [{}])[0].get("manipulation_error"):
-            if "API returned HTTP error" in result["manipulated_media"][0]["manipulation_error"] or \
-               "Timeout calling" in result["manipulated_media"][0]["manipulation_error"] or \
-               "Network error calling" in result["manipulated_media"][0]["manipulation_error"]:
-                http_status = 502
+        http_status = image_status_code(result)
 
         logging.info(f"@{endpoint}: Analysis finished for {media_url}. Returning HTTP status {http_status}.")
         return jsonify(result), http_status
@@ -793,6 +1263,50 @@ def handle_analyze_image():
             "error": "An unexpected server error occurred."
         }), 500
 
+@app.route('/analyze_images', methods=['POST'])
+@require_auth_and_paid_tier
+def handle_analyze_images():
+    """
+    Analyzes up to IMAGE_BATCH_MAX_ITEMS images with one authenticated request.
+    Payload: {"media_urls": [...]}.
+    Returns {"results": [...], "summary": {...}} with one entry per URL in request
+    order, or with ?stream=1 / Accept: application/x-ndjson one JSON line per image
+    in completion order. Each entry holds the URL's index, the url, the status code
+    /analyze_image would have returned and the image result.
+    """
+    endpoint = request.endpoint
+    user_id = g.user.get('id', 'Unknown') if hasattr(g, 'user') else 'Unknown'
+
+    if not request.is_json:
+        logging.warning(f"@{endpoint}: Request is not JSON")
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    data = request.get_json(silent=True)
+    media_urls = data.get('media_urls') if isinstance(data, dict) else None
+    if not isinstance(media_urls, list) or not media_urls:
+        logging.warning(f"@{endpoint}: Missing 'media_urls' list in JSON payload")
+        return jsonify({"error": "Missing 'media_urls' list in JSON payload"}), 400
+    if len(media_urls) > IMAGE_BATCH_MAX_ITEMS:
+        return jsonify({"error": f"Too many images: {len(media_urls)} (max {IMAGE_BATCH_MAX_ITEMS})"}), 400
+
+    logging.info(f"@{endpoint}: Processing batch image analysis of {len(media_urls)} URLs by User ID: {user_id}")
+
+    if request.args.get('stream') == '1' or 'application/x-ndjson' in request.headers.get('Accept', ''):
+        entries = run_image_batch(media_urls)
+        return Response(
+            stream_with_context(json.dumps(entry, default=str) + "\n" for entry in entries),
+            mimetype='application/x-ndjson',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+    results = sorted(run_image_batch(media_urls), key=lambda entry: entry["index"])
+    summary = {
+        "total": len(results),
+        "manipulated": sum(1 for entry in results if entry["result"].get("manipulated_images_found")),
+        "failed": sum(1 for entry in results if entry["status"] != 200),
+    }
+    return jsonify({"results": results, "summary": summary}), 200
+
 @app.route('/analyze_video', methods=['POST'])
 @require_auth_and_paid_tier
 def handle_analyze_video():
@@ -814,7 +1328,7 @@ def handle_analyze_video():
     logging.info(f"@{endpoint}: Processing video analysis for URL: {media_url} by User ID: {user_id} (Tier: {user_tier})")
 
     try:
-        result = analyze_video_logic(media_url)
+        result, _ = media_flight.do(f"video:{media_url}", lambda: analyze_video_logic(media_url))
         http_status = 200 if result.get("status") == "success" else 500
         logging.info(f"@{endpoint}: Analysis finished for {media_url}. Returning HTTP status {http_status}.")
         return jsonify(result), http_status
@@ -851,7 +1365,7 @@ def handle_analyze_audio():
     logging.info(f"@{endpoint}: Processing audio analysis for URL: {media_url} by User ID: {user_id} (Tier: {user_tier})")
 
     try:
-        result = analyze_audio_logic(media_url)
+        result, _ = media_flight.do(f"audio:{media_url}", lambda: analyze_audio_logic(media_url))
         http_status = 200 if result.get("status") == "success" else 500
         logging.info(f"@{endpoint}: Analysis finished for {media_url}. Returning HTTP status {http_status}.")
         return jsonify(result), http_status
@@ -888,6 +1402,11 @@ def index():
         "status": "running",
         "cloud_sql_connector_status": connector_status,
         "database_connection_status": db_status,
+        "db_pool": db_pool.stats() if db_pool else None,
+        "auth_cache": user_cache.stats(),
+        "models": model_registry.stats(),
+        "image_hash_index": {"entries": len(image_hash_index), "max_distance": IMAGE_HASH_MAX_DISTANCE},
+        "metrics": metrics.snapshot(),
         "gcp_project": GCP_PROJECT_ID,
         "location": GCP_LOCATION
     })
@@ -1,13 +1,18 @@
 import os
 import json
+import time
+import hashlib
+import threading
 import requests
 import logging
 import traceback
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, wait as futures_wait, FIRST_COMPLETED
+from collections import deque
 from urllib.parse import urlparse, quote
 from dotenv import load_dotenv # For .env file support
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any, Union # For improved type hinting
-from flask import Flask, request, jsonify, g # Added g for request context
+from typing import Optional, List, Dict, Any, Union, Iterator, Tuple # For improved type hinting
+from flask import Flask, request, jsonify, g, Response, stream_with_context # Added g for request context
 from flask_cors import CORS # Added for CORS support
 from functools import wraps # Added for decorators
 
@@ -36,6 +41,21 @@ import pg8000
 from google.oauth2 import id_token
 from google.auth.transport import requests as google_requests
 
+# --- Shared Backend Modules ---
+from auth_cache import user_cache
+from db_pool import ConnectionPool
+from domain_verdicts import DomainVerdictTable, candidate_domains
+from single_flight import SingleFlight
+from query_cache import QueryCache, MemoryLRUBackend, QUERY_CACHE_BACKEND, create_backend as create_query_cache_backend
+import lang_detect
+from prompt_cache import PromptPrefix, record_usage
+from response_parsing import parse_model_json, ResponseParseError, TEXT_RESULT_SCHEMA
+from text_prep import PreparedArticle, prepare_article
+from fingerprint import HammingIndex, simhash, normalize_words, to_signed64, from_signed64
+from model_registry import registry as model_registry
+import http_session
+import metrics
+
 # --- Load Environment Variables ---
 load_dotenv() # Load variables from .env file if it exists
 
@@ -72,14 +92,62 @@ VERDICT_NOT_FOUND = "not_found"
 
 # API Constants
 FACT_CHECK_API_URL = "https://factchecktools.googleapis.com/v1alpha1/claims:search"
+CUSTOM_SEARCH_API_URL = "https://www.googleapis.com/customsearch/v1"
+GOOGLE_USERINFO_URL = "https://www.googleapis.com/oauth2/v1/userinfo?alt=json"
 API_TIMEOUT_SECONDS = 15
 FACT_CHECK_CLAIM_LIMIT = 3 # Max claims to check per article
 FACT_CHECK_QUERY_SIZE_LIMIT = 500 # Max characters per claim query
+FACT_CHECK_DEADLINE_SECONDS = float(os.getenv("FACT_CHECK_DEADLINE_SECONDS", str(API_TIMEOUT_SECONDS))) # For the whole batch of claims
+FACT_CHECK_MAX_WORKERS = int(os.getenv("FACT_CHECK_MAX_WORKERS", "8"))
 GOOGLE_SEARCH_RESULT_LIMIT = 10
+SEARCH_QUERY_CHAR_LIMIT = 200 # Max characters of the headline used as search query
+
+# Query Result Cache Constants (see query_cache.py for the backend selection)
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", "21600")) # 6 hours
+FACT_CHECK_CACHE_TTL_SECONDS = int(os.getenv("FACT_CHECK_CACHE_TTL_SECONDS", "86400")) # 24 hours
+
+# Tool Fan-out Constants (pre-analysis evidence gathering)
+TOOL_EXECUTOR_MAX_WORKERS = int(os.getenv("TOOL_EXECUTOR_MAX_WORKERS", "12"))
+TOOL_DEADLINE_SECONDS = { # Per-tool deadline, measured from the start of the fan-out
+    "domain_verdict": float(os.getenv("DOMAIN_TOOL_DEADLINE_SECONDS", "5")),
+    "search_results": float(os.getenv("SEARCH_TOOL_DEADLINE_SECONDS", str(API_TIMEOUT_SECONDS))),
+    "fact_checks": float(os.getenv("FACT_CHECK_TOOL_DEADLINE_SECONDS", str(API_TIMEOUT_SECONDS))),
+}
 
 # Vertex AI / Gemini Constants
-GEMINI_MODEL_NAME = "gemini-2.5-flash" # Or "gemini-2.5-flash"
-GEMINI_TEMPERATURE = 0.2
+# Model names and generation settings live in model_registry.py (GEMINI_MODEL, GEMINI_MODEL_TEXT)
+
+# Analysis Result Cache Constants
+ANALYSIS_CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", "21600")) # 6 hours; 0 disables the cache
+
+# Language Detection Constants (see lang_detect.py)
+LANG_DETECT_MIN_CONFIDENCE = float(os.getenv("LANG_DETECT_MIN_CONFIDENCE", "0.5")) # Below this, ask the Translation API
+LANG_DETECT_CLOUD_SAMPLE_CHARS = 500
+LANG_DETECT_URL_CACHE_TTL_SECONDS = 86400
+LANG_DETECT_URL_CACHE_MAX_ENTRIES = 10000
+
+# Translation Constants
+# localized_summary key -> textResult field it is translated from. All of them go out in one request.
+LOCALIZED_SUMMARY_FIELDS = {
+    "reasoning": "reasoning",
+    "educational_insights": "educational_insights",
+}
+TRANSLATION_CACHE_TTL_SECONDS = 7 * 86400 # Reasoning boilerplate recurs across articles
+TRANSLATION_CACHE_MAX_ENTRIES = 20000
+TRANSLATION_TIMEOUT_SECONDS = 10 # How long a fresh result waits for its localized summary
+TRANSLATION_MAX_WORKERS = 4
+
+# Near-duplicate Reuse Constants (SimHash fingerprints, see fingerprint.py)
+NEAR_DUPLICATE_MAX_DISTANCE = int(os.getenv("NEAR_DUPLICATE_MAX_DISTANCE", "6")) # Max differing bits of 64; -1 disables reuse
+NEAR_DUPLICATE_MIN_WORDS = 80 # Shorter texts are always analyzed on their own
+FINGERPRINT_INDEX_MAX_ENTRIES = int(os.getenv("FINGERPRINT_INDEX_MAX_ENTRIES", "50000"))
+
+# Batch Analysis Constants (/analyze_batch)
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+BATCH_USER_CONCURRENCY = int(os.getenv("BATCH_USER_CONCURRENCY", "4")) # Concurrent analyses per user, across all their batches
+BATCH_EXECUTOR_MAX_WORKERS = int(os.getenv("BATCH_EXECUTOR_MAX_WORKERS", "16"))
+BATCH_SLOT_WAIT_SECONDS = float(os.getenv("BATCH_SLOT_WAIT_SECONDS", "60")) # Max wait for a free user slot before items are reported busy
+BATCH_BUSY_ERROR = "Too many concurrent batch analyses for this user, try again later."
 
 # --- Custom Exceptions ---
 class ConfigurationError(Exception):
@@ -100,10 +168,21 @@ class AuthenticationError(Exception): # <-- NEW
 
 # --- Cloud SQL Database Connection ---
 connector = None
+db_pool = None
+
+def create_cloud_sql_connection():
+    """Opens a new connection through the Cloud SQL Python Connector (used by the pool)."""
+    return connector.connect(
+        CLOUD_SQL_CONNECTION_NAME,
+        "pg8000",
+        user=DB_USER,
+        password=DB_PASSWORD,
+        db=DB_NAME
+    )
 
 def initialize_cloud_sql_connector():
-    """Initializes the Cloud SQL Python Connector."""
-    global connector
+    """Initializes the Cloud SQL Python Connector and the connection pool on top of it."""
+    global connector, db_pool
     if connector is None:
         logging.info("Initializing Cloud SQL Connector...")
         try:
@@ -113,40 +192,46 @@ def initialize_cloud_sql_connector():
             logging.error(f"Error initializing Cloud SQL Connector: {e}")
             connector = None
             raise DatabaseError(f"Failed to initialize Cloud SQL Connector: {e}")
+    if db_pool is None:
+        db_pool = ConnectionPool(create_cloud_sql_connection)
+        try:
+            db_pool.prewarm()
+            logging.info(f"Cloud SQL connection pool ready: {db_pool.stats()}")
+        except Exception as e:
+            # Connections are opened on demand if the database is not reachable yet
+            logging.error(f"Error prewarming Cloud SQL connection pool: {e}")
 
 def get_db_connection():
-    """Gets a connection using the Cloud SQL Python Connector."""
-    if connector is None:
+    """Checks out a connection from the Cloud SQL connection pool."""
+    if db_pool is None:
         initialize_cloud_sql_connector()
-        if connector is None:
+        if db_pool is None:
             raise DatabaseError("Cloud SQL Connector is not available.")
     
     try:
-        conn = connector.connect(
-            CLOUD_SQL_CONNECTION_NAME,
-            "pg8000",
-            user=DB_USER,
-            password=DB_PASSWORD,
-            db=DB_NAME
-        )
-        logging.debug("Successfully got Cloud SQL connection.")
+        conn = db_pool.getconn()
+        logging.debug("Successfully got Cloud SQL connection from pool.")
         return conn
     except Exception as e:
         logging.error(f"Error getting Cloud SQL connection: {e}")
         raise DatabaseError(f"Failed to get Cloud SQL connection: {e}")
 
-def release_db_connection(conn):
-    """Closes a Cloud SQL connection."""
+def release_db_connection(conn, discard: bool = False):
+    """Returns a Cloud SQL connection to the pool (or closes it if `discard` is set)."""
     if conn:
         try:
-            conn.close()
-            logging.debug("Successfully closed Cloud SQL connection.")
+            db_pool.putconn(conn, discard=discard)
+            logging.debug("Successfully released Cloud SQL connection.")
         except Exception as e:
-            logging.error(f"Error closing Cloud SQL connection: {e}")
+            logging.error(f"Error releasing Cloud SQL connection: {e}")
 
 def close_cloud_sql_connector():
-    """Closes the Cloud SQL Connector."""
-    global connector
+    """Closes the connection pool and the Cloud SQL Connector."""
+    global connector, db_pool
+    if db_pool:
+        logging.info("Closing Cloud SQL connection pool.")
+        db_pool.close()
+        db_pool = None
     if connector:
         logging.info("Closing Cloud SQL Connector.")
         try:
@@ -215,12 +300,11 @@ def verify_google_access_token(access_token: str) -> Dict[str, Any]:
         AuthenticationError: If the token is invalid, expired, or the request fails.
     """
     logging.debug("Verifying Google access token...")
-    userinfo_url = 'https://www.googleapis.com/oauth2/v1/userinfo?alt=json'
     try:
-        response = requests.get(
-            userinfo_url,
-            headers={'Authorization': f'Bearer {access_token}'},
-            timeout=API_TIMEOUT_SECONDS
+        response = http_session.get(
+            "userinfo",
+            GOOGLE_USERINFO_URL,
+            headers={'Authorization': f'Bearer {access_token}'}
         )
         response.raise_for_status() # Raises HTTPError for 4xx/5xx
         user_info = response.json()
@@ -337,6 +421,13 @@ def require_auth(f):
             return jsonify({"error": "Empty token provided"}), 401
 
         try:
+            # Step 0: Reuse a previously verified token if it is still cached
+            cached_user = user_cache.get(access_token)
+            if cached_user:
+                g.user = cached_user
+                logging.info(f"@{endpoint}: User authenticated from token cache. DB User ID: {g.user['id']}, Tier: {g.user['tier']}")
+                return f(*args, **kwargs)
+
             # Step 1: Verify Access Token via Google UserInfo
             user_info = verify_google_access_token(access_token)
             google_id = user_info.get('sub') # or user_info.get('id')
@@ -349,13 +440,14 @@ def require_auth(f):
             # Step 2: Get/Create User in DB
             db_user = get_or_create_user(google_id=google_id, email=email)
 
-            # Step 3: Store user info in request context 'g'
+            # Step 3: Store user info in request context 'g' and the token cache
             g.user = {
                 "id": db_user.get('id'),
                 "tier": db_user.get('tier'),
                 "google_id": google_id,
                 "email": email
             }
+            user_cache.put(access_token, g.user)
             logging.info(f"@{endpoint}: User authenticated successfully. DB User ID: {g.user['id']}, Tier: {g.user['tier']}")
 
             # Proceed to the actual route function
@@ -373,14 +465,31 @@ def require_auth(f):
 
     return decorated_function
 
+# --- External Query Result Cache ---
+# Shared by search_google_for_context and fact_check_single_claim
+query_cache = QueryCache(create_query_cache_backend(QUERY_CACHE_BACKEND, get_db_connection, release_db_connection))
+
+# --- In-memory Domain Verdicts ---
+# Loaded at startup and refreshed in the background (see domain_verdicts.py)
+domain_verdicts = DomainVerdictTable(
+    URL_VERDICTS_TABLE,
+    get_db_connection,
+    release_db_connection,
+    open_listen_connection=create_cloud_sql_connection
+)
+
+# --- Near-duplicate Index ---
+# SimHash fingerprints of recently stored results, keyed by URL with the content hash as payload
+fingerprint_index = HammingIndex(max(NEAR_DUPLICATE_MAX_DISTANCE, 0), FINGERPRINT_INDEX_MAX_ENTRIES)
+
 # --- Agent Tool Functions ---
 
 def check_database_for_url(url: str) -> str:
     """
-    Checks if a URL's domain is in the credibility database.
-    Connects to the PostgreSQL database via pool, extracts the domain from the URL,
-    and queries the URL_VERDICTS_TABLE for a matching domain.
-    Returns the verdict ('real', 'fake') or 'not_found'.
+    Checks if a URL's domain (or one of its parent domains) is in the credibility database.
+    Answers from the in-memory copy of URL_VERDICTS_TABLE once it is loaded; until then,
+    queries the table via pool for the domain and its parents.
+    Returns the verdict ('real', 'fake') of the most specific match or 'not_found'.
     Raises DatabaseError on connection or query issues.
     """
     logging.info(f"Tool Call: check_database_for_url(url='{url}')")
@@ -389,17 +498,25 @@ def check_database_for_url(url: str) -> str:
         logging.warning("Invalid URL or domain could not be extracted.")
         return "invalid_url" # Return specific string for invalid URL
 
+    if domain_verdicts.loaded:
+        verdict = domain_verdicts.lookup(domain) or VERDICT_NOT_FOUND
+        logging.info(f"Verdict for domain '{domain}' (in-memory): {verdict}")
+        return verdict
+
     conn = None
     cursor = None
     verdict = VERDICT_NOT_FOUND
     try:
+        candidates = candidate_domains(domain)
         conn = get_db_connection()
         cursor = conn.cursor()
-        cursor.execute(f"SELECT verdict FROM {URL_VERDICTS_TABLE} WHERE domain = %s", (domain,))
-        result = cursor.fetchone()
-        if result:
-            verdict = result[0] # Should be VERDICT_REAL or VERDICT_FAKE
-            logging.info(f"Verdict found for domain '{domain}': {verdict}")
+        cursor.execute(f"SELECT domain, verdict FROM {URL_VERDICTS_TABLE} WHERE domain = ANY(%s)", (candidates,))
+        found = {row[0]: row[1] for row in cursor.fetchall()}
+        for candidate in candidates: # Most specific match wins
+            if candidate in found:
+                verdict = found[candidate] # Should be VERDICT_REAL or VERDICT_FAKE
+                logging.info(f"Verdict found for domain '{domain}' (matched '{candidate}'): {verdict}")
+                break
         else:
             logging.info(f"No verdict found for domain '{domain}'.")
         return verdict
@@ -419,10 +536,34 @@ def check_database_for_url(url: str) -> str:
             release_db_connection(conn)
 
 
+def build_search_params(query: str) -> Dict[str, Any]:
+    """Custom Search API parameters for a query, biased towards Indian news sources."""
+    return {
+        "key": GOOGLE_CUSTOM_SEARCH_API_KEY,
+        "cx": GOOGLE_CUSTOM_SEARCH_ENGINE_ID,
+        "q": query,
+        "num": GOOGLE_SEARCH_RESULT_LIMIT,
+        "gl": "in",  # Geolocation: India
+        "lr": "lang_en|lang_hi",  # Language: English or Hindi
+    }
+
+
+def parse_search_results(data: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Converts a Custom Search API response into {title, link, snippet} dictionaries."""
+    results: List[Dict[str, str]] = []
+    for item in data.get("items", []):
+        title = str(item.get("title", ""))
+        link = str(item.get("link", ""))
+        snippet = str(item.get("snippet", ""))
+        results.append({"title": title, "link": link, "snippet": snippet})
+    return results
+
+
 def search_google_for_context(query: str) -> List[Dict[str, str]]:
     """
     Searches for corroborating news articles using Google Custom Search API.
     Prioritizes Indian news sources where possible.
+    Successful results are cached per normalized query for SEARCH_CACHE_TTL_SECONDS.
     Returns a list of {title, link, snippet} dictionaries.
     """
     logging.info(f"Tool Call: search_google_for_context(query='{query[:50]}...')")
@@ -430,31 +571,20 @@ def search_google_for_context(query: str) -> List[Dict[str, str]]:
     if not GOOGLE_CUSTOM_SEARCH_API_KEY or not GOOGLE_CUSTOM_SEARCH_ENGINE_ID:
         logging.warning("Google Custom Search API not configured. Skipping search.")
         return []
-    
-    endpoint = "https://www.googleapis.com/customsearch/v1"
-    params = {
-        "key": GOOGLE_CUSTOM_SEARCH_API_KEY,
-        "cx": GOOGLE_CUSTOM_SEARCH_ENGINE_ID,
-        "q": query,
-        "num": GOOGLE_SEARCH_RESULT_LIMIT,
-        "gl": "in",  # Geolocation: India
-        "lr": "lang_en|lang_hi",  # Language: English or Hindi
-    }
+
+    hit, cached_results = query_cache.get("search", query)
+    if hit:
+        logging.info(f"Returning {len(cached_results)} cached search results for query.")
+        return cached_results
     
     results: List[Dict[str, str]] = []
     try:
-        response = requests.get(endpoint, params=params, timeout=API_TIMEOUT_SECONDS)
+        response = http_session.get("custom_search", CUSTOM_SEARCH_API_URL, params=build_search_params(query))
         response.raise_for_status()
-        data = response.json()
-        
-        items = data.get("items", [])
-        for item in items:
-            title = str(item.get("title", ""))
-            link = str(item.get("link", ""))
-            snippet = str(item.get("snippet", ""))
-            results.append({"title": title, "link": link, "snippet": snippet})
+        results = parse_search_results(response.json())
             
         logging.info(f"Found {len(results)} search results for query.")
+        query_cache.set("search", query, results, SEARCH_CACHE_TTL_SECONDS)
     except requests.exceptions.RequestException as e:
         logging.error(f"Error querying Google Custom Search API for query '{query}': {e}")
     except Exception as e:
@@ -463,11 +593,71 @@ def search_google_for_context(query: str) -> List[Dict[str, str]]:
     return results
 
 
+# Executor shared by all concurrent fact-check requests (connections come from http_session)
+fact_check_executor = ThreadPoolExecutor(max_workers=FACT_CHECK_MAX_WORKERS, thread_name_prefix="fact-check")
+
+def parse_fact_check_response(data: Dict[str, Any], claim_text: str) -> Optional[Dict[str, str]]:
+    """Extracts the top claim review from a Fact Check Tools API response, or None."""
+    found_claims_data = data.get("claims", [])
+
+    if found_claims_data and isinstance(found_claims_data, list):
+        first_claim_data = found_claims_data[0]
+        if first_claim_data and isinstance(first_claim_data, dict):
+            review_list = first_claim_data.get("claimReview", [])
+            if review_list and isinstance(review_list, list):
+                review = review_list[0]
+                if review and isinstance(review, dict):
+                    publisher = review.get("publisher", {})
+                    publisher_name = "Unknown Source"
+                    if publisher and isinstance(publisher, dict):
+                        publisher_name = str(publisher.get("name", "Unknown Source"))
+
+                    return {
+                        "source": publisher_name,
+                        "title": str(review.get("title", first_claim_data.get("text", "N/A"))),
+                        "url": str(review.get("url", "#")),
+                        "claim": str(first_claim_data.get("text", claim_text)), # Original or API's version
+                        "review_rating": str(review.get("textualRating", "N/A"))
+                    }
+    return None
+
+
+def fact_check_single_claim(claim_text: str) -> Optional[Dict[str, str]]:
+    """
+    Looks up one claim with the Google Fact Check Tools API.
+    Answers (including "no review found") are cached per normalized claim for
+    FACT_CHECK_CACHE_TTL_SECONDS.
+    Returns the top fact-check result dictionary, or None if the claim has no review.
+    Raises requests/JSON exceptions to the caller.
+    """
+    truncated_claim = claim_text[:FACT_CHECK_QUERY_SIZE_LIMIT]
+    hit, cached_result = query_cache.get("fact_check", truncated_claim)
+    if hit:
+        logging.info(f"Using cached fact check for claim: '{truncated_claim[:100]}...'")
+        return cached_result
+
+    logging.info(f"Checking claim: '{truncated_claim[:100]}...'")
+    response = http_session.get(
+        "fact_check",
+        FACT_CHECK_API_URL,
+        params={"query": truncated_claim, "pageSize": 1, "languageCode": "en"},
+        headers={"X-Goog-Api-Key": GOOGLE_FACT_CHECK_API_KEY}
+    )
+    response.raise_for_status()
+    result = parse_fact_check_response(response.json(), claim_text)
+
+    query_cache.set("fact_check", truncated_claim, result, FACT_CHECK_CACHE_TTL_SECONDS)
+    return result
+
+
 def fact_check_claims(claims: List[str]) -> List[Dict[str, str]]:
     """
     Performs fact checks on a list of claims using the Google Fact Check Tools API.
-    Returns a list of fact-check result dictionaries.
-    Raises ApiError or ConfigurationError.
+    Claims are checked concurrently over the shared keep-alive session, bounded by one
+    overall FACT_CHECK_DEADLINE_SECONDS deadline for the whole batch.
+    Returns a list of fact-check result dictionaries; claims that fail or miss the
+    deadline are skipped, so partial results are returned.
+    Raises ApiError only if every claim failed, or ConfigurationError.
     """
     logging.info(f"Tool Call: fact_check_claims({len(claims)} claims)")
     if not GOOGLE_FACT_CHECK_API_KEY or GOOGLE_FACT_CHECK_API_KEY.startswith("YOUR_"):
@@ -476,73 +666,229 @@ def fact_check_claims(claims: List[str]) -> List[Dict[str, str]]:
     if not claims:
         return []
 
-    all_results = []
     claims_to_check = claims[:FACT_CHECK_CLAIM_LIMIT]
-    tool_errors = []
+    futures = [fact_check_executor.submit(fact_check_single_claim, claim_text) for claim_text in claims_to_check]
+    futures_wait(futures, timeout=FACT_CHECK_DEADLINE_SECONDS)
 
-    for claim_text in claims_to_check:
-         truncated_claim = claim_text[:FACT_CHECK_QUERY_SIZE_LIMIT]
-         logging.info(f"Checking claim: '{truncated_claim[:100]}...'")
-         try:
-             response = requests.get(
-                 FACT_CHECK_API_URL,
-                 params={"query": truncated_claim, "pageSize": 1, "languageCode": "en"},
-                 headers={"X-Goog-Api-Key": GOOGLE_FACT_CHECK_API_KEY},
-                 timeout=API_TIMEOUT_SECONDS
-             )
-             response.raise_for_status()
-             data = response.json()
-             found_claims_data = data.get("claims", [])
-
-             if found_claims_data and isinstance(found_claims_data, list):
-                 first_claim_data = found_claims_data[0]
-                 if first_claim_data and isinstance(first_claim_data, dict):
-                     review_list = first_claim_data.get("claimReview", [])
-                     if review_list and isinstance(review_list, list):
-                         review = review_list[0]
-                         if review and isinstance(review, dict):
-                             publisher = review.get("publisher", {})
-                             publisher_name = "Unknown Source"
-                             if publisher and isinstance(publisher, dict):
-                                 publisher_name = str(publisher.get("name", "Unknown Source"))
-
-                             all_results.append({
-                                 "source": publisher_name,
-                                 "title": str(review.get("title", first_claim_data.get("text", "N/A"))),
-                                 "url": str(review.get("url", "#")),
-                                 "claim": str(first_claim_data.get("text", claim_text)), # Original or API's version
-                                 "review_rating": str(review.get("textualRating", "N/A"))
-                             })
-         except requests.exceptions.Timeout:
-             err_msg = f"Timeout calling Fact Check API for claim: {truncated_claim}"
-             logging.error(err_msg)
-             tool_errors.append(err_msg)
-         except requests.exceptions.RequestException as e:
-             err_msg = f"Error calling Google Fact Check API: {e}"
-             logging.error(err_msg)
-             tool_errors.append(err_msg)
-         except json.JSONDecodeError as e:
-             err_msg = f"Error decoding Google Fact Check API response: {e}"
-             logging.error(err_msg)
-             tool_errors.append(err_msg)
-         except Exception as e:
-             err_msg = f"Unexpected error during fact check for claim '{truncated_claim}': {e}"
-             logging.error(err_msg)
-             tool_errors.append(err_msg)
+    all_results = []
+    tool_errors = []
+    for claim_text, future in zip(claims_to_check, futures): # Keep results in claim order
+        truncated_claim = claim_text[:FACT_CHECK_QUERY_SIZE_LIMIT]
+        if not future.done():
+            future.cancel()
+            err_msg = f"Timeout calling Fact Check API for claim: {truncated_claim}"
+            logging.error(err_msg)
+            tool_errors.append(err_msg)
+            continue
+        try:
+            result = future.result()
+            if result:
+                all_results.append(result)
+        except requests.exceptions.Timeout:
+            err_msg = f"Timeout calling Fact Check API for claim: {truncated_claim}"
+            logging.error(err_msg)
+            tool_errors.append(err_msg)
+        except requests.exceptions.RequestException as e:
+            err_msg = f"Error calling Google Fact Check API: {e}"
+            logging.error(err_msg)
+            tool_errors.append(err_msg)
+        except json.JSONDecodeError as e:
+            err_msg = f"Error decoding Google Fact Check API response: {e}"
+            logging.error(err_msg)
+            tool_errors.append(err_msg)
+        except Exception as e:
+            err_msg = f"Unexpected error during fact check for claim '{truncated_claim}': {e}"
+            logging.error(err_msg)
+            tool_errors.append(err_msg)
 
     if tool_errors:
         combined_error_msg = f"Fact check tool encountered errors: {'; '.join(tool_errors)}"
-        logging.error(combined_error_msg)
-        raise ApiError(combined_error_msg)
+        if len(tool_errors) == len(claims_to_check):
+            logging.error(combined_error_msg)
+            raise ApiError(combined_error_msg)
+        logging.warning(f"{combined_error_msg} (returning partial results)")
 
     logging.info(f"Found {len(all_results)} fact checks for {len(claims_to_check)} claims.")
     return all_results
 
 
-def update_analysis_results(url: str, analysis_result: Dict[str, Any]) -> None:
+# --- Pre-analysis Tool Fan-out ---
+
+tool_executor = ThreadPoolExecutor(max_workers=TOOL_EXECUTOR_MAX_WORKERS, thread_name_prefix="agent-tool")
+
+def submit_tool_calls(url: str, article: PreparedArticle) -> Dict[str, Any]:
+    """
+    Starts check_database_for_url, search_google_for_context (with the headline) and
+    fact_check_claims (with the article's most claim-dense sentences) concurrently
+    on the bounded tool executor.
+    Returns a dictionary with the start time ('started') and a future per tool ('futures').
+    """
+    return {
+        "started": time.monotonic(),
+        "futures": {
+            "domain_verdict": tool_executor.submit(check_database_for_url, url),
+            "search_results": tool_executor.submit(search_google_for_context, article.search_query[:SEARCH_QUERY_CHAR_LIMIT]),
+            "fact_checks": tool_executor.submit(fact_check_claims, article.claims),
+        },
+    }
+
+
+def collect_tool_result(tool_calls: Dict[str, Any], name: str) -> Any:
+    """
+    Waits for one tool started by submit_tool_calls until its deadline from
+    TOOL_DEADLINE_SECONDS (measured from the start of the fan-out).
+    A tool that failed or missed its deadline is reported as {"error": "..."}.
+    """
+    future = tool_calls["futures"][name]
+    remaining = max(0.0, tool_calls["started"] + TOOL_DEADLINE_SECONDS[name] - time.monotonic())
+    try:
+        return future.result(timeout=remaining)
+    except FuturesTimeoutError:
+        future.cancel()
+        logging.warning(f"Tool '{name}' missed its {TOOL_DEADLINE_SECONDS[name]:g}s deadline.")
+        metrics.increment(f"tools.{name}.timeouts")
+        return {"error": f"Timed out after {TOOL_DEADLINE_SECONDS[name]:g}s"}
+    except (ApiError, DatabaseError, ConfigurationError) as e:
+        logging.error(f"Tool '{name}' failed: {e}")
+        metrics.increment(f"tools.{name}.errors")
+        return {"error": str(e)}
+    except Exception as e:
+        logging.error(f"Unexpected error in tool '{name}': {e}", exc_info=True)
+        metrics.increment(f"tools.{name}.errors")
+        return {"error": f"Unexpected error: {e}"}
+
+
+def gather_tool_evidence(url: str, article: PreparedArticle) -> Dict[str, Any]:
+    """
+    Runs the agent tools concurrently before the Gemini call. Each tool gets its
+    own deadline, so the stage takes as long as the slowest tool rather than the
+    sum of all three.
+
+    Returns a dictionary with 'domain_verdict', 'search_results' and 'fact_checks'.
+    """
+    tool_calls = submit_tool_calls(url, article)
+    evidence = {name: collect_tool_result(tool_calls, name) for name in tool_calls["futures"]}
+    metrics.observe("tools.fanout_seconds", time.monotonic() - tool_calls["started"])
+    return evidence
+
+
+def compute_content_hash(article_text: str) -> str:
+    """
+    Returns a SHA-256 hex digest of the article text with whitespace collapsed,
+    so re-scraped copies of the same article hash identically while edits do not.
+    """
+    normalized_text = " ".join(article_text.split())
+    return hashlib.sha256(normalized_text.encode("utf-8")).hexdigest()
+
+
+def get_cached_analysis_result(url: str, content_hash: str) -> Optional[Dict[str, Any]]:
+    """
+    Looks up a fresh analysis result for the URL in the ANALYSIS_RESULTS_TABLE.
+    A row is only returned if it is younger than ANALYSIS_CACHE_TTL_SECONDS and was
+    produced from article text with the same content hash.
+    Returns the stored result dictionary, or None on a cache miss.
+    Raises DatabaseError on connection or query issues.
+    """
+    if ANALYSIS_CACHE_TTL_SECONDS <= 0:
+        return None
+
+    logging.info(f"DB Call: get_cached_analysis_result(url='{url}')")
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""
+            SELECT result_json FROM {ANALYSIS_RESULTS_TABLE}
+            WHERE url = %s
+              AND content_hash = %s
+              AND timestamp > NOW() - (%s * INTERVAL '1 second');
+            """,
+            (url, content_hash, ANALYSIS_CACHE_TTL_SECONDS)
+        )
+        row = cursor.fetchone()
+        if not row:
+            logging.info(f"No fresh cached analysis for URL: {url}")
+            return None
+        cached_result = row[0]
+        if isinstance(cached_result, str): # JSONB is usually decoded by the driver already
+            cached_result = json.loads(cached_result)
+        if not isinstance(cached_result, dict) or "textResult" not in cached_result:
+            logging.warning(f"Ignoring malformed cached analysis for URL: {url}")
+            return None
+        logging.info(f"Cache hit for URL: {url}")
+        return cached_result
+    except DatabaseError as e:
+        logging.error(f"Database error reading cached analysis for '{url}': {e}")
+        raise DatabaseError(f"DB error reading cached result: {e}")
+    except Exception as e:
+        logging.error(f"Unexpected error reading cached analysis: {e}")
+        raise DatabaseError(f"Unexpected DB error: {e}")
+    finally:
+        if cursor:
+            try:
+                cursor.close()
+            except:
+                pass
+        if conn:
+            release_db_connection(conn)
+
+
+def get_cached_analysis_results(keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """
+    Bulk variant of get_cached_analysis_result for (url, content_hash) pairs, using
+    a single query. Returns a dict containing only the pairs with a fresh result.
+    Raises DatabaseError on connection or query issues.
+    """
+    if ANALYSIS_CACHE_TTL_SECONDS <= 0 or not keys:
+        return {}
+
+    logging.info(f"DB Call: get_cached_analysis_results({len(keys)} keys)")
+    wanted = set(keys)
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""
+            SELECT url, content_hash, result_json FROM {ANALYSIS_RESULTS_TABLE}
+            WHERE url = ANY(%s)
+              AND timestamp > NOW() - (%s * INTERVAL '1 second');
+            """,
+            (list({url for url, _ in keys}), ANALYSIS_CACHE_TTL_SECONDS)
+        )
+        cached_results = {}
+        for url, content_hash, result_json in cursor.fetchall():
+            if (url, content_hash) not in wanted:
+                continue
+            if isinstance(result_json, str):
+                result_json = json.loads(result_json)
+            if isinstance(result_json, dict) and "textResult" in result_json:
+                cached_results[(url, content_hash)] = result_json
+        logging.info(f"Cache hits for {len(cached_results)} of {len(wanted)} batch items.")
+        return cached_results
+    except Exception as e:
+        logging.error(f"Error reading cached analyses in bulk: {e}")
+        raise DatabaseError(f"DB error reading cached results: {e}")
+    finally:
+        if cursor:
+            try:
+                cursor.close()
+            except:
+                pass
+        if conn:
+            release_db_connection(conn)
+
+
+def update_analysis_results(url: str, analysis_result: Dict[str, Any], content_hash: Optional[str] = None,
+                            fingerprint: Optional[int] = None) -> None:
     """
     Stores the final analysis result in the ANALYSIS_RESULTS_TABLE PostgreSQL table.
-    Connects via pool and inserts/updates the result based on the URL.
+    Connects via pool and inserts/updates the result based on the URL, together with
+    the content hash of the analyzed text so the row can be served as a cache entry,
+    and the text's SimHash fingerprint (if any), which is also added to fingerprint_index.
     Raises DatabaseError on connection or query issues.
     """
     logging.info(f"DB Call: update_analysis_results(url='{url}')")
@@ -553,16 +899,21 @@ def update_analysis_results(url: str, analysis_result: Dict[str, Any]) -> None:
         cursor = conn.cursor()
         cursor.execute(
             f"""
-            INSERT INTO {ANALYSIS_RESULTS_TABLE} (url, result_json, timestamp)
-            VALUES (%s, %s, NOW())
+            INSERT INTO {ANALYSIS_RESULTS_TABLE} (url, result_json, content_hash, simhash, timestamp)
+            VALUES (%s, %s, %s, %s, NOW())
             ON CONFLICT (url) DO UPDATE SET
                 result_json = EXCLUDED.result_json,
+                content_hash = EXCLUDED.content_hash,
+                simhash = EXCLUDED.simhash,
                 timestamp = NOW();
             """,
-            (url, json.dumps(analysis_result))
+            (url, json.dumps(analysis_result), content_hash,
+             to_signed64(fingerprint) if fingerprint is not None else None)
         )
         conn.commit()  # Commit the transaction
         logging.info(f"Analysis result saved/updated for URL: {url}")
+        if fingerprint is not None:
+            fingerprint_index.add(url, fingerprint, content_hash)
     except DatabaseError as e:
         logging.error(f"Database error updating analysis results for '{url}': {e}")
         raise DatabaseError(f"DB error updating results: {e}")
@@ -582,10 +933,101 @@ def update_analysis_results(url: str, analysis_result: Dict[str, Any]) -> None:
             release_db_connection(conn)
 
 
+# --- Near-duplicate Reuse ---
+
+def load_fingerprint_index() -> int:
+    """
+    Fills fingerprint_index with the fingerprints of results younger than
+    ANALYSIS_CACHE_TTL_SECONDS (newest FINGERPRINT_INDEX_MAX_ENTRIES). Returns the count.
+    Raises DatabaseError on connection or query issues.
+    """
+    if NEAR_DUPLICATE_MAX_DISTANCE < 0 or ANALYSIS_CACHE_TTL_SECONDS <= 0:
+        return 0
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""
+            SELECT url, content_hash, simhash, EXTRACT(EPOCH FROM timestamp) FROM {ANALYSIS_RESULTS_TABLE}
+            WHERE simhash IS NOT NULL
+              AND timestamp > NOW() - (%s * INTERVAL '1 second')
+            ORDER BY timestamp DESC
+            LIMIT %s;
+            """,
+            (ANALYSIS_CACHE_TTL_SECONDS, FINGERPRINT_INDEX_MAX_ENTRIES)
+        )
+        rows = cursor.fetchall()
+    except Exception as e:
+        raise DatabaseError(f"DB error loading fingerprints: {e}")
+    finally:
+        if cursor:
+            try:
+                cursor.close()
+            except:
+                pass
+        if conn:
+            release_db_connection(conn)
+    for url, content_hash, fingerprint, stored_at in reversed(rows): # Oldest first, so the newest survive eviction
+        fingerprint_index.add(url, from_signed64(int(fingerprint)), content_hash, added_at=float(stored_at))
+    logging.info(f"Loaded {len(rows)} article fingerprints.")
+    return len(rows)
+
+
+def article_fingerprint(article_text: str) -> Optional[int]:
+    """Returns the SimHash of the article text, or None if it is too short to fingerprint reliably."""
+    if NEAR_DUPLICATE_MAX_DISTANCE < 0 or len(normalize_words(article_text)) < NEAR_DUPLICATE_MIN_WORDS:
+        return None
+    return simhash(article_text)
+
+
+def get_near_duplicate_result(url: str, fingerprint: Optional[int], content_hash: str) -> Optional[Dict[str, Any]]:
+    """
+    Reuses the stored verdict of a recently analyzed near-identical text under another URL
+    (e.g. a syndicated wire story). The source is only reused if both URLs get the same
+    domain verdict, since check_database_for_url weighs heavily in the analysis.
+    The reused result is stored under `url` and marked with "near_duplicate_of".
+    Returns None if there is no usable near-duplicate.
+    """
+    if fingerprint is None:
+        return None
+    match = fingerprint_index.nearest(fingerprint, max_age_seconds=ANALYSIS_CACHE_TTL_SECONDS, exclude=url)
+    if match is None:
+        metrics.increment("near_duplicate.misses")
+        return None
+    source_url, source_hash, distance = match
+
+    try:
+        if check_database_for_url(url) != check_database_for_url(source_url):
+            logging.info(f"Near-duplicate of '{source_url}' found for '{url}', but domain verdicts differ.")
+            metrics.increment("near_duplicate.domain_mismatches")
+            return None
+        result = get_cached_analysis_result(source_url, source_hash)
+    except DatabaseError as db_err:
+        logging.error(f"Failed to read near-duplicate analysis result: {db_err}")
+        return None
+    if not result:
+        fingerprint_index.remove(source_url)
+        return None
+
+    result["near_duplicate_of"] = {"url": source_url, "distance": distance}
+    logging.info(f"Reusing analysis of '{source_url}' for near-duplicate '{url}' ({distance} bits apart).")
+    metrics.increment("near_duplicate.hits")
+    try:
+        update_analysis_results(url, result, content_hash, fingerprint)
+    except DatabaseError as db_err:
+        logging.error(f"Failed to store reused analysis result in DB: {db_err}")
+    return serve_cached_result(result)
+
+
 # --- Translation Helper Functions ---
 
 translate_client = None
 
+# Offline detection first, Translation API only for low-confidence guesses (cached per URL)
+language_cache = MemoryLRUBackend(max_entries=LANG_DETECT_URL_CACHE_MAX_ENTRIES)
+
 def get_translate_client():
     """Lazily initializes and returns the Google Cloud Translation client."""
     global translate_client
@@ -600,57 +1042,112 @@ def get_translate_client():
             raise ConfigurationError(f"Failed to initialize Translation client: {e}")
     return translate_client
 
-def detect_language(text: str) -> str:
+def detect_language(text: str, url: Optional[str] = None) -> str:
     """
     Detects the language of the given text.
     Returns the language code (e.g., 'en', 'hi', 'es').
-    If Translation API is not available, defaults to English.
+    Uses the offline detector in lang_detect.py and only calls the Translation API
+    when its confidence is below LANG_DETECT_MIN_CONFIDENCE; those results are cached
+    per URL. If the API is not available, the offline guess is returned.
     """
+    language, confidence = lang_detect.detect(text)
+    if confidence >= LANG_DETECT_MIN_CONFIDENCE:
+        metrics.increment("lang_detect.local")
+        logging.info(f"Detected language: {language} (offline, confidence: {confidence:.2f})")
+        return language
+
+    if url:
+        hit, cached_language = language_cache.get(url)
+        if hit:
+            metrics.increment("lang_detect.url_cache_hits")
+            return cached_language
+
     try:
         client = get_translate_client()
-        result = client.detect_language(text)
-        language = result['language']
-        confidence = result.get('confidence', 0)
-        logging.info(f"Detected language: {language} (confidence: {confidence:.2f})")
-        return language
+        result = client.detect_language(text[:LANG_DETECT_CLOUD_SAMPLE_CHARS])
+        cloud_language = result['language']
+        logging.info(f"Detected language: {cloud_language} (Translation API, confidence: {result.get('confidence', 0):.2f}, offline guess: {language})")
+        metrics.increment("lang_detect.cloud")
+        if url:
+            language_cache.set(url, cloud_language, LANG_DETECT_URL_CACHE_TTL_SECONDS)
+        return cloud_language
     except Exception as e:
-        # Log the error but don't fail - just default to English
+        # Log the error but don't fail - just use the offline guess
         logging.warning(f"Language detection unavailable (Translation API may not be enabled): {e}")
-        logging.info("Defaulting to English (en)")
-        return 'en'  # Default to English on error
+        logging.info(f"Using offline guess ({language})")
+        metrics.increment("lang_detect.cloud_errors")
+        return language
 
-def translate_text(text: str, target_language: str, source_language: str = 'en') -> str:
+# Translations keyed by (source, target, text hash)
+translation_cache = MemoryLRUBackend(max_entries=TRANSLATION_CACHE_MAX_ENTRIES)
+translation_executor = ThreadPoolExecutor(max_workers=TRANSLATION_MAX_WORKERS, thread_name_prefix="translate")
+
+def translate_texts(texts: List[str], target_language: str, source_language: str = 'en') -> List[str]:
     """
-    Translates text from source language to target language.
-    If Translation API is not available, returns original text.
+    Translates several texts from source language to target language in a single
+    Translation API request, skipping texts found in the translation cache.
+    If Translation API is not available, the untranslated texts are returned as-is.
     """
     if source_language == target_language:
-        return text  # No translation needed
-    
+        return list(texts)  # No translation needed
+
+    results = list(texts)
+    missing: Dict[str, List[int]] = {} # Cache key -> indexes of texts still to translate
+    for index, text in enumerate(texts):
+        if not text.strip():
+            continue
+        key = f"{source_language}:{target_language}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+        hit, translated_text = translation_cache.get(key)
+        if hit:
+            results[index] = translated_text
+            metrics.increment("translation.cache_hits")
+        else:
+            missing.setdefault(key, []).append(index)
+    if not missing:
+        return results
+
     try:
         client = get_translate_client()
-        result = client.translate(
-            text,
+        keys = list(missing)
+        translations = client.translate(
+            [texts[missing[key][0]] for key in keys],
             target_language=target_language,
             source_language=source_language
         )
-        translated_text = result['translatedText']
-        logging.info(f"Translated text from {source_language} to {target_language}")
-        return translated_text
+        for key, translation in zip(keys, translations):
+            translation_cache.set(key, translation['translatedText'], TRANSLATION_CACHE_TTL_SECONDS)
+            for index in missing[key]:
+                results[index] = translation['translatedText']
+        metrics.increment("translation.requests")
+        metrics.increment("translation.cache_misses", len(keys))
+        logging.info(f"Translated {len(keys)} text(s) from {source_language} to {target_language}")
     except Exception as e:
         logging.warning(f"Translation unavailable (Translation API may not be enabled): {e}")
         logging.info("Returning original text without translation")
-        return text  # Return original text on error
+        metrics.increment("translation.errors")
+    return results
+
+
+def translate_text(text: str, target_language: str, source_language: str = 'en') -> str:
+    """
+    Translates text from source language to target language.
+    If Translation API is not available, returns original text.
+    """
+    return translate_texts([text], target_language, source_language)[0]
 
 
 # --- Vertex AI / Gemini Setup ---
 
 gemini_model = None
 system_instruction = None  # Will be set after initialization
+analysis_prompt: Optional[PromptPrefix] = None # Serves system_instruction to the model, see prompt_cache.py
 
-try:
-    check_configuration() # Check config and initialize Cloud SQL connector and Vertex AI
-    
+def initialize_analysis_model():
+    """
+    Initializes Vertex AI and registers the analysis instruction (analysis_prompt).
+    Needs no database, so check_text_async.py calls it from its own startup.
+    """
+    global gemini_model, system_instruction, analysis_prompt
     # Initialize Vertex AI
     if VERTEXAI_AVAILABLE:
         try:
@@ -659,25 +1156,6 @@ try:
         except Exception as e:
             logging.warning(f"Could not initialize vertexai module: {e}")
     
-    # Initialize Gemini model via Vertex AI
-    try:
-        if GenerativeModel is None:
-            raise ImportError("GenerativeModel not available. Install: pip install google-cloud-aiplatform")
-        
-        gemini_model = GenerativeModel(
-            GEMINI_MODEL_NAME
-        )
-        logging.info(f"Vertex AI Gemini model '{GEMINI_MODEL_NAME}' initialized.")
-    except Exception as e:
-        logging.error(f"Error initializing Gemini model: {e}")
-        raise ConfigurationError(f"Failed to initialize Gemini model: {e}")
-
-    agent_tools = [
-        check_database_for_url,
-        search_google_for_context,
-        fact_check_claims,
-    ]
-
     # Define system instruction (using global variable to avoid NameError)
     current_date_str = current_datetime.strftime("%Y-%m-%d")
     system_instruction = '''You are an AI agent specialized in detecting and classifying online news articles as credible or misleading. Your output must be highly accurate and well-supported.
@@ -685,6 +1163,7 @@ try:
 You will be given:
 - url: a string containing the article's URL
 - text: the full text of the article
+- tool evidence: results already gathered by the system from check_database_for_url, search_google_for_context and fact_check_claims
 - Today's date is ''' + current_date_str + '''
 
 Your final determination must be an absolute confidence score. If a news article is credible, trustworthy, and verifiable across all tools, you MUST provide a very high score (e.g., 0.90 to 0.95). If the article is clearly misleading, sensational, or a scam, you MUST also provide a very high score (e.g., 0.90 to 0.95), reflecting your strong conviction. Do not provide a neutral score (e.g., 50-75%) unless the analysis is genuinely inconclusive.
@@ -695,45 +1174,19 @@ Your job is to:
 3. Analyze the text for sentiment (positive, negative, neutral) and bias.
 4. Support your determination with specific, educational reasoning.
 
-Output ONLY the following JSON object (no additional text):
-{
-  "textResult": {
-    "label": "LABEL_1" or "LABEL_0",
-    "score": 0.85,
-    "sentiment": { "label": "neutral", "score": 0.5 },
-    "bias": { "summary": "No significant bias detected", "indicators": [] },
-    "highlights": ["Key claim from article"],
-    "reasoning": ["Reason 1", "Reason 2"],
-    "educational_insights": ["Insight 1"],
-    "fact_check": [
-      {
-        "source": "Source Name",
-        "title": "Fact check title",
-        "url": "https://example.com",
-        "claim": "The claim",
-        "rating": "True/False/Mixed"
-      }
-    ],
-    "localized_summary": {
-        "reasoning": "Summary in English",
-        "educational_insights": "Insights in English"
-    }
-  }
-}
-
-IMPORTANT RULES:
-- LABEL_0 = likely real/credible news
-- LABEL_1 = likely fake/misleading news
-- score MUST be a decimal number between 0 and 1 (e.g., 0.8523, NOT 85%)
-- sentiment label MUST be one of: "positive", "negative", "neutral"
-- ALL fields are REQUIRED - do not omit any field
+Output:
+Respond with the `textResult` object defined by the response schema.
+- LABEL_0 = likely real/credible news; LABEL_1 = likely fake/misleading news
+- score is a decimal between 0 and 1 (e.g., 0.8523, NOT 85%)
+- localized_summary holds short English summaries of your reasoning and educational insights
 
 Process & Edge-Case Rules:
 
-1. **Tool Calls (MUST CALL):**
-   * Call `check_database_for_url(url)`. This verdict is a strong signal.
-   * Call `search_google_for_context(query)` using the article's main claims to find corroborating news.
-   * Call `fact_check_claims(claims)` for specific assertions.
+1. **Tool Evidence (PROVIDED):**
+   * `domain_verdict` is the result of `check_database_for_url(url)` ("real", "fake", "not_found" or "invalid_url"). This verdict is a strong signal.
+   * `search_results` are corroborating news results from `search_google_for_context(query)` for the article's headline.
+   * `fact_checks` are published fact checks from `fact_check_claims(claims)` for specific assertions.
+   * An entry of the form {"error": "..."} means that tool was unavailable. Do not invent results for it.
 
 2. **Sentiment/Bias Analysis (Consolidated):**
    * Perform sentiment analysis on the text and populate the `sentiment` object with a label ("positive", "negative", "neutral") and confidence score.
@@ -756,49 +1209,44 @@ Process & Edge-Case Rules:
 6. **Localization (NEW FIELD):**
    * The system will handle translation. Output your analysis in English only.
 
+'''
 
-Process & Analysis Rules:
-
-1. **Tool Calls (MUST USE):**
-   - Call check_database_for_url(url) to verify domain credibility
-   - Call search_google_for_context(query) to find corroborating news
-   - Call fact_check_claims(claims) for specific assertions
-
-2. **Scoring Guidelines:**
-   - Base score on cumulative evidence from ALL tools
-   - If all tools align (real/fake), score MUST be 0.90-0.95
-   - Use non-rounded scores (e.g., 0.9127, NOT 0.90)
-
-3. **Sentiment/Bias Analysis:**
-   - Analyze article tone (positive/negative/neutral)
-   - Identify bias indicators (sensationalism, emotional manipulation, etc.)
-
-4. **Educational Insights:**
-   - Explain WHY content may be misleading
-   - Provide logical fallacy examples
-   - Help users understand misinformation tactics
-
-5. **Fact Check Merging:**
-   - Combine results from fact_check_claims() and search_google_for_context()
-   - Each entry needs: source, title, url, claim, rating
+    # Register the static instruction once (system instruction or cached content, per PROMPT_CACHE_MODE)
+    # and warm the shared model handle for the text endpoint
+    try:
+        analysis_prompt = PromptPrefix("analysis", "text", system_instruction)
+        gemini_model = analysis_prompt.model()
+        logging.info(f"Vertex AI Gemini model '{analysis_prompt.model_name}' initialized, instruction in '{analysis_prompt.mode}' mode.")
+    except Exception as e:
+        logging.error(f"Error initializing Gemini model: {e}")
+        raise ConfigurationError(f"Failed to initialize Gemini model: {e}")
 
-CRITICAL OUTPUT REQUIREMENTS:
-- Your response MUST be ONLY valid JSON
-- NO explanatory text before or after JSON
-- NO markdown code blocks (no ``` or ```json)
-- NO comments or notes inside JSON
-- Start with { and end with }
-- ALL fields are REQUIRED (label, score, sentiment, bias, highlights, reasoning, educational_insights, fact_check, localized_summary)
-'''
 
+def initialize():
+    """
+    Runs the startup work of the Flask app: configuration check, Cloud SQL
+    connector, in-memory domain verdicts, fingerprint index and the Gemini
+    model. Only the Flask entry points (create_app and __main__) call this, so
+    importing check_text (e.g. from check_text_async.py) has no side effects.
+    """
+    try:
+        check_configuration() # Check config and initialize Cloud SQL connector and Vertex AI
+        domain_verdicts.start() # Load url_verdicts into memory and keep it refreshed
+        try:
+            load_fingerprint_index()
+        except DatabaseError as e:
+            logging.error(f"Could not load article fingerprints, near-duplicate reuse starts empty: {e}")
+        initialize_analysis_model()
+    except ConfigurationError as e:
+        logging.critical(f"Configuration failed: {e}")
+    except Exception as e:
+        logging.critical(f"Failed to initialize Vertex AI Gemini model or Cloud SQL connector: {e}")
 
-except ConfigurationError as e:
-    logging.critical(f"Configuration failed: {e}")
-except Exception as e:
-    logging.critical(f"Failed to initialize Vertex AI Gemini model or Cloud SQL connector: {e}")
 
 # --- Main Analysis Function ---
 
+analysis_flight = SingleFlight("analyze") # Coalesces concurrent analyses of the same URL + text
+
 def analyze_article(url: str, article_text: str) -> Dict[str, Any]:
     """
     Analyzes a news article using Vertex AI Gemini with the comprehensive analysis system.
@@ -809,7 +1257,11 @@ def analyze_article(url: str, article_text: str) -> Dict[str, Any]:
 
     Returns:
         A dictionary containing the analysis results in the specified format,
-        or an error dictionary if analysis cannot proceed.
+        or an error dictionary if analysis cannot proceed. Successful results
+        carry a top-level "cached" flag telling whether they were served from
+        the ANALYSIS_RESULTS_TABLE instead of a fresh model call. Results reused
+        from a near-identical article under another URL also carry
+        "near_duplicate_of": {"url", "distance"}.
     """
     logging.info(f"--- Analyzing Article --- URL: {url}")
     logging.debug(f"Text: {article_text[:200]}...")
@@ -821,159 +1273,430 @@ def analyze_article(url: str, article_text: str) -> Dict[str, Any]:
             }
         }
 
+    # Serve a fresh stored verdict for the same URL and text if we have one
+    content_hash = compute_content_hash(article_text)
+    try:
+        cached_result = get_cached_analysis_result(url, content_hash)
+        if cached_result:
+            return serve_cached_result(cached_result)
+    except DatabaseError as db_err:
+        logging.error(f"Failed to read cached analysis result, analyzing fresh: {db_err}")
+
+    # Reuse the verdict of a recently analyzed near-identical text under another URL
+    fingerprint = article_fingerprint(article_text)
+    near_duplicate = get_near_duplicate_result(url, fingerprint, content_hash)
+    if near_duplicate:
+        return near_duplicate
+
+    # Concurrent requests for the same URL and text share one analysis
+    result, shared = analysis_flight.do(
+        f"{url}:{content_hash}",
+        lambda: run_article_analysis(url, article_text, content_hash, fingerprint)
+    )
+    return result
+
+
+def build_analysis_prompt(url: str, article: PreparedArticle, tool_evidence: Dict[str, Any]) -> str:
+    """
+    Builds the per-article Gemini prompt from the tool evidence and prepared article text.
+    The system instruction is only included inline when PROMPT_CACHE_MODE is "inline".
+    """
+    excerpt_note = " (excerpt: boilerplate removed, most claim-dense sentences kept)" if article.truncated else ""
+    body = (
+        f"Analyze the following article:\nURL: {url}\n\n"
+        f"Tool evidence:\n{json.dumps(tool_evidence, indent=2, default=str)}\n\n"
+        f"Text{excerpt_note}:\n{article.text}"
+    )
+    if analysis_prompt is None:
+        return f"{system_instruction}\n\n{body}"
+    return analysis_prompt.build_prompt(body)
+
+
+def parse_analysis_response(url: str, final_text: str) -> Dict[str, Any]:
+    """
+    Parses and validates the model's final JSON text into {"textResult": {...}}
+    (see response_parsing.TEXT_RESULT_SCHEMA: defaults filled, scores coerced).
+    Returns an error dictionary in the same format if no valid result can be built.
+    """
+    logging.info("Received final text response from Vertex AI Gemini.")
+    logging.debug(f"Raw response (first 500 chars): {final_text[:500]}")
+
+    try:
+        analysis_result = parse_model_json(TEXT_RESULT_SCHEMA, final_text, wrapper_key="textResult")
+        logging.info(f"Analysis successful for URL: {url}")
+        return analysis_result
+    except ResponseParseError as e:
+        logging.error(f"Error parsing final model JSON response: {e}")
+        logging.error(f"Raw final model response text (first 1000 chars): {final_text[:1000]}")
+
+        # Return error in the expected format so frontend can display it
+        return {
+            "textResult": {
+                "error": "Model did not return valid JSON in the final response.",
+                "details": str(e),
+                "raw_response_preview": final_text[:500] if len(final_text) > 500 else final_text
+            }
+        }
+
+
+def build_localized_summary(text_result: Dict[str, Any], detected_language: Optional[str]) -> Optional[Dict[str, str]]:
+    """
+    Returns textResult.localized_summary translated into the article's language, or
+    None for English (or unknown) articles. Only reads text_result.
+    """
+    if not detected_language or detected_language == 'en':
+        return None
+    sources = ["\n".join(text_result.get(field, [])) for field in LOCALIZED_SUMMARY_FIELDS.values()]
+    return dict(zip(LOCALIZED_SUMMARY_FIELDS, translate_texts(sources, detected_language, 'en')))
+
+
+def localize_analysis_result(analysis_result: Dict[str, Any], detected_language: Optional[str]) -> None:
+    """Fills textResult.localized_summary in the article's language (in place) if it is not English."""
+    try:
+        localized_summary = build_localized_summary(analysis_result.get("textResult", {}), detected_language)
+        if localized_summary:
+            analysis_result.setdefault("textResult", {})["localized_summary"] = localized_summary
+            logging.info(f"Added localized summary in language: {detected_language}")
+    except Exception as e:
+        logging.error(f"Error adding localization: {e}")
+
+
+def serve_cached_result(analysis_result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Prepares a stored result for the response: marks it cached and localizes it
+    for the article language recorded with it (served from the translation cache
+    when the same summary was translated before).
+    """
+    localize_analysis_result(analysis_result, analysis_result.get("language"))
+    analysis_result["cached"] = True
+    return analysis_result
+
+
+def finalize_analysis_result(url: str, final_text: str, detected_language: str, content_hash: str,
+                             fingerprint: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Parses the model's final JSON text, stores the result in the database and adds
+    the localized summary for non-English articles. The translation runs on the
+    translation executor while the result is written; the stored row keeps the
+    article language and is localized again when served from the cache.
+    Returns the analysis result, or an error dictionary if the JSON is invalid.
+    """
+    analysis_result = parse_analysis_response(url, final_text)
+    if "error" in analysis_result.get("textResult", {}):
+        return analysis_result
+    analysis_result["language"] = detected_language
+
+    localization = None
+    if detected_language and detected_language != 'en':
+        localization = translation_executor.submit(build_localized_summary, analysis_result["textResult"], detected_language)
+
+    # Store results in database
+    try:
+        update_analysis_results(url, analysis_result, content_hash, fingerprint)
+    except DatabaseError as db_err:
+        logging.error(f"Failed to store analysis result in DB: {db_err}")
+
+    if localization is not None:
+        try:
+            analysis_result["textResult"]["localized_summary"] = localization.result(timeout=TRANSLATION_TIMEOUT_SECONDS)
+            logging.info(f"Added localized summary in language: {detected_language}")
+        except FuturesTimeoutError:
+            logging.warning(f"Translation to {detected_language} timed out after {TRANSLATION_TIMEOUT_SECONDS}s, returning English summary.")
+        except Exception as e:
+            logging.error(f"Error adding localization: {e}")
+
+    analysis_result["cached"] = False
+    return analysis_result
+
+
+def empty_model_response_result(response: Any) -> Dict[str, Any]:
+    """Logs why the model returned no text and builds the matching error result."""
+    logging.error("Final response from Vertex AI Gemini did not contain text.")
+    if hasattr(response, 'prompt_feedback'):
+         logging.error(f"Prompt Feedback: {response.prompt_feedback}")
+    if hasattr(response, 'candidates') and response.candidates:
+         logging.error(f"Finish Reason: {getattr(response.candidates[0], 'finish_reason', 'N/A')}")
+         logging.error(f"Safety Ratings: {getattr(response.candidates[0], 'safety_ratings', 'N/A')}")
+
+    return {
+        "textResult": {
+            "error": "Model did not provide a final text analysis.",
+            "details": "No text in response"
+        }
+    }
+
+
+def analysis_exception_result(url: str, error: Exception) -> Dict[str, Any]:
+    """Builds the error result for an exception raised while analyzing an article."""
+    if isinstance(error, (ApiError, DatabaseError, ConfigurationError)):
+         logging.error(f"A tool function failed during analysis for URL '{url}': {error}")
+         return {
+             "textResult": {
+                 "error": f"Analysis failed due to tool error: {error}"
+             }
+         }
+    logging.critical(f"An unexpected error occurred during Gemini interaction for URL '{url}': {error}")
+    logging.critical(traceback.format_exc())
+    return {
+        "textResult": {
+            "error": f"An unexpected server error occurred during analysis interaction.",
+            "details": str(error)
+        }
+    }
+
+
+def run_article_analysis(url: str, article_text: str, content_hash: str, fingerprint: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Runs the full (uncached) analysis pipeline for an article: language detection,
+    tool fan-out, the Gemini call, localization and persistence.
+    Called by analyze_article under request coalescing; returns the same format.
+    """
+    # Strip boilerplate and bound the text to ARTICLE_TOKEN_BUDGET (see text_prep.py)
+    article = prepare_article(article_text, claim_limit=FACT_CHECK_CLAIM_LIMIT)
+    metrics.observe("text_prep.prompt_tokens", article.estimated_tokens)
+
     # Detect language for localization
-    detected_language = detect_language(article_text[:500])  # Use first 500 chars for detection
+    detected_language = detect_language(article.language_sample, url)
     logging.info(f"Detected article language: {detected_language}")
 
-    initial_prompt = f"{system_instruction}\n\nAnalyze the following article:\nURL: {url}\n\nText:\n{article_text}"
+    # Run the agent tools concurrently and hand their results to the model
+    tool_evidence = gather_tool_evidence(url, article)
+    initial_prompt = build_analysis_prompt(url, article, tool_evidence)
 
     try:
         # Use Vertex AI Gemini model
-        if GenerationConfig is None:
-            raise ImportError("GenerationConfig not available")
-        
-        generation_config = GenerationConfig(
-            temperature=GEMINI_TEMPERATURE,
-            top_p=0.95,
-            top_k=40,
-            max_output_tokens=8192,
-            response_mime_type="application/json"  # Force JSON response
-        )
-        
-        response = gemini_model.generate_content(
-            initial_prompt,
-            generation_config=generation_config
-        )
+        started = time.monotonic()
+        response = analysis_prompt.model().generate_content(initial_prompt)
+        record_usage("analysis", response, started)
 
         if hasattr(response, 'text') and response.text:
-            final_text = response.text
-            logging.info("Received final text response from Vertex AI Gemini.")
-            logging.debug(f"Raw response (first 500 chars): {final_text[:500]}")
-            
+            return finalize_analysis_result(url, response.text, detected_language, content_hash, fingerprint)
+        return empty_model_response_result(response)
+
+    except Exception as e:
+        return analysis_exception_result(url, e)
+
+
+def stream_article_analysis(url: str, article_text: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Streaming variant of analyze_article. Yields (event, data) pairs as soon as each
+    piece is available:
+        'domain_verdict', 'search_results', 'fact_checks' - tool evidence, in that order;
+        'partial' - a chunk of raw model output ({"text": "..."});
+        'result' - the final validated result (same format as analyze_article);
+        'error' - a final error result in the textResult error format.
+    Cache hits and reused near-duplicates yield the stored result immediately.
+    Streams are not coalesced.
+    """
+    logging.info(f"--- Streaming Analysis --- URL: {url}")
+    if not url or not article_text:
+        yield "error", {"textResult": {"error": "URL and article text must be provided."}}
+        return
+
+    content_hash = compute_content_hash(article_text)
+    try:
+        cached_result = get_cached_analysis_result(url, content_hash)
+        if cached_result:
+            yield "result", serve_cached_result(cached_result)
+            return
+    except DatabaseError as db_err:
+        logging.error(f"Failed to read cached analysis result, analyzing fresh: {db_err}")
+
+    fingerprint = article_fingerprint(article_text)
+    near_duplicate = get_near_duplicate_result(url, fingerprint, content_hash)
+    if near_duplicate:
+        yield "result", near_duplicate
+        return
+
+    article = prepare_article(article_text, claim_limit=FACT_CHECK_CLAIM_LIMIT)
+    metrics.observe("text_prep.prompt_tokens", article.estimated_tokens)
+    detected_language = detect_language(article.language_sample, url)
+    tool_calls = submit_tool_calls(url, article)
+    tool_evidence: Dict[str, Any] = {}
+    for name in ("domain_verdict", "search_results", "fact_checks"):
+        tool_evidence[name] = collect_tool_result(tool_calls, name)
+        yield name, {name: tool_evidence[name]}
+    metrics.observe("tools.fanout_seconds", time.monotonic() - tool_calls["started"])
+
+    try:
+        chunks = []
+        chunk = None
+        started = time.monotonic()
+        for chunk in analysis_prompt.model().generate_content(
+            build_analysis_prompt(url, article, tool_evidence),
+            stream=True
+        ):
             try:
-                # Clean up markdown code blocks if present
-                cleaned_text = final_text.strip()
-                
-                # Remove markdown code blocks
-                if cleaned_text.startswith("```json"):
-                    cleaned_text = cleaned_text[7:]  # Remove ```json
-                elif cleaned_text.startswith("```"):
-                    cleaned_text = cleaned_text[3:]  # Remove ```
-                
-                if cleaned_text.endswith("```"):
-                    cleaned_text = cleaned_text[:-3]  # Remove trailing ```
-                
-                cleaned_text = cleaned_text.strip()
-                
-                # Try to find JSON if there's extra text
-                if not cleaned_text.startswith('{'):
-                    # Look for the first { and last }
-                    start_idx = cleaned_text.find('{')
-                    end_idx = cleaned_text.rfind('}')
-                    if start_idx != -1 and end_idx != -1:
-                        cleaned_text = cleaned_text[start_idx:end_idx+1]
-                        logging.info("Extracted JSON from response text")
-                
-                logging.debug(f"Cleaned text (first 500 chars): {cleaned_text[:500]}")
-                analysis_result = json.loads(cleaned_text)
-                
-                # Validate the response structure
-                if "textResult" not in analysis_result:
-                    logging.warning("Response missing 'textResult' key, wrapping response")
-                    analysis_result = {"textResult": analysis_result}
-                
-                # Ensure required fields exist
-                text_result = analysis_result.get("textResult", {})
-                if "label" not in text_result:
-                    logging.warning("Response missing 'label' field")
-                if "score" not in text_result:
-                    logging.warning("Response missing 'score' field")
-                
-                logging.info(f"Analysis successful for URL: {url}")
-
-                # Add localization if language is not English
-                if detected_language and detected_language != 'en':
-                    try:
-                        text_result = analysis_result.get("textResult", {})
-                        reasoning_en = "\n".join(text_result.get("reasoning", []))
-                        insights_en = "\n".join(text_result.get("educational_insights", []))
-                        
-                        # Translate reasoning and insights to detected language
-                        reasoning_localized = translate_text(reasoning_en, detected_language, 'en')
-                        insights_localized = translate_text(insights_en, detected_language, 'en')
-                        
-                        # Update localized_summary
-                        text_result["localized_summary"] = {
-                            "reasoning": reasoning_localized,
-                            "educational_insights": insights_localized
-                        }
-                        analysis_result["textResult"] = text_result
-                        logging.info(f"Added localized summary in language: {detected_language}")
-                    except Exception as e:
-                        logging.error(f"Error adding localization: {e}")
-
-                # Store results in database
-                try:
-                    update_analysis_results(url, analysis_result)
-                except DatabaseError as db_err:
-                    logging.error(f"Failed to store analysis result in DB: {db_err}")
-                
-                return analysis_result
-                
-            except json.JSONDecodeError as e:
-                logging.error(f"Error decoding final model JSON response: {e}")
-                logging.error(f"Raw final model response text (first 1000 chars): {final_text[:1000]}")
-                logging.error(f"JSON error at position {e.pos}: {e.msg}")
-                
-                # Return error in the expected format so frontend can display it
-                return {
-                    "textResult": {
-                        "error": "Model did not return valid JSON in the final response.",
-                        "details": f"JSON parse error: {e.msg}",
-                        "raw_response_preview": final_text[:500] if len(final_text) > 500 else final_text
-                    }
-                }
+                chunk_text = chunk.text
+            except (ValueError, AttributeError): # Chunks without text parts (e.g. the final one)
+                chunk_text = ""
+            if chunk_text:
+                chunks.append(chunk_text)
+                yield "partial", {"text": chunk_text}
+
+        record_usage("analysis", chunk, started) # Usage metadata arrives with the last chunk
+        final_text = "".join(chunks)
+        if final_text:
+            result = finalize_analysis_result(url, final_text, detected_language, content_hash, fingerprint)
         else:
-            logging.error("Final response from Vertex AI Gemini did not contain text.")
-            if hasattr(response, 'prompt_feedback'):
-                 logging.error(f"Prompt Feedback: {response.prompt_feedback}")
-            if hasattr(response, 'candidates') and response.candidates:
-                 logging.error(f"Finish Reason: {getattr(response.candidates[0], 'finish_reason', 'N/A')}")
-                 logging.error(f"Safety Ratings: {getattr(response.candidates[0], 'safety_ratings', 'N/A')}")
-
-            return {
-                "textResult": {
-                    "error": "Model did not provide a final text analysis.",
-                    "details": "No text in response"
-                }
-            }
-
-    except (ApiError, DatabaseError, ConfigurationError) as known_err:
-         logging.error(f"A tool function failed during analysis for URL '{url}': {known_err}")
-         return {
-             "textResult": {
-                 "error": f"Analysis failed due to tool error: {known_err}"
-             }
-         }
+            result = empty_model_response_result(None)
     except Exception as e:
-        logging.critical(f"An unexpected error occurred during Gemini interaction for URL '{url}': {e}")
-        logging.critical(traceback.format_exc())
-        return {
-            "textResult": {
-                "error": f"An unexpected server error occurred during analysis interaction.",
-                "details": str(e)
-            }
-        }
+        result = analysis_exception_result(url, e)
+
+    yield ("error" if "error" in result.get("textResult", {}) else "result"), result
+
+
+# --- Batch Analysis ---
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_EXECUTOR_MAX_WORKERS, thread_name_prefix="batch-analysis")
+user_batch_slots: Dict[Any, List[Any]] = {} # user_id -> [semaphore, holder count]; idle users are evicted
+user_batch_slots_lock = threading.Lock()
+
+def checkout_user_batch_slots(user_id: Any) -> threading.BoundedSemaphore:
+    """
+    Returns the semaphore capping how many of the user's batch items are analyzed at once.
+    Every checkout (a running batch or a started item) must be paired with return_user_batch_slots.
+    """
+    with user_batch_slots_lock:
+        entry = user_batch_slots.get(user_id)
+        if entry is None:
+            entry = user_batch_slots[user_id] = [threading.BoundedSemaphore(BATCH_USER_CONCURRENCY), 0]
+        entry[1] += 1
+        return entry[0]
+
+def return_user_batch_slots(user_id: Any) -> None:
+    """Ends a checkout; the user's entry is dropped once no batch or item holds it."""
+    with user_batch_slots_lock:
+        entry = user_batch_slots.get(user_id)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del user_batch_slots[user_id]
+
+def batch_item_result(index: int, url: Any, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Wraps one item's analysis result with its position in the batch and HTTP-equivalent status."""
+    return {"index": index, "url": url, "status": analysis_status_code(result), "result": result}
+
+def run_analysis_batch(user_id: Any, items: List[Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Analyzes a batch of {"url", "article_text"} items and yields one batch_item_result
+    per item, in completion order:
+    - invalid items get an error result immediately;
+    - items with the same URL and text are analyzed once and share the result;
+    - fresh results in ANALYSIS_RESULTS_TABLE are served with one bulk lookup;
+    - the rest go through analyze_article on the batch executor, with at most
+      BATCH_USER_CONCURRENCY of the user's items running at any time. If the
+      user's other batches hold every slot for BATCH_SLOT_WAIT_SECONDS, the
+      remaining items are reported busy (status 429) instead of waiting further.
+    If the consumer stops iterating, items not yet started are skipped.
+    """
+    groups: Dict[Tuple[str, str], List[int]] = {}
+    for index, item in enumerate(items):
+        url = item.get("url") if isinstance(item, dict) else None
+        article_text = item.get("article_text") if isinstance(item, dict) else None
+        if not isinstance(url, str) or not isinstance(article_text, str) or not url or not article_text:
+            yield batch_item_result(index, url, {"textResult": {"error": "URL and article text must be provided."}})
+            continue
+        groups.setdefault((url, compute_content_hash(article_text)), []).append(index)
+
+    try:
+        cached_results = get_cached_analysis_results(list(groups))
+    except DatabaseError as db_err:
+        logging.error(f"Bulk cache lookup failed, analyzing batch fresh: {db_err}")
+        cached_results = {}
+    metrics.increment("batch.items", len(items))
+    metrics.increment("batch.cache_hits", sum(len(groups[key]) for key in cached_results))
+
+    for key, result in cached_results.items():
+        serve_cached_result(result)
+        for index in groups[key]:
+            yield batch_item_result(index, key[0], result)
+
+    queue = deque(key for key in groups if key not in cached_results)
+    slots = checkout_user_batch_slots(user_id)
+
+    def release_slot(_future: Any) -> None:
+        slots.release()
+        return_user_batch_slots(user_id)
+
+    pending: Dict[Any, Tuple[str, str]] = {}
+    try:
+        while queue or pending:
+            # Start as many items as the user's free slots allow; wait for one only if nothing of ours is running
+            while queue and (slots.acquire(blocking=False) if pending else slots.acquire(timeout=BATCH_SLOT_WAIT_SECONDS)):
+                url, content_hash = queue.popleft()
+                article_text = items[groups[(url, content_hash)][0]]["article_text"]
+                checkout_user_batch_slots(user_id) # Held by the item until it finishes, even if the batch is abandoned
+                future = batch_executor.submit(analyze_article, url, article_text)
+                future.add_done_callback(release_slot)
+                pending[future] = (url, content_hash)
+
+            if not pending:
+                logging.warning(f"No free batch slot for User ID {user_id} after {BATCH_SLOT_WAIT_SECONDS}s, {len(queue)} items reported busy.")
+                metrics.increment("batch.busy_items", sum(len(groups[key]) for key in queue))
+                while queue:
+                    key = queue.popleft()
+                    for index in groups[key]:
+                        yield batch_item_result(index, key[0], {"textResult": {"error": BATCH_BUSY_ERROR}})
+                break
+
+            done, _ = futures_wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = analysis_exception_result(key[0], e)
+                for index in groups[key]:
+                    yield batch_item_result(index, key[0], result)
+    finally:
+        return_user_batch_slots(user_id)
 
 
 # --- Flask App Setup ---
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-try:
-    check_configuration()
-except ConfigurationError as e:
-    logging.critical(f"CRITICAL CONFIGURATION ERROR: {e}. Flask app might not function correctly.")
+def create_app() -> Flask:
+    """WSGI entry point (gunicorn "check_text:create_app()"): runs initialize() once and returns the app."""
+    initialize()
+    return app
+
+def format_sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Serializes one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def analysis_status_code(result: Dict[str, Any]) -> int:
+    """Logs the result structure and maps an analysis result to its HTTP status code."""
+    # Log the result structure for debugging
+    has_error = False
+    if "textResult" in result and "error" in result.get("textResult", {}):
+        has_error = True
+        logging.error(f"Analysis returned error: {result['textResult'].get('error')}")
+    else:
+        logging.info(f"Analysis result keys: {list(result.keys())}")
+        if "textResult" in result:
+            logging.info(f"textResult keys: {list(result['textResult'].keys())}")
+
+    # Determine status code
+    status_code = 200
+    if has_error:
+        error_msg = result.get("textResult", {}).get("error", "")
+        if "Analysis failed due to tool error" in error_msg:
+            status_code = 502  # Bad Gateway if a downstream API failed
+        elif "Model did not return valid JSON" in error_msg or "Model did not provide a final text analysis" in error_msg:
+            status_code = 500  # Internal server error for model issues
+        elif "URL and article text must be provided" in error_msg:
+            status_code = 400  # Bad request
+        elif error_msg == BATCH_BUSY_ERROR:
+            status_code = 429  # The user's batch slots stayed busy
+        else:
+            status_code = 500  # Default to internal server error
+    return status_code
+
+def wants_event_stream() -> bool:
+    """True if the client opted into streaming via ?stream=1 or Accept: text/event-stream."""
+    return request.args.get('stream') == '1' or 'text/event-stream' in request.headers.get('Accept', '')
 
 # --- Modified: /analyze Endpoint ---
 @app.route('/analyze', methods=['POST'])
@@ -996,33 +1719,60 @@ def handle_analyze():
     # Log the request with the authenticated user ID
     logging.info(f"Received analysis request for URL: {url} from User ID: {g.user['id']} (Google ID: {g.user['google_id']})")
 
+    # --- Opt-in streaming mode: progressive Server-Sent Events ---
+    if wants_event_stream():
+        events = stream_article_analysis(url, article_text)
+        return Response(
+            stream_with_context(format_sse_event(event, data) for event, data in events),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
     # --- Proceed with analysis ---
     result = analyze_article(url, article_text)
     
-    # Log the result structure for debugging
-    has_error = False
-    if "textResult" in result and "error" in result.get("textResult", {}):
-        has_error = True
-        logging.error(f"Analysis returned error: {result['textResult'].get('error')}")
-    else:
-        logging.info(f"Analysis result keys: {list(result.keys())}")
-        if "textResult" in result:
-            logging.info(f"textResult keys: {list(result['textResult'].keys())}")
+    return jsonify(result), analysis_status_code(result)
 
-    # Determine status code
-    status_code = 200
-    if has_error:
-        error_msg = result.get("textResult", {}).get("error", "")
-        if "Analysis failed due to tool error" in error_msg:
-            status_code = 502  # Bad Gateway if a downstream API failed
-        elif "Model did not return valid JSON" in error_msg or "Model did not provide a final text analysis" in error_msg:
-            status_code = 500  # Internal server error for model issues
-        elif "URL and article text must be provided" in error_msg:
-            status_code = 400  # Bad request
-        else:
-            status_code = 500  # Default to internal server error
+# --- /analyze_batch Endpoint ---
+@app.route('/analyze_batch', methods=['POST'])
+@require_auth
+def handle_analyze_batch():
+    """
+    Analyzes up to BATCH_MAX_ITEMS articles with one authenticated request.
+    Payload: {"items": [{"url": ..., "article_text": ...}, ...]}.
+    Returns {"results": [...], "summary": {...}} with one entry per item in request
+    order, or with ?stream=1 / Accept: application/x-ndjson one JSON line per item
+    in completion order. Each entry holds the item's index, url, the status code
+    /analyze would have returned and the analysis result.
+    """
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
 
-    return jsonify(result), status_code
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Missing 'items' list in JSON payload"}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"Too many items: {len(items)} (max {BATCH_MAX_ITEMS})"}), 400
+
+    user_id = g.user['id']
+    logging.info(f"Received batch analysis request with {len(items)} items from User ID: {user_id}")
+
+    if request.args.get('stream') == '1' or 'application/x-ndjson' in request.headers.get('Accept', ''):
+        entries = run_analysis_batch(user_id, items)
+        return Response(
+            stream_with_context(json.dumps(entry, default=str) + "\n" for entry in entries),
+            mimetype='application/x-ndjson',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+    results = sorted(run_analysis_batch(user_id, items), key=lambda entry: entry["index"])
+    summary = {
+        "total": len(results),
+        "cached": sum(1 for entry in results if entry["result"].get("cached") is True),
+        "failed": sum(1 for entry in results if entry["status"] != 200),
+    }
+    return jsonify({"results": results, "summary": summary}), 200
 
 @app.route('/')
 def index():
@@ -1032,6 +1782,14 @@ def index():
         "message": "TruthScope Analysis Backend (GCP-Native)",
         "gemini_model_status": gemini_status,
         "cloud_sql_connector_status": connector_status,
+        "db_pool": db_pool.stats() if db_pool else None,
+        "auth_cache": user_cache.stats(),
+        "query_cache": query_cache.stats(),
+        "domain_verdicts": domain_verdicts.stats(),
+        "fingerprint_index": {"entries": len(fingerprint_index), "max_distance": NEAR_DUPLICATE_MAX_DISTANCE},
+        "prompt_prefix": analysis_prompt.stats() if analysis_prompt else None,
+        "models": model_registry.stats(),
+        "metrics": metrics.snapshot(),
         "gcp_project": GCP_PROJECT_ID,
         "location": GCP_LOCATION
     })
@@ -1040,7 +1798,7 @@ def index():
 if __name__ == "__main__":
     logging.info("Starting Flask development server...")
     port = int(os.environ.get("PORT", 5000))
-    app.run(host='0.0.0.0', port=port, debug=True)
+    create_app().run(host='0.0.0.0', port=port, debug=True, use_reloader=False) # The reloader would initialize twice
     logging.info("Flask server stopping...")
     close_cloud_sql_connector()
     logging.info("Script finished.")
\ No newline at end of file
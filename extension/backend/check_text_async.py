@@ -0,0 +1,623 @@
+"""
+Asyncio-native (ASGI) serving mode for the text analysis service.
+
+check_text.py runs as a sync Flask app under gunicorn (--workers 1 --threads 8),
+so one instance holds at most 8 analyses, each thread blocked for 5-30 s on
+Gemini and Google APIs. This module exposes the same '/analyze' contract
+(JSON, or Server-Sent Events with ?stream=1) as a Quart app whose I/O is async:
+
+- Gemini via GenerativeModel.generate_content_async;
+- Google userinfo / Custom Search / Fact Check via httpx.AsyncClient;
+- Cloud SQL via the connector's asyncpg driver and an asyncpg pool.
+
+Prompting, parsing and scoring are shared with check_text.py, so both entry
+points produce identical results. Translation has no async client and runs in
+a worker thread. The Flask app remains the default entry point:
+
+    gunicorn --bind :$PORT --workers 1 --threads 8 --timeout 300 "check_text:create_app()"   # sync (Procfile)
+    uvicorn check_text_async:app --host 0.0.0.0 --port $PORT                                  # async
+
+Importing check_text has no side effects: its startup (pg8000 pool, domain
+verdict refresh thread, fingerprint index) runs only in check_text.initialize(),
+which the Flask entry point calls. This app initializes just the Gemini model
+(check_text.initialize_analysis_model) and answers domain lookups from asyncpg.
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+from functools import wraps
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+import asyncpg
+from quart import Quart, request, jsonify, g
+from quart_cors import cors
+from google.cloud.sql.connector import create_async_connector
+
+import check_text
+from check_text import (
+    AuthenticationError,
+    DatabaseError,
+    ApiError,
+    ConfigurationError,
+    VERDICT_NOT_FOUND,
+)
+from auth_cache import user_cache
+from domain_verdicts import candidate_domains
+from single_flight import AsyncSingleFlight
+from prompt_cache import record_usage
+from text_prep import PreparedArticle, prepare_article
+from fingerprint import to_signed64, from_signed64
+import http_session
+import metrics
+
+# --- Configuration ---
+ASYNC_DB_POOL_MIN_SIZE = int(os.getenv("ASYNC_DB_POOL_MIN_SIZE", "1"))
+ASYNC_DB_POOL_MAX_SIZE = int(os.getenv("ASYNC_DB_POOL_MAX_SIZE", "20"))
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv("ASYNC_HTTP_MAX_CONNECTIONS", "200"))
+
+app = Quart(__name__)
+app = cors(app, allow_origin="*")
+
+connector = None
+db_pool: Optional[asyncpg.Pool] = None
+http_client: Optional[httpx.AsyncClient] = None
+analysis_flight = AsyncSingleFlight("analyze_async")
+
+
+# --- Lifecycle ---
+
+@app.before_serving
+async def startup():
+    """Initializes the Gemini model, creates the async Cloud SQL connector, asyncpg pool and HTTP client, and loads article fingerprints."""
+    global connector, db_pool, http_client
+    try:
+        await asyncio.to_thread(check_text.initialize_analysis_model)
+    except Exception as e:
+        logging.critical(f"Failed to initialize Vertex AI Gemini model: {e}")
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=ASYNC_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=http_session.HTTP_POOL_MAXSIZE
+        ),
+        transport=httpx.AsyncHTTPTransport(retries=http_session.HTTP_RETRY_TOTAL) # Connect errors only
+    )
+    try:
+        connector = await create_async_connector()
+
+        async def connect_to_cloud_sql(*args, **kwargs):
+            return await connector.connect_async(
+                check_text.CLOUD_SQL_CONNECTION_NAME,
+                "asyncpg",
+                user=check_text.DB_USER,
+                password=check_text.DB_PASSWORD,
+                db=check_text.DB_NAME
+            )
+
+        db_pool = await asyncpg.create_pool(
+            connect=connect_to_cloud_sql,
+            min_size=ASYNC_DB_POOL_MIN_SIZE,
+            max_size=ASYNC_DB_POOL_MAX_SIZE
+        )
+        logging.info("Async Cloud SQL pool initialized.")
+    except Exception as e:
+        logging.critical(f"Failed to initialize async Cloud SQL pool: {e}", exc_info=True)
+        return
+    try:
+        await load_fingerprint_index()
+    except Exception as e:
+        logging.error(f"Could not load article fingerprints, near-duplicate reuse starts empty: {e}")
+
+
+@app.after_serving
+async def shutdown():
+    global connector, db_pool, http_client
+    if db_pool:
+        await db_pool.close()
+        db_pool = None
+    if connector:
+        await connector.close_async()
+        connector = None
+    if http_client:
+        await http_client.aclose()
+        http_client = None
+
+
+# --- Async HTTP ---
+
+async def async_get(endpoint: str, url: str, **kwargs: Any) -> httpx.Response:
+    """
+    GET through the shared AsyncClient with the same per-endpoint timeouts and
+    429/5xx retry policy (jittered exponential backoff) as http_session.get.
+    """
+    connect_timeout, read_timeout = http_session.ENDPOINT_TIMEOUTS.get(endpoint, http_session.ENDPOINT_TIMEOUTS["default"])
+    kwargs.setdefault("timeout", httpx.Timeout(read_timeout, connect=connect_timeout))
+    for attempt in range(http_session.HTTP_RETRY_TOTAL + 1):
+        response = await http_client.get(url, **kwargs)
+        if response.status_code not in http_session.HTTP_RETRY_STATUS_CODES or attempt == http_session.HTTP_RETRY_TOTAL:
+            return response
+        backoff = http_session.HTTP_RETRY_BACKOFF_FACTOR * (2 ** attempt) + random.uniform(0, http_session.HTTP_RETRY_BACKOFF_JITTER)
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            backoff = max(backoff, float(retry_after))
+        await asyncio.sleep(backoff)
+    return response
+
+
+# --- Authentication ---
+
+async def verify_google_access_token(access_token: str) -> Dict[str, Any]:
+    """Async equivalent of check_text.verify_google_access_token."""
+    try:
+        response = await async_get("userinfo", check_text.GOOGLE_USERINFO_URL, headers={'Authorization': f'Bearer {access_token}'})
+        response.raise_for_status()
+        user_info = response.json()
+        if not user_info or 'id' not in user_info:
+            raise AuthenticationError("Invalid user info received from Google.")
+        user_info['sub'] = user_info.get('id')
+        return user_info
+    except httpx.TimeoutException:
+        raise AuthenticationError("Timeout during token verification.")
+    except httpx.HTTPStatusError as e:
+        status_code = e.response.status_code
+        logging.warning(f"Google UserInfo request failed with status {status_code}. Token likely invalid or expired.")
+        raise AuthenticationError(f"Token verification failed (HTTP {status_code}).")
+    except httpx.HTTPError as e:
+        logging.error(f"Network error calling Google UserInfo endpoint: {e}")
+        raise AuthenticationError("Network error during token verification.")
+    except json.JSONDecodeError:
+        raise AuthenticationError("Invalid response from token verification endpoint.")
+
+
+async def get_or_create_user(google_id: str, email: Optional[str] = None) -> Dict[str, Any]:
+    """Async equivalent of check_text.get_or_create_user."""
+    if not google_id:
+        raise AuthenticationError("Google User ID cannot be empty.")
+    if db_pool is None:
+        raise DatabaseError("Cloud SQL pool is not available.")
+    try:
+        async with db_pool.acquire() as conn:
+            record = await conn.fetchrow(f"SELECT id, tier FROM {check_text.USERS_TABLE} WHERE google_id = $1", google_id)
+            if record is None:
+                logging.info(f"Creating new user for google_id: {google_id} with email: {email}")
+                record = await conn.fetchrow(
+                    f"""
+                    INSERT INTO {check_text.USERS_TABLE} (google_id, email, tier, created_at)
+                    VALUES ($1, $2, $3, NOW())
+                    RETURNING id, tier;
+                    """,
+                    google_id, email, check_text.DEFAULT_USER_TIER
+                )
+            return {"id": record["id"], "tier": record["tier"]}
+    except Exception as e:
+        logging.error(f"Database error getting/creating user for google_id {google_id}: {e}", exc_info=True)
+        raise DatabaseError(f"DB error accessing user data: {e}")
+
+
+def require_auth(f):
+    """Async equivalent of check_text.require_auth, sharing its token cache."""
+    @wraps(f)
+    async def decorated_function(*args, **kwargs):
+        endpoint = request.endpoint or "unknown_endpoint"
+        auth_header = request.headers.get('Authorization')
+        if not auth_header or not auth_header.startswith('Bearer '):
+            return jsonify({"error": "Authorization header missing or invalid"}), 401
+        access_token = auth_header.split('Bearer ')[1]
+        if not access_token:
+            return jsonify({"error": "Empty token provided"}), 401
+
+        try:
+            cached_user = user_cache.get(access_token)
+            if cached_user:
+                g.user = cached_user
+            else:
+                user_info = await verify_google_access_token(access_token)
+                google_id = user_info.get('sub')
+                email = user_info.get('email')
+                if not google_id:
+                    raise AuthenticationError("Verified token info missing user ID ('sub').")
+                db_user = await get_or_create_user(google_id=google_id, email=email)
+                g.user = {"id": db_user["id"], "tier": db_user["tier"], "google_id": google_id, "email": email}
+                user_cache.put(access_token, g.user)
+            logging.info(f"@{endpoint}: User authenticated. DB User ID: {g.user['id']}, Tier: {g.user['tier']}")
+        except AuthenticationError as auth_err:
+            logging.warning(f"@{endpoint}: Authentication failed. Error: {auth_err}")
+            return jsonify({"error": f"Authentication failed: {auth_err}"}), 401
+        except DatabaseError as db_err:
+            logging.error(f"@{endpoint}: Database error during user processing. Error: {db_err}")
+            return jsonify({"error": f"Server error during user processing: {db_err}"}), 500
+        except Exception as e:
+            logging.error(f"@{endpoint}: Unexpected error during authentication. Error: {e}", exc_info=True)
+            return jsonify({"error": "Unexpected server error during authentication"}), 500
+
+        return await f(*args, **kwargs)
+
+    return decorated_function
+
+
+# --- Result Cache ---
+
+async def get_cached_analysis_result(url: str, content_hash: str) -> Optional[Dict[str, Any]]:
+    """Async equivalent of check_text.get_cached_analysis_result."""
+    if check_text.ANALYSIS_CACHE_TTL_SECONDS <= 0 or db_pool is None:
+        return None
+    try:
+        async with db_pool.acquire() as conn:
+            result_json = await conn.fetchval(
+                f"""
+                SELECT result_json FROM {check_text.ANALYSIS_RESULTS_TABLE}
+                WHERE url = $1
+                  AND content_hash = $2
+                  AND timestamp > NOW() - ($3 * INTERVAL '1 second');
+                """,
+                url, content_hash, check_text.ANALYSIS_CACHE_TTL_SECONDS
+            )
+    except Exception as e:
+        logging.error(f"Failed to read cached analysis result, analyzing fresh: {e}")
+        return None
+    if result_json is None:
+        return None
+    cached_result = json.loads(result_json) if isinstance(result_json, str) else result_json
+    return cached_result if isinstance(cached_result, dict) and "textResult" in cached_result else None
+
+
+async def update_analysis_results(url: str, analysis_result: Dict[str, Any], content_hash: str,
+                                  fingerprint: Optional[int] = None) -> None:
+    """Async equivalent of check_text.update_analysis_results (errors are logged, not raised)."""
+    if db_pool is None:
+        return
+    try:
+        async with db_pool.acquire() as conn:
+            await conn.execute(
+                f"""
+                INSERT INTO {check_text.ANALYSIS_RESULTS_TABLE} (url, result_json, content_hash, simhash, timestamp)
+                VALUES ($1, $2, $3, $4, NOW())
+                ON CONFLICT (url) DO UPDATE SET
+                    result_json = EXCLUDED.result_json,
+                    content_hash = EXCLUDED.content_hash,
+                    simhash = EXCLUDED.simhash,
+                    timestamp = NOW();
+                """,
+                url, json.dumps(analysis_result), content_hash,
+                to_signed64(fingerprint) if fingerprint is not None else None
+            )
+    except Exception as e:
+        logging.error(f"Failed to store analysis result in DB: {e}")
+        return
+    if fingerprint is not None:
+        check_text.fingerprint_index.add(url, fingerprint, content_hash)
+
+
+# --- Near-duplicate Reuse ---
+
+async def load_fingerprint_index() -> int:
+    """Async equivalent of check_text.load_fingerprint_index, filling the same check_text.fingerprint_index."""
+    if check_text.NEAR_DUPLICATE_MAX_DISTANCE < 0 or check_text.ANALYSIS_CACHE_TTL_SECONDS <= 0 or db_pool is None:
+        return 0
+    async with db_pool.acquire() as conn:
+        rows = await conn.fetch(
+            f"""
+            SELECT url, content_hash, simhash, EXTRACT(EPOCH FROM timestamp) AS stored_at FROM {check_text.ANALYSIS_RESULTS_TABLE}
+            WHERE simhash IS NOT NULL
+              AND timestamp > NOW() - ($1 * INTERVAL '1 second')
+            ORDER BY timestamp DESC
+            LIMIT $2;
+            """,
+            check_text.ANALYSIS_CACHE_TTL_SECONDS, check_text.FINGERPRINT_INDEX_MAX_ENTRIES
+        )
+    for row in reversed(rows): # Oldest first, so the newest survive eviction
+        check_text.fingerprint_index.add(row["url"], from_signed64(int(row["simhash"])), row["content_hash"],
+                                         added_at=float(row["stored_at"]))
+    logging.info(f"Loaded {len(rows)} article fingerprints.")
+    return len(rows)
+
+
+async def get_near_duplicate_result(url: str, fingerprint: Optional[int], content_hash: str) -> Optional[Dict[str, Any]]:
+    """Async equivalent of check_text.get_near_duplicate_result (same domain verdict rule and marking)."""
+    if fingerprint is None:
+        return None
+    match = check_text.fingerprint_index.nearest(fingerprint, max_age_seconds=check_text.ANALYSIS_CACHE_TTL_SECONDS, exclude=url)
+    if match is None:
+        metrics.increment("near_duplicate.misses")
+        return None
+    source_url, source_hash, distance = match
+
+    verdict, source_verdict = await asyncio.gather(check_database_for_url(url), check_database_for_url(source_url))
+    if verdict != source_verdict:
+        logging.info(f"Near-duplicate of '{source_url}' found for '{url}', but domain verdicts differ.")
+        metrics.increment("near_duplicate.domain_mismatches")
+        return None
+    result = await get_cached_analysis_result(source_url, source_hash)
+    if not result:
+        check_text.fingerprint_index.remove(source_url)
+        return None
+
+    result["near_duplicate_of"] = {"url": source_url, "distance": distance}
+    logging.info(f"Reusing analysis of '{source_url}' for near-duplicate '{url}' ({distance} bits apart).")
+    metrics.increment("near_duplicate.hits")
+    await update_analysis_results(url, result, content_hash, fingerprint)
+    return await asyncio.to_thread(check_text.serve_cached_result, result)
+
+
+# --- Agent Tools ---
+
+async def check_database_for_url(url: str) -> str:
+    """Async equivalent of check_text.check_database_for_url (in-memory table first)."""
+    domain = check_text.extract_domain_from_url(url)
+    if not domain:
+        return "invalid_url"
+    if check_text.domain_verdicts.loaded:
+        return check_text.domain_verdicts.lookup(domain) or VERDICT_NOT_FOUND
+    if db_pool is None:
+        raise DatabaseError("Cloud SQL pool is not available.")
+    candidates = candidate_domains(domain)
+    try:
+        async with db_pool.acquire() as conn:
+            rows = await conn.fetch(f"SELECT domain, verdict FROM {check_text.URL_VERDICTS_TABLE} WHERE domain = ANY($1::text[])", candidates)
+    except Exception as e:
+        raise DatabaseError(f"DB error checking URL: {e}")
+    found = {row["domain"]: row["verdict"] for row in rows}
+    for candidate in candidates:
+        if candidate in found:
+            return found[candidate]
+    return VERDICT_NOT_FOUND
+
+
+async def search_google_for_context(query: str) -> List[Dict[str, str]]:
+    """Async equivalent of check_text.search_google_for_context, sharing its query cache."""
+    if not check_text.GOOGLE_CUSTOM_SEARCH_API_KEY or not check_text.GOOGLE_CUSTOM_SEARCH_ENGINE_ID:
+        return []
+    hit, cached_results = await asyncio.to_thread(check_text.query_cache.get, "search", query)
+    if hit:
+        return cached_results
+    try:
+        response = await async_get("custom_search", check_text.CUSTOM_SEARCH_API_URL, params=check_text.build_search_params(query))
+        response.raise_for_status()
+        results = check_text.parse_search_results(response.json())
+    except Exception as e:
+        logging.error(f"Error querying Google Custom Search API for query '{query}': {e}")
+        return []
+    await asyncio.to_thread(check_text.query_cache.set, "search", query, results, check_text.SEARCH_CACHE_TTL_SECONDS)
+    return results
+
+
+async def fact_check_single_claim(claim_text: str) -> Optional[Dict[str, str]]:
+    """Async equivalent of check_text.fact_check_single_claim, sharing its query cache."""
+    truncated_claim = claim_text[:check_text.FACT_CHECK_QUERY_SIZE_LIMIT]
+    hit, cached_result = await asyncio.to_thread(check_text.query_cache.get, "fact_check", truncated_claim)
+    if hit:
+        return cached_result
+    response = await async_get(
+        "fact_check",
+        check_text.FACT_CHECK_API_URL,
+        params={"query": truncated_claim, "pageSize": 1, "languageCode": "en"},
+        headers={"X-Goog-Api-Key": check_text.GOOGLE_FACT_CHECK_API_KEY}
+    )
+    response.raise_for_status()
+    result = check_text.parse_fact_check_response(response.json(), claim_text)
+    await asyncio.to_thread(check_text.query_cache.set, "fact_check", truncated_claim, result, check_text.FACT_CHECK_CACHE_TTL_SECONDS)
+    return result
+
+
+async def fact_check_claims(claims: List[str]) -> List[Dict[str, str]]:
+    """
+    Async equivalent of check_text.fact_check_claims: all claims run concurrently
+    under one deadline; partial results are returned unless every claim failed.
+    """
+    key = check_text.GOOGLE_FACT_CHECK_API_KEY
+    if not key or key.startswith("YOUR_"):
+        raise ConfigurationError("Google Fact Check API Key not configured.")
+    claims_to_check = claims[:check_text.FACT_CHECK_CLAIM_LIMIT]
+    if not claims_to_check:
+        return []
+    tasks = [asyncio.create_task(fact_check_single_claim(claim)) for claim in claims_to_check]
+    done, pending = await asyncio.wait(tasks, timeout=check_text.FACT_CHECK_DEADLINE_SECONDS)
+    for task in pending:
+        task.cancel()
+
+    results, errors = [], []
+    for claim, task in zip(claims_to_check, tasks):
+        if task in pending:
+            errors.append(f"Timeout calling Fact Check API for claim: {claim[:100]}")
+        elif task.exception() is not None:
+            errors.append(f"Error calling Google Fact Check API: {task.exception()}")
+        elif task.result():
+            results.append(task.result())
+    if errors and len(errors) == len(claims_to_check):
+        raise ApiError(f"Fact check tool encountered errors: {'; '.join(errors)}")
+    return results
+
+
+async def run_tool(name: str, coro) -> Any:
+    """Awaits one tool under its TOOL_DEADLINE_SECONDS deadline; failures become {"error": ...}."""
+    deadline = check_text.TOOL_DEADLINE_SECONDS[name]
+    try:
+        return await asyncio.wait_for(coro, deadline)
+    except asyncio.TimeoutError:
+        metrics.increment(f"tools.{name}.timeouts")
+        return {"error": f"Timed out after {deadline:g}s"}
+    except (ApiError, DatabaseError, ConfigurationError) as e:
+        metrics.increment(f"tools.{name}.errors")
+        return {"error": str(e)}
+    except Exception as e:
+        logging.error(f"Unexpected error in tool '{name}': {e}", exc_info=True)
+        metrics.increment(f"tools.{name}.errors")
+        return {"error": f"Unexpected error: {e}"}
+
+
+def start_tools(url: str, article: PreparedArticle) -> Dict[str, asyncio.Task]:
+    """Starts the three agent tools concurrently."""
+    search_query = article.search_query[:check_text.SEARCH_QUERY_CHAR_LIMIT]
+    return {
+        "domain_verdict": asyncio.create_task(run_tool("domain_verdict", check_database_for_url(url))),
+        "search_results": asyncio.create_task(run_tool("search_results", search_google_for_context(search_query))),
+        "fact_checks": asyncio.create_task(run_tool("fact_checks", fact_check_claims(article.claims))),
+    }
+
+
+# --- Analysis ---
+
+async def finalize_analysis_result(url: str, final_text: str, detected_language: str, content_hash: str,
+                                   fingerprint: Optional[int] = None) -> Dict[str, Any]:
+    """Async equivalent of check_text.finalize_analysis_result."""
+    analysis_result = check_text.parse_analysis_response(url, final_text)
+    if "error" in analysis_result.get("textResult", {}):
+        return analysis_result
+    analysis_result["language"] = detected_language
+    # Translate while the result is written (see check_text.finalize_analysis_result)
+    localized_summary, _ = await asyncio.gather(
+        asyncio.to_thread(check_text.build_localized_summary, analysis_result["textResult"], detected_language),
+        update_analysis_results(url, analysis_result, content_hash, fingerprint)
+    )
+    if localized_summary:
+        analysis_result["textResult"]["localized_summary"] = localized_summary
+    analysis_result["cached"] = False
+    return analysis_result
+
+
+async def run_article_analysis(url: str, article_text: str, content_hash: str,
+                               fingerprint: Optional[int] = None) -> Dict[str, Any]:
+    """Async equivalent of check_text.run_article_analysis."""
+    started = time.monotonic()
+    article = prepare_article(article_text, claim_limit=check_text.FACT_CHECK_CLAIM_LIMIT)
+    tools = start_tools(url, article)
+    detected_language = await asyncio.to_thread(check_text.detect_language, article.language_sample, url)
+    tool_evidence = {name: await task for name, task in tools.items()}
+    metrics.observe("tools.fanout_seconds", time.monotonic() - started)
+
+    try:
+        model = await asyncio.to_thread(check_text.analysis_prompt.model) # May (re)create cached content
+        started = time.monotonic()
+        response = await model.generate_content_async(
+            check_text.build_analysis_prompt(url, article, tool_evidence)
+        )
+        record_usage("analysis", response, started)
+        if hasattr(response, 'text') and response.text:
+            return await finalize_analysis_result(url, response.text, detected_language, content_hash, fingerprint)
+        return check_text.empty_model_response_result(response)
+    except Exception as e:
+        return check_text.analysis_exception_result(url, e)
+
+
+async def analyze_article(url: str, article_text: str) -> Dict[str, Any]:
+    """Async equivalent of check_text.analyze_article (same result format)."""
+    if not url or not article_text:
+        return {"textResult": {"error": "URL and article text must be provided."}}
+    content_hash = check_text.compute_content_hash(article_text)
+    cached_result = await get_cached_analysis_result(url, content_hash)
+    if cached_result:
+        return await asyncio.to_thread(check_text.serve_cached_result, cached_result)
+    fingerprint = await asyncio.to_thread(check_text.article_fingerprint, article_text)
+    near_duplicate = await get_near_duplicate_result(url, fingerprint, content_hash)
+    if near_duplicate:
+        return near_duplicate
+    result, _ = await analysis_flight.do(
+        f"{url}:{content_hash}",
+        lambda: run_article_analysis(url, article_text, content_hash, fingerprint)
+    )
+    return result
+
+
+async def stream_article_analysis(url: str, article_text: str) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """Async equivalent of check_text.stream_article_analysis (same events)."""
+    if not url or not article_text:
+        yield "error", {"textResult": {"error": "URL and article text must be provided."}}
+        return
+    content_hash = check_text.compute_content_hash(article_text)
+    cached_result = await get_cached_analysis_result(url, content_hash)
+    if cached_result:
+        yield "result", await asyncio.to_thread(check_text.serve_cached_result, cached_result)
+        return
+    fingerprint = await asyncio.to_thread(check_text.article_fingerprint, article_text)
+    near_duplicate = await get_near_duplicate_result(url, fingerprint, content_hash)
+    if near_duplicate:
+        yield "result", near_duplicate
+        return
+
+    article = prepare_article(article_text, claim_limit=check_text.FACT_CHECK_CLAIM_LIMIT)
+    tools = start_tools(url, article)
+    detected_language = await asyncio.to_thread(check_text.detect_language, article.language_sample, url)
+    tool_evidence: Dict[str, Any] = {}
+    for name, task in tools.items():
+        tool_evidence[name] = await task
+        yield name, {name: tool_evidence[name]}
+
+    try:
+        chunks = []
+        chunk = None
+        model = await asyncio.to_thread(check_text.analysis_prompt.model)
+        started = time.monotonic()
+        stream = await model.generate_content_async(
+            check_text.build_analysis_prompt(url, article, tool_evidence),
+            stream=True
+        )
+        async for chunk in stream:
+            try:
+                chunk_text = chunk.text
+            except (ValueError, AttributeError):
+                chunk_text = ""
+            if chunk_text:
+                chunks.append(chunk_text)
+                yield "partial", {"text": chunk_text}
+        record_usage("analysis", chunk, started)
+        final_text = "".join(chunks)
+        if final_text:
+            result = await finalize_analysis_result(url, final_text, detected_language, content_hash, fingerprint)
+        else:
+            result = check_text.empty_model_response_result(None)
+    except Exception as e:
+        result = check_text.analysis_exception_result(url, e)
+
+    yield ("error" if "error" in result.get("textResult", {}) else "result"), result
+
+
+# --- Endpoints ---
+
+@app.route('/analyze', methods=['POST'])
+@require_auth
+async def handle_analyze():
+    """Same contract as check_text.handle_analyze."""
+    data = await request.get_json(silent=True)
+    if data is None:
+        return jsonify({"error": "Request must be JSON"}), 400
+    url = data.get('url')
+    article_text = data.get('article_text')
+    if not url or not article_text:
+        return jsonify({"error": "Missing 'url' or 'article_text' in JSON payload"}), 400
+
+    logging.info(f"Received async analysis request for URL: {url} from User ID: {g.user['id']}")
+
+    if request.args.get('stream') == '1' or 'text/event-stream' in request.headers.get('Accept', ''):
+        async def events():
+            async for event, payload in stream_article_analysis(url, article_text):
+                yield check_text.format_sse_event(event, payload)
+        return events(), 200, {'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+    result = await analyze_article(url, article_text)
+    return jsonify(result), check_text.analysis_status_code(result)
+
+
+@app.route('/')
+async def index():
+    return jsonify({
+        "message": "TruthScope Analysis Backend (GCP-Native, async)",
+        "gemini_model_status": "Initialized" if check_text.gemini_model else "Not Initialized (Check Logs)",
+        "async_db_pool": {"size": db_pool.get_size(), "idle": db_pool.get_idle_size()} if db_pool else None,
+        "in_flight_analyses": analysis_flight.in_flight(),
+        "auth_cache": user_cache.stats(),
+        "query_cache": check_text.query_cache.stats(),
+        "domain_verdicts": check_text.domain_verdicts.stats(),
+        "fingerprint_index": {"entries": len(check_text.fingerprint_index), "max_distance": check_text.NEAR_DUPLICATE_MAX_DISTANCE},
+        "prompt_prefix": check_text.analysis_prompt.stats() if check_text.analysis_prompt else None,
+        "metrics": metrics.snapshot(),
+        "gcp_project": check_text.GCP_PROJECT_ID,
+        "location": check_text.GCP_LOCATION
+    })
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", 8080)))
@@ -4,6 +4,18 @@ CREATE TABLE url_verdicts (
     verdict VARCHAR(10) NOT NULL CHECK (verdict IN ('real', 'fake')) -- Or TEXT
 );
 
+-- Tell running services to reload their in-memory copy of url_verdicts (domain_verdicts.py)
+CREATE OR REPLACE FUNCTION notify_url_verdicts_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('url_verdicts_changed', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER url_verdicts_changed
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON url_verdicts
+FOR EACH STATEMENT EXECUTE FUNCTION notify_url_verdicts_changed();
+
 
 -- Example SQL schema for analysis_results
 CREATE TABLE analysis_results (
@@ -11,11 +23,25 @@ CREATE TABLE analysis_results (
     result_json JSONB NOT NULL,
     reports_real INTEGER DEFAULT 0 NOT NULL,
     reports_fake INTEGER DEFAULT 0 NOT NULL,
+    content_hash CHAR(64),                     -- SHA-256 of the analyzed article text (read-through cache key)
+    simhash BIGINT,                            -- 64-bit SimHash of the article text (near-duplicate reuse, see fingerprint.py)
     timestamp TIMESTAMPTZ DEFAULT NOW() NOT NULL
 );
 
+-- Migration for existing deployments created before content_hash was added
+ALTER TABLE analysis_results ADD COLUMN IF NOT EXISTS content_hash CHAR(64);
+ALTER TABLE analysis_results ADD COLUMN IF NOT EXISTS simhash BIGINT;
+
 -- Optional: Index on timestamp if you query by time often
 -- CREATE INDEX idx_analysis_results_timestamp ON analysis_results (timestamp);
+-- Stored image analysis results, keyed by perceptual hash (check_media.py image result cache)
+CREATE TABLE image_results (
+    phash BIGINT PRIMARY KEY,                  -- 64-bit dHash of the image pixels (image_ingest.dhash), signed
+    source_url TEXT NOT NULL,                  -- URL the stored result was produced for
+    result_json JSONB NOT NULL,
+    timestamp TIMESTAMPTZ DEFAULT NOW() NOT NULL
+);
+
 -- Schema for the users table
 CREATE TABLE users (
     id SERIAL PRIMARY KEY,                     -- Auto-incrementing integer ID for internal use
@@ -26,4 +52,13 @@ CREATE TABLE users (
 );
 
 -- Optional: Index on google_id for faster lookups
-CREATE INDEX idx_users_google_id ON users (google_id);
\ No newline at end of file
+CREATE INDEX idx_users_google_id ON users (google_id);
+
+-- Shared cache of Custom Search / Fact Check query results (query_cache.py, QUERY_CACHE_BACKEND=postgres)
+CREATE TABLE query_cache (
+    cache_key VARCHAR(128) PRIMARY KEY,        -- '<namespace>:<sha256 of normalized query>'
+    result_json JSONB NOT NULL,
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX idx_query_cache_expires_at ON query_cache (expires_at);
@@ -0,0 +1,214 @@
+"""
+Thread-safe connection pool on top of the Cloud SQL Python Connector.
+
+The Connector itself only hands out new connections, each paying a full TLS +
+Postgres handshake. ConnectionPool keeps up to `max_size` of them open and
+reuses them across requests:
+
+- checkout (getconn) prefers the most recently used idle connection, opens a
+  new one while below `max_size`, and otherwise waits up to `timeout` seconds;
+- connections idle for longer than `health_check_after_seconds` are pinged
+  with SELECT 1 before being handed out, and replaced if the ping fails;
+- connections idle for longer than `max_idle_seconds` are closed, down to
+  `min_size`;
+- checkout wait time is recorded as the 'db_pool.checkout_wait_seconds' metric.
+
+The defaults are sized for the gunicorn config in the Procfile
+(--workers 1 --threads 8): one connection per request thread.
+"""
+import os
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import metrics
+
+# --- Configuration ---
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "8")) # Matches the 8 gunicorn threads
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "10"))
+DB_POOL_MAX_IDLE_SECONDS = float(os.getenv("DB_POOL_MAX_IDLE_SECONDS", "300"))
+DB_POOL_HEALTH_CHECK_AFTER_SECONDS = float(os.getenv("DB_POOL_HEALTH_CHECK_AFTER_SECONDS", "30"))
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within the checkout timeout."""
+    pass
+
+
+class ConnectionPool:
+    """Bounded pool of DB-API connections created by a `connect` callable."""
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        min_size: int = DB_POOL_MIN_SIZE,
+        max_size: int = DB_POOL_MAX_SIZE,
+        timeout: float = DB_POOL_TIMEOUT_SECONDS,
+        max_idle_seconds: float = DB_POOL_MAX_IDLE_SECONDS,
+        health_check_after_seconds: float = DB_POOL_HEALTH_CHECK_AFTER_SECONDS,
+    ):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError(f"Invalid pool size (min={min_size}, max={max_size}).")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle_seconds = max_idle_seconds
+        self.health_check_after_seconds = health_check_after_seconds
+
+        self._cond = threading.Condition()
+        self._idle: List[Tuple[Any, float]] = [] # (connection, last_used monotonic time)
+        self._size = 0 # Open connections, idle or checked out
+        self._closed = False
+
+    # --- Public API ---
+
+    def prewarm(self) -> None:
+        """Opens connections until `min_size` are idle in the pool."""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            conn = self._open()
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def getconn(self) -> Any:
+        """
+        Checks out a healthy connection.
+        Raises PoolTimeoutError if none is available within `timeout` seconds,
+        or whatever the connect callable raises if a new connection fails.
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+        while True:
+            conn, last_used = self._reserve(deadline)
+            if conn is None:
+                conn = self._open()
+            elif time.monotonic() - last_used > self.health_check_after_seconds and not self._ping(conn):
+                logging.warning("Discarding pooled DB connection that failed its health check.")
+                self._discard(conn)
+                continue
+            metrics.observe("db_pool.checkout_wait_seconds", time.monotonic() - start)
+            return conn
+
+    def putconn(self, conn: Any, discard: bool = False) -> None:
+        """
+        Returns a connection to the pool. Any open transaction is rolled back;
+        connections that cannot be rolled back, or are explicitly discarded, are closed.
+        """
+        if conn is None:
+            return
+        if not discard:
+            try:
+                conn.rollback()
+            except Exception as e:
+                logging.warning(f"Rollback failed on returned DB connection, discarding it: {e}")
+                discard = True
+        if discard or self._closed:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+        self._evict_idle()
+
+    def close(self) -> None:
+        """Closes all idle connections; connections still checked out are closed on return."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+            }
+
+    # --- Internals ---
+
+    def _reserve(self, deadline: float) -> Tuple[Any, float]:
+        """
+        Takes an idle connection, or reserves a slot for a new one (returned as
+        (None, 0.0)), waiting until `deadline` if the pool is exhausted.
+        """
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeoutError("Connection pool is closed.")
+                if self._idle:
+                    return self._idle.pop() # LIFO keeps the warmest connections in use
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None, 0.0
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    metrics.increment("db_pool.checkout_timeouts")
+                    raise PoolTimeoutError(f"No DB connection available within {self.timeout:.1f}s (max_size={self.max_size}).")
+                self._cond.wait(remaining)
+
+    def _open(self) -> Any:
+        """Opens a connection for an already reserved slot, releasing the slot on failure."""
+        try:
+            conn = self._connect()
+            metrics.increment("db_pool.connections_opened")
+            logging.debug(f"Opened new pooled DB connection (ID: {id(conn)}).")
+            return conn
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def _ping(self, conn: Any) -> bool:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            conn.rollback()
+            return True
+        except Exception as e:
+            logging.debug(f"DB connection health check failed: {e}")
+            return False
+
+    def _discard(self, conn: Any) -> None:
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+        self._close_quietly(conn)
+
+    def _evict_idle(self) -> None:
+        """Closes connections idle for longer than max_idle_seconds, keeping min_size open."""
+        now = time.monotonic()
+        expired = []
+        with self._cond:
+            # Oldest idle connections are at the front of the list
+            while (self._idle and self._size > self.min_size
+                   and now - self._idle[0][1] > self.max_idle_seconds):
+                conn, _ = self._idle.pop(0)
+                self._size -= 1
+                expired.append(conn)
+        for conn in expired:
+            metrics.increment("db_pool.connections_evicted")
+            self._close_quietly(conn)
+
+    @staticmethod
+    def _close_quietly(conn: Any) -> None:
+        try:
+            conn.close()
+            metrics.increment("db_pool.connections_closed")
+        except Exception as e:
+            logging.debug(f"Error closing pooled DB connection: {e}")
@@ -97,7 +97,7 @@ deploy_service() {
 echo -e "${YELLOW}========================================${NC}"
 echo -e "${YELLOW}Deploying Text Analysis Service${NC}"
 echo -e "${YELLOW}========================================${NC}"
-deploy_service $TEXT_SERVICE "check_text:app"
+deploy_service $TEXT_SERVICE "check_text:create_app()"
 
 # Deploy media analysis service
 echo -e "${YELLOW}========================================${NC}"
@@ -0,0 +1,167 @@
+"""
+In-memory copy of the url_verdicts table for check_database_for_url.
+
+The table is small and changes rarely, so instead of one DB round trip per
+analysis it is loaded into a dict at startup and swapped out wholesale on
+refresh. A background thread reloads it every URL_VERDICTS_REFRESH_SECONDS and,
+if URL_VERDICTS_NOTIFY_CHANNEL is set, as soon as a Postgres NOTIFY arrives on
+that channel (see the trigger in db.sql).
+
+Lookups fall back to parent domains, so 'news.example.co.in' matches an entry
+for 'example.co.in'.
+"""
+import os
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import metrics
+
+# --- Configuration ---
+URL_VERDICTS_REFRESH_SECONDS = float(os.getenv("URL_VERDICTS_REFRESH_SECONDS", "300"))
+URL_VERDICTS_NOTIFY_CHANNEL = os.getenv("URL_VERDICTS_NOTIFY_CHANNEL", "url_verdicts_changed") # Empty disables LISTEN
+URL_VERDICTS_NOTIFY_POLL_SECONDS = float(os.getenv("URL_VERDICTS_NOTIFY_POLL_SECONDS", "5"))
+
+
+def candidate_domains(domain: str) -> List[str]:
+    """Returns the domain followed by its parent domains, most specific first (never the bare TLD)."""
+    labels = domain.lower().strip(".").split(".")
+    return [".".join(labels[i:]) for i in range(len(labels) - 1)] or [domain.lower()]
+
+
+class DomainVerdictTable:
+    """Periodically refreshed dict of domain -> verdict loaded from `table`."""
+
+    def __init__(
+        self,
+        table: str,
+        get_connection: Callable[[], Any],
+        release_connection: Callable[[Any], None],
+        open_listen_connection: Optional[Callable[[], Any]] = None,
+        refresh_seconds: float = URL_VERDICTS_REFRESH_SECONDS,
+        notify_channel: str = URL_VERDICTS_NOTIFY_CHANNEL,
+    ):
+        self.table = table
+        self._get_connection = get_connection
+        self._release_connection = release_connection
+        self._open_listen_connection = open_listen_connection
+        self.refresh_seconds = refresh_seconds
+        self.notify_channel = notify_channel if open_listen_connection else ""
+        self._verdicts: Optional[Dict[str, str]] = None # None until the first successful load
+        self._loaded_at = 0.0
+        self._start_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def loaded(self) -> bool:
+        return self._verdicts is not None
+
+    def load(self) -> int:
+        """Reloads the whole table and atomically replaces the in-memory copy. Returns the row count."""
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT domain, verdict FROM {self.table}")
+            rows = cursor.fetchall()
+            cursor.close()
+        finally:
+            if conn:
+                self._release_connection(conn)
+        self._verdicts = {str(domain).lower(): verdict for domain, verdict in rows}
+        self._loaded_at = time.time()
+        metrics.increment("domain_verdicts.reloads")
+        logging.info(f"Loaded {len(self._verdicts)} domain verdicts from '{self.table}'.")
+        return len(self._verdicts)
+
+    def lookup(self, domain: str) -> Optional[str]:
+        """Returns the verdict for the domain or its closest listed parent, or None."""
+        verdicts = self._verdicts or {}
+        for candidate in candidate_domains(domain):
+            verdict = verdicts.get(candidate)
+            if verdict:
+                return verdict
+        return None
+
+    def start(self) -> None:
+        """Loads the table and starts the background refresher (idempotent)."""
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            try:
+                self.load()
+            except Exception as e:
+                logging.error(f"Initial load of domain verdicts failed, will retry in background: {e}")
+            self._thread = threading.Thread(target=self._run, name="domain-verdicts-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self.loaded,
+            "domains": len(self._verdicts or {}),
+            "age_seconds": round(time.time() - self._loaded_at, 1) if self.loaded else None,
+            "notify_channel": self.notify_channel or None,
+        }
+
+    # --- Background refresh ---
+
+    def _run(self) -> None:
+        listen_conn = None
+        poll_seconds = URL_VERDICTS_NOTIFY_POLL_SECONDS if self.notify_channel else self.refresh_seconds
+        next_refresh = time.monotonic() + (self.refresh_seconds if self.loaded else 0)
+        while not self._stop.wait(poll_seconds):
+            refresh_due = time.monotonic() >= next_refresh
+            if self.notify_channel:
+                try:
+                    if listen_conn is None:
+                        listen_conn = self._listen()
+                    if self._poll_notifications(listen_conn):
+                        logging.info(f"Received NOTIFY on '{self.notify_channel}', reloading domain verdicts.")
+                        refresh_due = True
+                except Exception as e:
+                    logging.warning(f"Lost LISTEN connection for domain verdicts: {e}")
+                    self._close_quietly(listen_conn)
+                    listen_conn = None
+            if refresh_due:
+                try:
+                    self.load()
+                except Exception as e:
+                    logging.error(f"Refreshing domain verdicts failed: {e}")
+                next_refresh = time.monotonic() + self.refresh_seconds
+        self._close_quietly(listen_conn)
+
+    def _listen(self) -> Any:
+        """Opens a dedicated connection (outside the pool) subscribed to the notify channel."""
+        conn = self._open_listen_connection()
+        cursor = conn.cursor()
+        cursor.execute(f"LISTEN {self.notify_channel}")
+        cursor.close()
+        conn.commit()
+        return conn
+
+    @staticmethod
+    def _poll_notifications(conn: Any) -> bool:
+        """pg8000 only reads pending notifications while running a query, so issue a cheap one."""
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+        cursor.close()
+        conn.commit()
+        if conn.notifications:
+            conn.notifications.clear()
+            return True
+        return False
+
+    @staticmethod
+    def _close_quietly(conn: Any) -> None:
+        if conn is None:
+            return
+        try:
+            conn.close()
+        except Exception:
+            pass
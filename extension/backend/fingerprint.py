@@ -0,0 +1,129 @@
+"""
+Near-duplicate detection for article text.
+
+Syndicated stories appear under many URLs with nearly identical text. Each
+analyzed article gets a 64-bit SimHash over its normalized word shingles;
+texts that differ by a few words end up a few bits apart, while unrelated
+texts differ in about half of the bits.
+
+HammingIndex keeps recent fingerprints in memory and answers "is there a
+fingerprint within `max_distance` bits?" without a full scan, using
+multi-index hashing: the 64 bits are split into max_distance + 1 bands, and by
+the pigeonhole principle any fingerprint within that distance matches at
+least one band exactly, so only entries sharing a band are compared.
+"""
+import re
+import hashlib
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+SIMHASH_BITS = 64
+SHINGLE_WORDS = 5
+
+
+def normalize_words(text: str) -> List[str]:
+    """Case-folds the text and returns its word tokens (punctuation and whitespace dropped)."""
+    return re.findall(r"\w+", unicodedata.normalize("NFKC", text).casefold())
+
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> Set[str]:
+    """Returns the set of overlapping `size`-word shingles of the normalized text."""
+    words = normalize_words(text)
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def simhash(text: str) -> int:
+    """Returns the unsigned 64-bit SimHash of the text's shingles."""
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles(text):
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def to_signed64(value: int) -> int:
+    """Maps an unsigned 64-bit fingerprint onto Postgres BIGINT range."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def from_signed64(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+class HammingIndex:
+    """Thread-safe, size-bounded index of key -> (fingerprint, payload) with near-match lookup."""
+
+    def __init__(self, max_distance: int = 3, max_entries: int = 50000, bits: int = SIMHASH_BITS):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.bands = max_distance + 1
+        # Even split: the first bits % bands bands get one extra bit (64 bits, 7 bands -> 10,9,9,9,9,9,9).
+        # Ceiling division would leave the last band a few bits wide, i.e. a handful of huge buckets.
+        self.band_widths = [bits // self.bands + (1 if band < bits % self.bands else 0) for band in range(self.bands)]
+        self._band_shifts = [sum(self.band_widths[:band]) for band in range(self.bands)]
+        self._entries: "OrderedDict[Any, Tuple[int, Any, float]]" = OrderedDict() # key -> (fingerprint, payload, added_at)
+        self._tables: List[Dict[int, Dict[Any, int]]] = [{} for _ in range(self.bands)] # band value -> {key: fingerprint}
+        self._lock = threading.Lock()
+
+    def _band_values(self, fingerprint: int) -> List[int]:
+        return [fingerprint >> shift & ((1 << width) - 1) for shift, width in zip(self._band_shifts, self.band_widths)]
+
+    def add(self, key: Any, fingerprint: int, payload: Any = None, added_at: Optional[float] = None) -> None:
+        """Adds or replaces the entry for `key`; the oldest entries are dropped past max_entries."""
+        with self._lock:
+            self._remove_locked(key)
+            self._entries[key] = (fingerprint, payload, added_at if added_at is not None else time.time())
+            for table, value in zip(self._tables, self._band_values(fingerprint)):
+                table.setdefault(value, {})[key] = fingerprint
+            while len(self._entries) > self.max_entries:
+                self._remove_locked(next(iter(self._entries)))
+
+    def remove(self, key: Any) -> None:
+        with self._lock:
+            self._remove_locked(key)
+
+    def _remove_locked(self, key: Any) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for table, value in zip(self._tables, self._band_values(entry[0])):
+            keys = table.get(value)
+            if keys is not None:
+                keys.pop(key, None)
+                if not keys:
+                    del table[value]
+
+    def nearest(self, fingerprint: int, max_age_seconds: Optional[float] = None,
+                exclude: Any = None) -> Optional[Tuple[Any, Any, int]]:
+        """
+        Returns (key, payload, distance) of the closest entry within max_distance bits
+        (and younger than max_age_seconds, if given), or None.
+        """
+        oldest = time.time() - max_age_seconds if max_age_seconds is not None else None
+        best = None
+        with self._lock:
+            # Distance first: it is one XOR per candidate and rules out almost all of them
+            for table, value in zip(self._tables, self._band_values(fingerprint)):
+                for key, entry_fingerprint in table.get(value, {}).items():
+                    distance = (fingerprint ^ entry_fingerprint).bit_count()
+                    if distance > self.max_distance or (best is not None and distance >= best[2]) or key == exclude:
+                        continue
+                    _, payload, added_at = self._entries[key]
+                    if oldest is not None and added_at < oldest:
+                        continue
+                    best = (key, payload, distance)
+        return best
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
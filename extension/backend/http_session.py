@@ -0,0 +1,87 @@
+"""
+Shared pooled HTTP session for outbound Google API calls (userinfo,
+Custom Search, Fact Check Tools) and image downloads, used by check_text.py,
+check_media.py and image_ingest.py.
+
+One requests.Session per process keeps TLS connections to googleapis.com alive
+across requests instead of opening a fresh TCP+TLS connection per call:
+
+- connection pooling with at most HTTP_POOL_MAXSIZE connections per host
+  (callers block for a free connection rather than exceeding the limit);
+- GET requests are retried on connection errors and 429/5xx responses with
+  exponential backoff plus jitter, honouring Retry-After (read timeouts are
+  not retried, so a call never takes much longer than its timeout);
+- per-endpoint (connect, read) timeouts from ENDPOINT_TIMEOUTS.
+"""
+import os
+import threading
+from typing import Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# --- Configuration ---
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10")) # Number of hosts kept pooled
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16")) # Connections per host
+HTTP_RETRY_TOTAL = int(os.getenv("HTTP_RETRY_TOTAL", "2"))
+HTTP_RETRY_BACKOFF_FACTOR = float(os.getenv("HTTP_RETRY_BACKOFF_FACTOR", "0.3"))
+HTTP_RETRY_BACKOFF_JITTER = float(os.getenv("HTTP_RETRY_BACKOFF_JITTER", "0.3"))
+HTTP_RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+CONNECT_TIMEOUT_SECONDS = 3.05
+ENDPOINT_TIMEOUTS = { # (connect, read) in seconds
+    "userinfo": (CONNECT_TIMEOUT_SECONDS, 10),
+    "custom_search": (CONNECT_TIMEOUT_SECONDS, 15),
+    "fact_check": (CONNECT_TIMEOUT_SECONDS, 15),
+    "image_fetch": (CONNECT_TIMEOUT_SECONDS, 10), # Media downloads, see image_ingest.py
+    "default": (CONNECT_TIMEOUT_SECONDS, 20),
+}
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def create_session() -> requests.Session:
+    """Builds a requests.Session with the pooling and retry policy described above."""
+    retry = Retry(
+        total=HTTP_RETRY_TOTAL,
+        connect=HTTP_RETRY_TOTAL,
+        read=0,
+        status=HTTP_RETRY_TOTAL,
+        backoff_factor=HTTP_RETRY_BACKOFF_FACTOR,
+        backoff_jitter=HTTP_RETRY_BACKOFF_JITTER,
+        status_forcelist=HTTP_RETRY_STATUS_CODES,
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+        raise_on_status=False, # Return the final response so callers' raise_for_status() still applies
+    )
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        pool_block=True,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Returns the process-wide session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def get(endpoint: str, url: str, **kwargs: Any) -> requests.Response:
+    """
+    Performs a GET through the shared session. `endpoint` selects the timeout
+    from ENDPOINT_TIMEOUTS unless an explicit `timeout` is passed.
+    """
+    kwargs.setdefault("timeout", ENDPOINT_TIMEOUTS.get(endpoint, ENDPOINT_TIMEOUTS["default"]))
+    return get_session().get(url, **kwargs)
@@ -0,0 +1,331 @@
+"""
+Fetch-once ingestion of images for media analysis.
+
+Vision used to fetch each image itself (image_uri) while Gemini only saw the
+URL in its prompt. ingest_image() downloads the image once through the shared
+HTTP session and hands the same bytes to both:
+- the download is streamed and aborted as soon as it exceeds IMAGE_MAX_BYTES
+  (a larger Content-Length is rejected before reading the body);
+- the URL and every redirect hop must resolve only to public addresses, so
+  user-supplied URLs cannot reach loopback, private, link-local (including
+  the metadata server) or reserved hosts from inside the project. The check
+  resolves the name before the request; a DNS answer that changes between
+  the check and the connection is not covered;
+- the format is sniffed from the magic bytes, not trusted from Content-Type,
+  so HTML error pages and other non-image payloads never reach a paid call;
+- if Pillow is installed, the image is decoded once into a thumbnail of at
+  most IMAGE_MAX_DIMENSION on its long side (images above
+  IMAGE_MAX_DECODE_PIXELS are rejected first). Triage, re-encoding of
+  oversized images (above IMAGE_MAX_DIMENSION or IMAGE_MAX_REQUEST_BYTES, or
+  formats Gemini cannot read inline) and hashing all use that thumbnail;
+  without Pillow the original bytes are used. An image still above
+  IMAGE_MAX_REQUEST_BYTES after that is rejected as too_large, since its
+  base64 encoding would exceed Vision's request limit;
+- media_triage.triage() runs on the original bytes (before re-encoding drops
+  their metadata), and images it does not escalate are returned as-is;
+- with Pillow, a 64-bit difference hash (dHash) of the pixels is computed, so
+  the same photo under another URL, size or re-encoding can be recognized
+  (see the image result cache in check_media.py). Crops are not.
+
+Failures raise ImageIngestError with a short `reason` code (see REASONS).
+"""
+import io
+import os
+import socket
+import logging
+import struct
+import ipaddress
+from urllib.parse import urljoin, urlparse
+from typing import Any, Optional, Tuple
+
+import requests
+
+import http_session
+import metrics
+from media_triage import TriageResult, triage
+
+try:
+    from PIL import Image as PILImage
+except ImportError: # Optional: images are passed through unscaled
+    PILImage = None
+
+# --- Configuration ---
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(10 * 1024 * 1024))) # Vision accepts up to 20 MB inline
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "1536")) # Long side sent to the models, in pixels
+IMAGE_MAX_REQUEST_BYTES = 7 * 1024 * 1024 # Largest image sent to a model; base64 keeps one Vision request under its 10 MB limit
+IMAGE_MAX_DECODE_PIXELS = int(os.getenv("IMAGE_MAX_DECODE_PIXELS", str(40_000_000))) # Larger images are rejected, not decoded
+IMAGE_JPEG_QUALITY = 85
+IMAGE_CHUNK_BYTES = 64 * 1024
+IMAGE_MAX_REDIRECTS = 3 # Each hop is validated like the original URL
+DHASH_SIZE = 8 # 8x8 gradient bits = 64-bit hash
+
+# MIME types Gemini accepts as inline image parts; other formats are converted when Pillow is available
+GEMINI_IMAGE_MIME_TYPES = {"image/jpeg", "image/png", "image/webp", "image/heic", "image/heif"}
+
+REASONS = {
+    "http_error": "Image host returned an HTTP error",
+    "network_error": "Network error calling image host",
+    "timeout": "Timeout calling image host",
+    "too_large": "Image exceeds the size limit",
+    "not_image": "URL did not return a supported image",
+    "invalid_url": "Invalid media URL format",
+    "blocked_url": "Media URL points to a private or reserved address",
+}
+
+
+class ImageIngestError(Exception):
+    """Raised when an image cannot be fetched or is not acceptable. `reason` is a key of REASONS."""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class IngestedImage:
+    """Image bytes ready for Vision (content=) and Gemini (inline Part)."""
+
+    def __init__(self, url: str, content: bytes, mime_type: str, original_bytes: int,
+                 width: Optional[int], height: Optional[int], downscaled: bool, phash: Optional[int] = None):
+        self.url = url
+        self.content = content
+        self.mime_type = mime_type
+        self.original_bytes = original_bytes
+        self.width = width
+        self.height = height
+        self.downscaled = downscaled
+        self.phash = phash # Perceptual hash (dHash), None without Pillow
+        self.triage: Optional[TriageResult] = None # Set from the original bytes, see media_triage.py
+
+    @property
+    def gemini_compatible(self) -> bool:
+        return self.mime_type in GEMINI_IMAGE_MIME_TYPES
+
+
+# --- Format Sniffing ---
+
+def sniff_mime_type(data: bytes) -> Optional[str]:
+    """Returns the image MIME type from the leading magic bytes, or None if the data is not a known image."""
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[:4] == b"ftyp" or data[4:8] == b"ftyp":
+        brand = data[8:12]
+        if brand in (b"heic", b"heix", b"hevc", b"heim", b"heis"):
+            return "image/heic"
+        if brand in (b"mif1", b"msf1", b"heif"):
+            return "image/heif"
+        return None
+    if data.startswith(b"BM"):
+        return "image/bmp"
+    if data[:4] in (b"II*\x00", b"MM\x00*"):
+        return "image/tiff"
+    if data[:4] == b"\x00\x00\x01\x00":
+        return "image/x-icon"
+    return None
+
+
+def image_dimensions(data: bytes, mime_type: str) -> Tuple[Optional[int], Optional[int]]:
+    """Reads (width, height) from the image header without decoding it; (None, None) if unknown."""
+    try:
+        if mime_type == "image/png" and data[12:16] == b"IHDR":
+            return struct.unpack(">II", data[16:24])
+        if mime_type == "image/gif":
+            return struct.unpack("<HH", data[6:10])
+        if mime_type == "image/bmp":
+            width, height = struct.unpack("<ii", data[18:26])
+            return width, abs(height)
+        if mime_type == "image/webp":
+            chunk = data[12:16]
+            if chunk == b"VP8 ":
+                width, height = struct.unpack("<HH", data[26:30])
+                return width & 0x3FFF, height & 0x3FFF
+            if chunk == b"VP8L":
+                bits = int.from_bytes(data[21:25], "little")
+                return (bits & 0x3FFF) + 1, (bits >> 14 & 0x3FFF) + 1
+            if chunk == b"VP8X":
+                return int.from_bytes(data[24:27], "little") + 1, int.from_bytes(data[27:30], "little") + 1
+        if mime_type == "image/jpeg":
+            return _jpeg_dimensions(data)
+    except struct.error:
+        pass
+    return None, None
+
+
+def _jpeg_dimensions(data: bytes) -> Tuple[Optional[int], Optional[int]]:
+    """Walks the JPEG segments up to the first start-of-frame marker."""
+    index = 2
+    while index + 9 < len(data):
+        if data[index] != 0xFF:
+            index += 1
+            continue
+        marker = data[index + 1]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7: # Markers without a length
+            index += 2
+            continue
+        length = struct.unpack(">H", data[index + 2:index + 4])[0]
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", data[index + 5:index + 9])
+            return width, height
+        index += 2 + length
+    return None, None
+
+
+# --- Fetching ---
+
+def validate_public_url(url: str) -> None:
+    """Raises ImageIngestError unless url is http(s) and its host resolves only to public addresses."""
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ImageIngestError("invalid_url", REASONS["invalid_url"])
+    try:
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        addresses = {info[4][0] for info in socket.getaddrinfo(parsed.hostname, port, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, UnicodeError, ValueError) as e:
+        raise ImageIngestError("network_error", f"{REASONS['network_error']}: cannot resolve host ({e})")
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%", 1)[0]) # Drop IPv6 zone ids
+        if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            metrics.increment("image_ingest.rejected.blocked_url")
+            raise ImageIngestError("blocked_url", REASONS["blocked_url"])
+
+
+def fetch_image_bytes(url: str, max_bytes: int = IMAGE_MAX_BYTES) -> bytes:
+    """
+    Downloads the image body, aborting once it exceeds max_bytes. Redirects are
+    followed manually (up to IMAGE_MAX_REDIRECTS), validating every hop with
+    validate_public_url. Raises ImageIngestError.
+    """
+    try:
+        for _ in range(IMAGE_MAX_REDIRECTS + 1):
+            validate_public_url(url)
+            response = http_session.get("image_fetch", url, stream=True, allow_redirects=False, headers={"Accept": "image/*"})
+            if not response.is_redirect:
+                break
+            url = urljoin(url, response.headers.get("Location", ""))
+            response.close()
+        else:
+            raise ImageIngestError("http_error", f"{REASONS['http_error']}: too many redirects")
+
+        with response:
+            response.raise_for_status()
+            declared = response.headers.get("Content-Length")
+            if declared and declared.isdigit() and int(declared) > max_bytes:
+                raise ImageIngestError("too_large", f"{REASONS['too_large']} ({declared} > {max_bytes} bytes)")
+            chunks, received = [], 0
+            for chunk in response.iter_content(IMAGE_CHUNK_BYTES):
+                received += len(chunk)
+                if received > max_bytes:
+                    raise ImageIngestError("too_large", f"{REASONS['too_large']} (> {max_bytes} bytes)")
+                chunks.append(chunk)
+            return b"".join(chunks)
+    except requests.exceptions.HTTPError as e:
+        raise ImageIngestError("http_error", f"{REASONS['http_error']} {e.response.status_code}")
+    except requests.exceptions.Timeout:
+        raise ImageIngestError("timeout", REASONS["timeout"])
+    except requests.exceptions.RequestException as e:
+        raise ImageIngestError("network_error", f"{REASONS['network_error']}: {e}")
+
+
+def decode_thumbnail(data: bytes, max_dimension: int) -> Optional[Any]:
+    """
+    Decodes the image once (first frame of animations) with its long side at most
+    max_dimension and returns the Pillow image, which triage, re-encoding and
+    hashing all work from. JPEGs are decoded at reduced size directly.
+    Raises ImageIngestError for images above IMAGE_MAX_DECODE_PIXELS (checked from
+    the header, before any pixel is decoded). Returns None if Pillow is unavailable
+    or the image cannot be decoded.
+    """
+    if PILImage is None:
+        return None
+    try:
+        with PILImage.open(io.BytesIO(data)) as image:
+            if image.width * image.height > IMAGE_MAX_DECODE_PIXELS:
+                raise ImageIngestError("too_large", f"{REASONS['too_large']} ({image.width}x{image.height} pixels)")
+            image.draft("RGB", (max_dimension, max_dimension))
+            image.seek(0)
+            thumbnail = image.copy()
+        thumbnail.thumbnail((max_dimension, max_dimension))
+        return thumbnail
+    except ImageIngestError:
+        raise
+    except Exception as e:
+        logging.warning(f"Could not decode image, using original bytes: {e}")
+        return None
+
+
+def encode_thumbnail(thumbnail: Any) -> Tuple[bytes, str]:
+    """Re-encodes a decoded image as PNG if it has transparency and JPEG otherwise. Returns (bytes, mime_type)."""
+    has_alpha = thumbnail.mode in ("RGBA", "LA") or (thumbnail.mode == "P" and "transparency" in thumbnail.info)
+    output = io.BytesIO()
+    if has_alpha:
+        thumbnail.convert("RGBA").save(output, format="PNG", optimize=True)
+        return output.getvalue(), "image/png"
+    thumbnail.convert("RGB").save(output, format="JPEG", quality=IMAGE_JPEG_QUALITY, optimize=True)
+    return output.getvalue(), "image/jpeg"
+
+
+def dhash(thumbnail: Any) -> int:
+    """
+    Returns the 64-bit difference hash of a decoded image: the grayscale image is
+    shrunk to 9x8 pixels and each bit records whether a pixel is brighter than its
+    right neighbour. Rescaled or re-encoded copies land a few bits apart. Crops,
+    mirroring and overlays change most bits, so they are not recognized.
+    """
+    pixels = list(thumbnail.convert("L").resize((DHASH_SIZE + 1, DHASH_SIZE), PILImage.LANCZOS).getdata())
+    value = 0
+    for row in range(DHASH_SIZE):
+        for column in range(DHASH_SIZE):
+            offset = row * (DHASH_SIZE + 1) + column
+            value = value << 1 | (pixels[offset] > pixels[offset + 1])
+    return value
+
+
+def ingest_image(url: str) -> IngestedImage:
+    """Fetches, validates and (if needed) downscales the image at url. Raises ImageIngestError."""
+    data = fetch_image_bytes(url)
+    mime_type = sniff_mime_type(data[:32])
+    if mime_type is None:
+        metrics.increment("image_ingest.rejected.not_image")
+        raise ImageIngestError("not_image", REASONS["not_image"])
+
+    width, height = image_dimensions(data[:IMAGE_CHUNK_BYTES], mime_type)
+    if width is not None and width * height > IMAGE_MAX_DECODE_PIXELS:
+        metrics.increment("image_ingest.rejected.too_large")
+        raise ImageIngestError("too_large", f"{REASONS['too_large']} ({width}x{height} pixels)")
+    metrics.increment("image_ingest.images")
+    metrics.increment("image_ingest.bytes_fetched", len(data))
+
+    # The only pixel decode; triage, re-encoding and hashing share the thumbnail
+    thumbnail = decode_thumbnail(data, IMAGE_MAX_DIMENSION)
+    image = IngestedImage(url, data, mime_type, len(data), width, height, downscaled=False)
+    # Triage on the original bytes: re-encoding would drop EXIF/C2PA metadata
+    image.triage = triage(data, width, height, thumbnail)
+    if image.triage.decision != "analyze":
+        return image # Not sent to the models, so no re-encoding or hashing
+    if thumbnail is not None:
+        oversized = width is None or max(width, height) > IMAGE_MAX_DIMENSION or len(data) > IMAGE_MAX_REQUEST_BYTES
+        if oversized or not image.gemini_compatible:
+            try:
+                content, new_mime_type = encode_thumbnail(thumbnail)
+                if len(content) < len(data) or not image.gemini_compatible:
+                    image.content, image.mime_type = content, new_mime_type
+                    image.width, image.height = thumbnail.size
+                    image.downscaled = True
+            except Exception as e:
+                logging.warning(f"Could not re-encode {mime_type} image, using original bytes: {e}")
+        image.phash = dhash(thumbnail)
+    if len(image.content) > IMAGE_MAX_REQUEST_BYTES:
+        metrics.increment("image_ingest.rejected.too_large")
+        raise ImageIngestError("too_large", f"{REASONS['too_large']} ({len(image.content)} bytes to send, max {IMAGE_MAX_REQUEST_BYTES})")
+
+    metrics.increment("image_ingest.bytes_sent", len(image.content))
+    logging.debug(f"Ingested {url}: {mime_type} {len(data)} bytes -> {image.mime_type} {len(image.content)} bytes "
+                  f"({image.width}x{image.height}, downscaled={image.downscaled})")
+    return image
@@ -0,0 +1,116 @@
+"""
+Offline language detection for article text.
+
+detect() classifies text in two steps, with no network calls:
+1. Script: characters are counted per Unicode script. Scripts used by a single
+   language among those we serve (Bengali, Tamil, Hangul, Thai, ...) decide
+   the language outright.
+2. Stopwords: for Latin, Cyrillic, Devanagari and Arabic text, the share of
+   tokens found in each candidate language's stopword list picks the language.
+
+It returns (language code, confidence in 0..1). Confidence is low for short
+texts and for close stopword scores; callers fall back to Cloud Translation
+detection in that case (see check_text.detect_language).
+"""
+import math
+import unicodedata
+from collections import Counter
+from typing import Dict, Tuple
+
+SAMPLE_CHARS = 4000 # Only the first few KB are inspected
+MIN_LETTERS = 20 # Below this, confidence is scaled down
+
+# Script name (first word of the Unicode character name) -> language, for single-language scripts
+SCRIPT_LANGUAGES = {
+    "BENGALI": "bn", "TAMIL": "ta", "TELUGU": "te", "GUJARATI": "gu", "GURMUKHI": "pa",
+    "KANNADA": "kn", "MALAYALAM": "ml", "ORIYA": "or", "SINHALA": "si", "THAI": "th",
+    "HANGUL": "ko", "HIRAGANA": "ja", "KATAKANA": "ja", "GREEK": "el", "HEBREW": "he",
+    "GEORGIAN": "ka", "ARMENIAN": "hy", "KHMER": "km", "LAO": "lo", "MYANMAR": "my",
+    "ETHIOPIC": "am",
+}
+
+# Scripts shared by several languages -> stopword lists per candidate language
+STOPWORDS: Dict[str, Dict[str, frozenset]] = {
+    "LATIN": {
+        "en": frozenset("the of and to in is that for it was on with as by at from this be are have has not but they said".split()),
+        "es": frozenset("de la que el en los del se las por un para con una su al es lo como más pero sus le ya fue".split()),
+        "fr": frozenset("de la le et les des en un du une est que pour qui dans sur par au pas ce sont avec il elle".split()),
+        "de": frozenset("der die und in den von zu das mit sich des auf für ist im dem nicht ein eine als auch es an".split()),
+        "it": frozenset("di e il la che in un per del della è non una sono le con si da al dei gli anche ha nel".split()),
+        "pt": frozenset("de a o que e do da em um para é com não uma os no se na por mais as dos ao foi pelo".split()),
+        "nl": frozenset("de het een en van in is dat op te zijn met voor niet aan er die ook als bij door werd".split()),
+        "id": frozenset("yang dan di ini itu dengan untuk dari dalam tidak akan pada juga ke karena oleh ada adalah".split()),
+        "tr": frozenset("ve bir bu da de için ile olarak daha çok gibi ama en olan sonra kadar ise değil ne".split()),
+        "sv": frozenset("och att det som en på är av för med till den har inte om ett var de jag men från".split()),
+        "pl": frozenset("i w na z że do się nie to jest o jak po co ale od przez za tak jego oraz".split()),
+        "ro": frozenset("și de la în a cu pe din că care nu o un pentru este mai sunt fost au".split()),
+    },
+    "CYRILLIC": {
+        "ru": frozenset("и в не на что с по как это он к из у за от о для то же был она так его".split()),
+        "uk": frozenset("і в не на що з та як це до у за від про для він вона але її його був також".split()),
+        "bg": frozenset("и на в да се не за от че с е по са като това към но му ще бъде".split()),
+        "sr": frozenset("и у је да се на за од не са као што то из али би они био".split()),
+    },
+    "DEVANAGARI": {
+        "hi": frozenset("के है में की और को से का एक यह पर भी था कि हैं लिए ने तो नहीं हो".split()),
+        "mr": frozenset("आणि आहे या व हे की ते त्या मध्ये होते करण्यात आले असे आहेत ही".split()),
+        "ne": frozenset("र छ को मा पनि गरेको हो भने यो छन् लागि गर्न थियो गरे".split()),
+    },
+    "ARABIC": {
+        "ar": frozenset("في من على أن إلى التي الذي عن ما هذا مع كان هذه قد لا بين".split()),
+        "ur": frozenset("کے ہے میں کی اور کو سے کا یہ پر بھی تھا کہ ہیں نے".split()),
+        "fa": frozenset("و در به از که این را با است برای آن یک شده می تا".split()),
+    },
+    "CJK": {}, # Han without kana: Chinese (see _script_of)
+}
+SHARED_SCRIPT_DEFAULTS = {"LATIN": "en", "CYRILLIC": "ru", "DEVANAGARI": "hi", "ARABIC": "ar", "CJK": "zh"}
+
+_TOKEN_STRIP = "".join(chr(c) for c in range(0x2000, 0x2070)) + "!\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~«»\u0964\u0965\u060c\u061f"
+
+
+def _script_of(char: str) -> str:
+    try:
+        name = unicodedata.name(char)
+    except ValueError:
+        return ""
+    if name.startswith("CJK"):
+        return "CJK"
+    return name.split(" ", 1)[0]
+
+
+def detect(text: str) -> Tuple[str, float]:
+    """Returns (language code, confidence). Falls back to ('en', 0.0) for text without letters."""
+    sample = text[:SAMPLE_CHARS]
+    scripts = Counter(_script_of(char) for char in sample if char.isalpha())
+    letters = sum(scripts.values())
+    if not letters:
+        return "en", 0.0
+    length_factor = min(1.0, letters / MIN_LETTERS)
+
+    script, count = scripts.most_common(1)[0]
+    script_share = count / letters
+    if script == "CJK" and (scripts["HIRAGANA"] + scripts["KATAKANA"]) > 0.05 * letters:
+        return "ja", length_factor * 0.95
+    if script in SCRIPT_LANGUAGES:
+        return SCRIPT_LANGUAGES[script], length_factor * script_share
+    if script not in SHARED_SCRIPT_DEFAULTS:
+        return "en", 0.0
+
+    candidates = STOPWORDS.get(script, {})
+    # Split on whitespace rather than \w+, which would break words at Indic combining vowel signs
+    tokens = [token for token in (word.strip(_TOKEN_STRIP).casefold() for word in sample.split()) if token]
+    if not candidates or not tokens:
+        return SHARED_SCRIPT_DEFAULTS[script], length_factor * script_share * (0.9 if not candidates else 0.3)
+
+    scores = sorted(
+        ((sum(1 for token in tokens if token in words) / len(tokens), language) for language, words in candidates.items()),
+        reverse=True
+    )
+    (best_score, best_language), (second_score, _) = scores[0], scores[1]
+    if best_score == 0:
+        return SHARED_SCRIPT_DEFAULTS[script], 0.2 * length_factor
+    # Confident when stopwords are frequent and clearly ahead of the runner-up
+    margin = math.sqrt((best_score - second_score) / best_score)
+    coverage = min(1.0, best_score / 0.15) # Typical running text is 20-50% stopwords
+    token_factor = min(1.0, len(tokens) / 15)
+    return best_language, round(script_share * margin * coverage * token_factor, 3)
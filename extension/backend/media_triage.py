@@ -0,0 +1,141 @@
+"""
+Cheap local triage of images before paid media analysis.
+
+Many images the extension submits are logos, avatars, tracking pixels or UI
+sprites, and some carry provenance metadata that already answers the
+question. triage() looks only at the ingested bytes (no network calls) and
+returns a TriageResult whose decision is one of:
+- "skip": not worth analyzing: too small (icons, avatars, tracking pixels),
+  extreme aspect ratio (banners, dividers, sprites), or small AND low in pixel
+  entropy (logos, badges). Low entropy alone never skips an image: large
+  screenshots of posts, headlines or charts are mostly flat background with
+  thin text and are exactly what needs checking;
+- "provenance": the image's own XMP packet declares an IPTC DigitalSourceType
+  of "trainedAlgorithmicMedia" (AI-generated) or
+  "compositeWithTrainedAlgorithmicMedia" (a capture edited with generative AI,
+  reported as edited, not generated); or, with TRIAGE_TRUST_C2PA enabled, the
+  image carries a C2PA manifest. Only the DigitalSourceType value of the first
+  XMP packet is read: marker bytes elsewhere in the file (e.g. inside C2PA
+  ingredient manifests) do not count. Neither XMP nor manifest signatures are
+  verified here, which is why an unverified "authentic" manifest is not
+  trusted by default;
+- "analyze": everything else, escalated to Vision + Gemini.
+
+Pixel entropy needs the thumbnail image_ingest decodes with Pillow; without
+it, compressed bytes per pixel are used as a proxy for visual complexity.
+"""
+import os
+import re
+import math
+import logging
+from typing import Any, Dict, Optional
+
+# --- Configuration ---
+TRIAGE_ENABLED = os.getenv("TRIAGE_ENABLED", "true").lower() == "true"
+TRIAGE_MIN_DIMENSION = int(os.getenv("TRIAGE_MIN_DIMENSION", "64")) # Pixels, shorter side
+TRIAGE_MIN_PIXELS = int(os.getenv("TRIAGE_MIN_PIXELS", str(100 * 100)))
+TRIAGE_MIN_BYTES = 1024 # Tracking pixels and spacers are a few dozen bytes
+TRIAGE_MAX_ASPECT_RATIO = float(os.getenv("TRIAGE_MAX_ASPECT_RATIO", "4.0"))
+TRIAGE_MIN_ENTROPY = 3.0 # Bits of grayscale histogram entropy (max 8); photos are usually above 6
+TRIAGE_LOGO_MAX_DIMENSION = int(os.getenv("TRIAGE_LOGO_MAX_DIMENSION", "300")) # Low entropy only skips images up to this long side
+TRIAGE_MIN_BYTES_PER_PIXEL = 0.015 # Used instead of entropy without Pillow
+TRIAGE_TRUST_C2PA = os.getenv("TRIAGE_TRUST_C2PA", "false").lower() == "true"
+HEADER_SCAN_BYTES = 128 * 1024 # EXIF lives in the first segments
+
+# IPTC digital source types (http://cv.iptc.org/newscodes/digitalsourcetype/) for generative AI output
+SOURCE_TYPE_AI_GENERATED = "trainedAlgorithmicMedia"
+SOURCE_TYPE_AI_EDITED = "compositeWithTrainedAlgorithmicMedia"
+XMP_PACKET_PATTERN = re.compile(rb"<x:xmpmeta\b.*?</x:xmpmeta>", re.DOTALL)
+# Attribute (DigitalSourceType="..."), element (<...:DigitalSourceType>...<) and rdf:resource forms
+DIGITAL_SOURCE_TYPE_PATTERN = re.compile(
+    rb"""DigitalSourceType(?:\s*=\s*["']|\s*>\s*|\s+rdf:resource\s*=\s*["'])([^"'<>\s]+)"""
+)
+C2PA_MARKERS = (b"jumb", b"c2pa") # JUMBF superbox type and C2PA manifest store label; both must be present
+
+
+class TriageResult:
+    """Outcome of triage(); `signals` holds the measurements behind the decision."""
+
+    def __init__(self, decision: str, reason: str, signals: Dict[str, Any]):
+        self.decision = decision
+        self.reason = reason
+        self.signals = signals
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"decision": self.decision, "reason": self.reason, "signals": self.signals}
+
+
+def read_digital_source_type(data: bytes) -> Optional[str]:
+    """Returns the IPTC DigitalSourceType code (last URI segment) declared in the image's first XMP packet, or None."""
+    packet = XMP_PACKET_PATTERN.search(data)
+    if packet is None:
+        return None
+    match = DIGITAL_SOURCE_TYPE_PATTERN.search(packet.group(0))
+    if match is None:
+        return None
+    return match.group(1).decode("ascii", "replace").rstrip("/").rsplit("/", 1)[-1]
+
+
+def read_provenance(data: bytes) -> Dict[str, Any]:
+    """Scans the raw (not re-encoded) image bytes for EXIF, a C2PA manifest and the XMP DigitalSourceType."""
+    return {
+        "exif": b"Exif\x00\x00" in data[:HEADER_SCAN_BYTES] or b"eXIf" in data[:HEADER_SCAN_BYTES],
+        "c2pa": all(marker in data for marker in C2PA_MARKERS),
+        "digital_source_type": read_digital_source_type(data),
+    }
+
+
+def grayscale_entropy(thumbnail: Any) -> Optional[float]:
+    """Shannon entropy (bits) of the grayscale histogram of a decoded image (see image_ingest.decode_thumbnail)."""
+    try:
+        histogram = thumbnail.convert("L").histogram()
+    except Exception as e:
+        logging.warning(f"Could not compute image entropy: {e}")
+        return None
+    total = sum(histogram)
+    if not total:
+        return None
+    return -sum(count / total * math.log2(count / total) for count in histogram if count)
+
+
+def triage(data: bytes, width: Optional[int], height: Optional[int], thumbnail: Any = None) -> TriageResult:
+    """
+    Triages an image from its original bytes and header dimensions (see module
+    docstring). `thumbnail` is the decoded image from image_ingest, if available.
+    """
+    signals: Dict[str, Any] = {"bytes": len(data), "width": width, "height": height}
+    signals.update(read_provenance(data))
+    if not TRIAGE_ENABLED:
+        return TriageResult("analyze", "triage_disabled", signals)
+
+    if signals["digital_source_type"] == SOURCE_TYPE_AI_GENERATED:
+        return TriageResult("provenance", "ai_generated_metadata", signals)
+    if signals["digital_source_type"] == SOURCE_TYPE_AI_EDITED:
+        return TriageResult("provenance", "ai_edited_metadata", signals)
+    if signals["c2pa"] and TRIAGE_TRUST_C2PA:
+        return TriageResult("provenance", "c2pa_manifest", signals)
+
+    if len(data) < TRIAGE_MIN_BYTES:
+        return TriageResult("skip", "too_small", signals)
+    if (not width or not height) and thumbnail is not None:
+        width, height = thumbnail.size # Header not parsed; close enough for the size checks below
+    if width and height:
+        signals["aspect_ratio"] = round(max(width, height) / min(width, height), 2)
+        if min(width, height) < TRIAGE_MIN_DIMENSION or width * height < TRIAGE_MIN_PIXELS:
+            return TriageResult("skip", "too_small", signals)
+        if signals["aspect_ratio"] > TRIAGE_MAX_ASPECT_RATIO:
+            return TriageResult("skip", "extreme_aspect_ratio", signals)
+
+    # Flat and small: a logo or badge. Large flat images (screenshots, charts) are escalated.
+    if width and height and max(width, height) <= TRIAGE_LOGO_MAX_DIMENSION:
+        entropy = grayscale_entropy(thumbnail) if thumbnail is not None else None
+        if entropy is not None:
+            signals["entropy"] = round(entropy, 2)
+            if entropy < TRIAGE_MIN_ENTROPY:
+                return TriageResult("skip", "low_entropy", signals)
+        else:
+            signals["bytes_per_pixel"] = round(len(data) / (width * height), 4)
+            if signals["bytes_per_pixel"] < TRIAGE_MIN_BYTES_PER_PIXEL:
+                return TriageResult("skip", "low_entropy", signals)
+
+    return TriageResult("analyze", "candidate", signals)
@@ -0,0 +1,43 @@
+"""
+Minimal in-process metrics for the TruthScope backends.
+
+Counters and timing observations are kept in memory per process and exposed
+through the health-check ('/') endpoints of check_text.py and check_media.py.
+"""
+import threading
+from collections import defaultdict
+from typing import Dict, Any
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = defaultdict(int)
+_observations: Dict[str, Dict[str, float]] = {}
+
+
+def increment(name: str, value: float = 1) -> None:
+    """Adds `value` to the named counter."""
+    with _lock:
+        _counters[name] += value
+
+
+def observe(name: str, value: float) -> None:
+    """Records one observation (e.g. a duration in seconds) for the named metric."""
+    with _lock:
+        stats = _observations.get(name)
+        if stats is None:
+            stats = _observations[name] = {"count": 0, "total": 0.0, "max": 0.0}
+        stats["count"] += 1
+        stats["total"] += value
+        stats["max"] = max(stats["max"], value)
+
+
+def snapshot() -> Dict[str, Any]:
+    """Returns a JSON-serializable copy of all counters and observations."""
+    with _lock:
+        observations = {}
+        for name, stats in _observations.items():
+            observations[name] = {
+                "count": stats["count"],
+                "avg": stats["total"] / stats["count"] if stats["count"] else 0.0,
+                "max": stats["max"],
+            }
+        return {"counters": dict(_counters), "observations": observations}
@@ -0,0 +1,119 @@
+"""
+Process-wide registry of Gemini model handles and generation configs.
+
+Both services used to build their own GenerativeModel and GenerationConfig
+(check_text.py once per analysis). The registry creates each GenerationConfig
+once per profile and each GenerativeModel once per (model, profile, system
+instruction), with the config attached to the model, so request paths only
+look handles up.
+
+Models are chosen per endpoint from the environment, falling back to
+GEMINI_MODEL:
+    GEMINI_MODEL_TEXT, GEMINI_MODEL_IMAGE, GEMINI_MODEL_VIDEO, GEMINI_MODEL_AUDIO
+e.g. GEMINI_MODEL_AUDIO=gemini-2.5-flash-lite for cheaper audio triage.
+warm() creates the handles for a list of endpoints at startup.
+"""
+import os
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from vertexai.generative_models import GenerativeModel, GenerationConfig
+except ImportError:
+    GenerativeModel = None
+    GenerationConfig = None
+
+from response_parsing import TEXT_RESULT_RESPONSE_SCHEMA
+
+# --- Configuration ---
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+
+# Endpoint -> generation profile used for its calls
+ENDPOINT_PROFILES = {
+    "text": "analysis",
+    "image": "media",
+    "video": "media",
+    "audio": "media",
+}
+
+GENERATION_PROFILES: Dict[str, Dict[str, Any]] = {
+    "analysis": {
+        "temperature": 0.2,
+        "top_p": 0.95,
+        "top_k": 40,
+        "max_output_tokens": 8192,
+        "response_mime_type": "application/json",
+        "response_schema": TEXT_RESULT_RESPONSE_SCHEMA, # Constrained decoding of the textResult shape
+    },
+    "media": {
+        "temperature": 0.2,
+        "top_p": 0.95,
+        "top_k": 40,
+        "max_output_tokens": 8192,
+    },
+}
+
+
+def model_name_for(endpoint: str) -> str:
+    """Returns the model configured for the endpoint (GEMINI_MODEL_<ENDPOINT>, else GEMINI_MODEL)."""
+    return os.getenv(f"GEMINI_MODEL_{endpoint.upper()}", GEMINI_MODEL)
+
+
+class ModelRegistry:
+    """Thread-safe cache of GenerationConfig and GenerativeModel objects."""
+
+    def __init__(self):
+        self._configs: Dict[str, Any] = {}
+        self._models: Dict[Tuple[str, str, Optional[str]], Any] = {}
+        self._lock = threading.Lock()
+
+    def generation_config(self, profile: str) -> Any:
+        """Returns the shared GenerationConfig for a profile in GENERATION_PROFILES."""
+        with self._lock:
+            config = self._configs.get(profile)
+            if config is None:
+                if GenerationConfig is None:
+                    raise ImportError("GenerationConfig not available. Install: pip install google-cloud-aiplatform")
+                config = self._configs[profile] = GenerationConfig(**GENERATION_PROFILES[profile])
+            return config
+
+    def model(self, model_name: str, profile: str, system_instruction: Optional[str] = None) -> Any:
+        """Returns the shared GenerativeModel for (model_name, profile, system_instruction)."""
+        key = (model_name, profile, system_instruction)
+        config = self.generation_config(profile)
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                if GenerativeModel is None:
+                    raise ImportError("GenerativeModel not available. Install: pip install google-cloud-aiplatform")
+                model = self._models[key] = GenerativeModel(
+                    model_name,
+                    generation_config=config,
+                    system_instruction=system_instruction
+                )
+                logging.info(f"Created Gemini model handle '{model_name}' (profile '{profile}').")
+            return model
+
+    def for_endpoint(self, endpoint: str, system_instruction: Optional[str] = None) -> Any:
+        """Returns the model handle for an endpoint in ENDPOINT_PROFILES."""
+        return self.model(model_name_for(endpoint), ENDPOINT_PROFILES[endpoint], system_instruction)
+
+    def warm(self, endpoints: List[str]) -> None:
+        """Creates the handles for the given endpoints ahead of the first request."""
+        for endpoint in endpoints:
+            try:
+                self.for_endpoint(endpoint)
+            except Exception as e:
+                logging.error(f"Could not warm Gemini model for endpoint '{endpoint}': {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "models": sorted({f"{name}:{profile}" for name, profile, _ in self._models}),
+                "endpoints": {endpoint: model_name_for(endpoint) for endpoint in ENDPOINT_PROFILES},
+            }
+
+
+# Shared instance used by check_text.py and check_media.py
+registry = ModelRegistry()
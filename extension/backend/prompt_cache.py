@@ -0,0 +1,119 @@
+"""
+Static prompt prefixes (system instructions) for Gemini calls.
+
+The analysis system instruction is identical for every article. PromptPrefix
+decides how it reaches the model, selected with PROMPT_CACHE_MODE:
+- "inline": prepended to every prompt (the original behaviour);
+- "system": registered once as the model's system_instruction, so per-request
+  prompts carry only the article and its evidence;
+- "cached": stored once as Vertex AI cached content (context caching), so its
+  input tokens are billed at the cached rate. The cache entry is re-created
+  shortly before it expires. If it cannot be created (e.g. the instruction is
+  below the model's minimum cacheable size) the prefix falls back to "system".
+
+record_usage() reports per-call token counts and latency to metrics so the
+modes can be compared ('gemini.<name>.prompt_tokens', '...cached_tokens',
+'...output_tokens', '...latency_seconds').
+"""
+import os
+import logging
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+try:
+    from vertexai.generative_models import GenerativeModel, Content, Part
+    from vertexai.preview import caching
+except ImportError:
+    GenerativeModel = None
+    caching = None
+
+import metrics
+from model_registry import registry, model_name_for, ENDPOINT_PROFILES
+
+# --- Configuration ---
+PROMPT_CACHE_MODE = os.getenv("PROMPT_CACHE_MODE", "system") # "inline", "system" or "cached"
+PROMPT_CACHE_TTL_SECONDS = int(os.getenv("PROMPT_CACHE_TTL_SECONDS", "3600"))
+PROMPT_CACHE_REFRESH_MARGIN_SECONDS = 300 # Re-create the cached content this long before it expires
+
+PROMPT_CACHE_MODES = ("inline", "system", "cached")
+
+
+class PromptPrefix:
+    """Model handle (from the model registry) plus prompt builder for one static instruction."""
+
+    def __init__(self, name: str, endpoint: str, instruction: str, mode: str = PROMPT_CACHE_MODE):
+        if mode not in PROMPT_CACHE_MODES:
+            logging.warning(f"Unknown PROMPT_CACHE_MODE '{mode}', using 'system'.")
+            mode = "system"
+        self.name = name
+        self.model_name = model_name_for(endpoint)
+        self.profile = ENDPOINT_PROFILES[endpoint]
+        self.instruction = instruction
+        self.mode = mode
+        self._model = None
+        self._cached_content = None
+        self._cache_expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def model(self) -> Any:
+        """Returns the GenerativeModel to call, (re)creating the cached content when due."""
+        with self._lock:
+            if self.mode == "cached" and time.monotonic() >= self._cache_expires_at - PROMPT_CACHE_REFRESH_MARGIN_SECONDS:
+                self._model = self._create_cached_model()
+            if self._model is None:
+                system_instruction = None if self.mode == "inline" else self.instruction
+                self._model = registry.model(self.model_name, self.profile, system_instruction)
+            return self._model
+
+    def build_prompt(self, body: str) -> str:
+        """Returns the per-request prompt: the body alone, or prefixed with the instruction in inline mode."""
+        if self.mode == "inline":
+            return f"{self.instruction}\n\n{body}"
+        return body
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "model": self.model_name,
+            "instruction_chars": len(self.instruction),
+            "cached_content": getattr(self._cached_content, "resource_name", None),
+        }
+
+    def _create_cached_model(self) -> Optional[Any]:
+        """Creates a fresh cached-content entry. On failure switches this prefix to "system" mode."""
+        try:
+            if caching is None:
+                raise ImportError("vertexai.preview.caching not available")
+            cached_content = caching.CachedContent.create(
+                model_name=self.model_name,
+                system_instruction=Content(role="system", parts=[Part.from_text(self.instruction)]),
+                ttl=timedelta(seconds=PROMPT_CACHE_TTL_SECONDS),
+                display_name=f"truthscope-{self.name}"
+            )
+        except Exception as e:
+            logging.warning(f"Could not create cached content for '{self.name}', using a system instruction instead: {e}")
+            self.mode = "system"
+            return None
+
+        # The previous entry is left to expire on its own; in-flight calls may still reference it
+        self._cached_content = cached_content
+        self._cache_expires_at = time.monotonic() + PROMPT_CACHE_TTL_SECONDS
+        metrics.increment(f"prompt_cache.{self.name}.creates")
+        logging.info(f"Created cached content '{cached_content.resource_name}' for '{self.name}'.")
+        return GenerativeModel.from_cached_content(
+            cached_content=cached_content,
+            generation_config=registry.generation_config(self.profile)
+        )
+
+
+def record_usage(name: str, response: Any, started: float) -> None:
+    """Records token counts from response.usage_metadata and the call latency since `started` (monotonic)."""
+    metrics.observe(f"gemini.{name}.latency_seconds", time.monotonic() - started)
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    metrics.observe(f"gemini.{name}.prompt_tokens", getattr(usage, "prompt_token_count", 0) or 0)
+    metrics.observe(f"gemini.{name}.cached_tokens", getattr(usage, "cached_content_token_count", 0) or 0)
+    metrics.observe(f"gemini.{name}.output_tokens", getattr(usage, "candidates_token_count", 0) or 0)
@@ -0,0 +1,182 @@
+"""
+TTL cache for external query results (Google Custom Search, Fact Check Tools).
+
+Readers of the same story produce the same search and fact-check queries, and
+both APIs are slow and quota-limited. QueryCache stores results under a
+namespace plus a hash of the normalized query text, with a TTL chosen per
+namespace by the caller.
+
+Two backends are available, selected with QUERY_CACHE_BACKEND:
+- "memory": a per-process LRU (MemoryLRUBackend);
+- "postgres": the QUERY_CACHE_TABLE table (PostgresBackend), so hits are shared
+  between gunicorn workers and Cloud Run instances.
+
+Hits and misses are counted per namespace in metrics ('query_cache.<ns>.hits'
+and 'query_cache.<ns>.misses') and summarized by QueryCache.stats().
+"""
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import metrics
+
+# --- Configuration ---
+QUERY_CACHE_BACKEND = os.getenv("QUERY_CACHE_BACKEND", "memory") # "memory" or "postgres"
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "4096"))
+QUERY_CACHE_TABLE = "query_cache"
+QUERY_CACHE_PURGE_EVERY_WRITES = 500 # Postgres backend deletes expired rows every N writes
+
+
+def normalize_query(query: str) -> str:
+    """Case-folds, strips punctuation and collapses whitespace so trivially different queries share an entry."""
+    text = unicodedata.normalize("NFKC", query).casefold()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def make_cache_key(namespace: str, query: str) -> str:
+    digest = hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+class MemoryLRUBackend:
+    """Per-process, thread-safe LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int = QUERY_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class PostgresBackend:
+    """
+    Stores entries in QUERY_CACHE_TABLE (see db.sql). Connections are borrowed
+    through the service's get_connection / release_connection functions.
+    Database errors are logged and treated as misses.
+    """
+
+    def __init__(self, get_connection: Callable[[], Any], release_connection: Callable[[Any], None]):
+        self._get_connection = get_connection
+        self._release_connection = release_connection
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT result_json FROM {QUERY_CACHE_TABLE} WHERE cache_key = %s AND expires_at > NOW()",
+                (key,)
+            )
+            row = cursor.fetchone()
+            cursor.close()
+            if not row:
+                return False, None
+            value = row[0]
+            if isinstance(value, str): # JSONB is usually decoded by the driver already
+                value = json.loads(value)
+            return True, value
+        except Exception as e:
+            logging.warning(f"Query cache read failed for '{key}': {e}")
+            return False, None
+        finally:
+            if conn:
+                self._release_connection(conn)
+
+    def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        with self._lock:
+            self._writes += 1
+            purge = self._writes % QUERY_CACHE_PURGE_EVERY_WRITES == 0
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                INSERT INTO {QUERY_CACHE_TABLE} (cache_key, result_json, expires_at)
+                VALUES (%s, %s, NOW() + (%s * INTERVAL '1 second'))
+                ON CONFLICT (cache_key) DO UPDATE SET
+                    result_json = EXCLUDED.result_json,
+                    expires_at = EXCLUDED.expires_at;
+                """,
+                (key, json.dumps(value), ttl_seconds)
+            )
+            if purge:
+                cursor.execute(f"DELETE FROM {QUERY_CACHE_TABLE} WHERE expires_at <= NOW()")
+            conn.commit()
+            cursor.close()
+        except Exception as e:
+            logging.warning(f"Query cache write failed for '{key}': {e}")
+        finally:
+            if conn:
+                self._release_connection(conn)
+
+
+def create_backend(name: str, get_connection: Optional[Callable[[], Any]] = None,
+                   release_connection: Optional[Callable[[Any], None]] = None):
+    """Returns the backend selected by `name` ("memory" or "postgres")."""
+    if name == "postgres":
+        if get_connection is None or release_connection is None:
+            raise ValueError("The postgres query cache backend needs connection functions.")
+        return PostgresBackend(get_connection, release_connection)
+    if name != "memory":
+        logging.warning(f"Unknown QUERY_CACHE_BACKEND '{name}', using the in-memory LRU.")
+    return MemoryLRUBackend()
+
+
+class QueryCache:
+    """Namespaced query -> result cache with per-call TTLs and hit/miss metrics."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._namespaces = set()
+
+    def get(self, namespace: str, query: str) -> Tuple[bool, Any]:
+        """Returns (hit, value). A hit may carry a falsy value such as [] or None."""
+        self._namespaces.add(namespace)
+        hit, value = self.backend.get(make_cache_key(namespace, query))
+        metrics.increment(f"query_cache.{namespace}.{'hits' if hit else 'misses'}")
+        return hit, value
+
+    def set(self, namespace: str, query: str, value: Any, ttl_seconds: float) -> None:
+        if ttl_seconds <= 0:
+            return
+        self.backend.set(make_cache_key(namespace, query), value, ttl_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        counters = metrics.snapshot()["counters"]
+        stats: Dict[str, Any] = {"backend": type(self.backend).__name__}
+        for namespace in sorted(self._namespaces):
+            hits = counters.get(f"query_cache.{namespace}.hits", 0)
+            misses = counters.get(f"query_cache.{namespace}.misses", 0)
+            total = hits + misses
+            stats[namespace] = {"hits": hits, "misses": misses, "hit_rate": hits / total if total else 0.0}
+        return stats
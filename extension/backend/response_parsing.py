@@ -0,0 +1,308 @@
+"""
+Parsing and validation of Gemini JSON responses.
+
+Model output is decoded in a single pass (code fences and any text around the
+JSON object are skipped by json.JSONDecoder.raw_decode) and checked against a
+schema compiled once at import time. Validation repairs what it can without
+another model call:
+- missing optional fields get their defaults;
+- scores given as "85%", "0.85" or 85 become 0.85 (clamped to 0..1);
+- single strings where lists are expected become one-item lists;
+- label synonyms ("fake", "credible", ...) map to LABEL_1 / LABEL_0.
+Unknown fields are kept as-is.
+
+Only responses that are not JSON objects, or that lack a required field that
+cannot be repaired, raise ResponseParseError. Every parse is counted in
+metrics under 'response_parsing.<schema>.' + 'ok', 'repaired' or
+'failures.<reason>'.
+"""
+import json
+import math
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import metrics
+
+_decoder = json.JSONDecoder()
+_MISSING = object()
+
+
+class ResponseParseError(Exception):
+    """Raised when model output cannot be turned into a valid result. `reason` is a short metric-safe code."""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+# --- Coercions ---
+# Each takes a raw value and returns (value, repaired); raising ValueError means "use the default"
+
+def _score(value: Any) -> Tuple[float, bool]:
+    if isinstance(value, bool):
+        raise ValueError("boolean is not a score")
+    repaired = False
+    if isinstance(value, str):
+        text = value.strip()
+        percent = text.endswith("%")
+        value = float(text.rstrip("%"))
+        if percent:
+            value /= 100
+        repaired = True
+    value = float(value)
+    if math.isnan(value):
+        raise ValueError("NaN score")
+    if 1 < value <= 100: # Percentages given as numbers
+        value, repaired = value / 100, True
+    clamped = min(max(value, 0.0), 1.0)
+    return clamped, repaired or clamped != value
+
+
+def _string(value: Any) -> Tuple[str, bool]:
+    if value is None:
+        raise ValueError("null string")
+    if isinstance(value, str):
+        return value, False
+    if isinstance(value, list):
+        return "\n".join(str(item) for item in value), True
+    return str(value), True
+
+
+def _string_list(value: Any) -> Tuple[List[str], bool]:
+    if value is None:
+        raise ValueError("null list")
+    if isinstance(value, str):
+        return ([value] if value else []), True
+    if not isinstance(value, list):
+        return [str(value)], True
+    repaired = any(not isinstance(item, str) for item in value)
+    return [item if isinstance(item, str) else json.dumps(item) if isinstance(item, (dict, list)) else str(item)
+            for item in value], repaired
+
+
+def _choice(choices: Dict[str, str]) -> Callable[[Any], Tuple[str, bool]]:
+    """Maps case-insensitive synonyms onto canonical values; `choices` is synonym -> canonical."""
+    def coerce(value: Any) -> Tuple[str, bool]:
+        canonical = choices.get(str(value).strip().lower())
+        if canonical is None:
+            raise ValueError(f"unexpected value {value!r}")
+        return canonical, canonical != value
+    return coerce
+
+
+class Field:
+    """One schema field: a coercion plus either a default or required=True."""
+
+    def __init__(self, coerce: Callable[[Any], Tuple[Any, bool]], default: Any = None, required: bool = False):
+        self.coerce = coerce
+        self.default = default
+        self.required = required
+
+
+class Schema:
+    """Compiled object schema; also usable as a Field coercion for nested objects."""
+
+    def __init__(self, name: str, fields: Dict[str, Field]):
+        self.name = name
+        self.fields = fields
+
+    def __call__(self, value: Any) -> Tuple[Dict[str, Any], bool]:
+        if not isinstance(value, dict):
+            raise ValueError(f"{self.name} must be an object")
+        result = dict(value)
+        repaired = False
+        for key, field in self.fields.items():
+            raw = value.get(key, _MISSING)
+            if raw is not _MISSING:
+                try:
+                    result[key], field_repaired = field.coerce(raw)
+                    repaired = repaired or field_repaired
+                    continue
+                except (ValueError, TypeError) as e:
+                    logging.debug(f"Invalid '{self.name}.{key}' in model response: {e}")
+            if field.required:
+                raise ValueError(f"missing or invalid required field '{self.name}.{key}'")
+            result[key] = _fresh(field.default)
+            repaired = True
+        return result, repaired
+
+
+def list_of(schema: Schema) -> Callable[[Any], Tuple[List[Dict[str, Any]], bool]]:
+    """Coercion for a list of objects; invalid items are dropped."""
+    def coerce(value: Any) -> Tuple[List[Dict[str, Any]], bool]:
+        if not isinstance(value, list):
+            raise ValueError(f"expected a list of {schema.name}")
+        items, repaired = [], False
+        for item in value:
+            try:
+                item, item_repaired = schema(item)
+            except ValueError:
+                repaired = True
+                continue
+            items.append(item)
+            repaired = repaired or item_repaired
+        return items, repaired
+    return coerce
+
+
+def _fresh(default: Any) -> Any:
+    """Copies mutable defaults so results never share them."""
+    return json.loads(json.dumps(default)) if isinstance(default, (dict, list)) else default
+
+
+# --- Schemas ---
+
+SENTIMENT_SCHEMA = Schema("sentiment", {
+    "label": Field(_choice({"positive": "positive", "negative": "negative", "neutral": "neutral", "mixed": "neutral"}), "neutral"),
+    "score": Field(_score, 0.5),
+})
+
+BIAS_SCHEMA = Schema("bias", {
+    "summary": Field(_string, ""),
+    "indicators": Field(_string_list, []),
+})
+
+FACT_CHECK_ENTRY_SCHEMA = Schema("fact_check", {
+    "source": Field(_string, ""),
+    "title": Field(_string, ""),
+    "url": Field(_string, ""),
+    "claim": Field(_string, ""),
+    "rating": Field(_string, ""),
+})
+
+LOCALIZED_SUMMARY_SCHEMA = Schema("localized_summary", {
+    "reasoning": Field(_string, ""),
+    "educational_insights": Field(_string, ""),
+})
+
+TEXT_RESULT_SCHEMA = Schema("textResult", {
+    "label": Field(_choice({
+        "label_0": "LABEL_0", "0": "LABEL_0", "real": "LABEL_0", "credible": "LABEL_0",
+        "label_1": "LABEL_1", "1": "LABEL_1", "fake": "LABEL_1", "misleading": "LABEL_1",
+    }), required=True),
+    "score": Field(_score, required=True),
+    "sentiment": Field(SENTIMENT_SCHEMA, {"label": "neutral", "score": 0.5}),
+    "bias": Field(BIAS_SCHEMA, {"summary": "", "indicators": []}),
+    "highlights": Field(_string_list, []),
+    "reasoning": Field(_string_list, []),
+    "educational_insights": Field(_string_list, []),
+    "fact_check": Field(list_of(FACT_CHECK_ENTRY_SCHEMA), []),
+    "localized_summary": Field(LOCALIZED_SUMMARY_SCHEMA, {"reasoning": "", "educational_insights": ""}),
+})
+
+# Constrained-decoding schema passed to Gemini (GenerationConfig.response_schema, OpenAPI subset).
+# Mirrors TEXT_RESULT_SCHEMA; keep the two in sync.
+_STRING = {"type": "STRING"}
+_STRING_ARRAY = {"type": "ARRAY", "items": _STRING}
+_SCORE = {"type": "NUMBER", "minimum": 0, "maximum": 1}
+
+TEXT_RESULT_RESPONSE_SCHEMA: Dict[str, Any] = {
+    "type": "OBJECT",
+    "properties": {
+        "textResult": {
+            "type": "OBJECT",
+            "properties": {
+                "label": {"type": "STRING", "enum": ["LABEL_0", "LABEL_1"]},
+                "score": _SCORE,
+                "sentiment": {
+                    "type": "OBJECT",
+                    "properties": {
+                        "label": {"type": "STRING", "enum": ["positive", "negative", "neutral"]},
+                        "score": _SCORE,
+                    },
+                    "required": ["label", "score"],
+                },
+                "bias": {
+                    "type": "OBJECT",
+                    "properties": {"summary": _STRING, "indicators": _STRING_ARRAY},
+                    "required": ["summary", "indicators"],
+                },
+                "highlights": _STRING_ARRAY,
+                "reasoning": _STRING_ARRAY,
+                "educational_insights": _STRING_ARRAY,
+                "fact_check": {
+                    "type": "ARRAY",
+                    "items": {
+                        "type": "OBJECT",
+                        "properties": {key: _STRING for key in ("source", "title", "url", "claim", "rating")},
+                        "required": ["source", "title", "url", "claim", "rating"],
+                    },
+                },
+                "localized_summary": {
+                    "type": "OBJECT",
+                    "properties": {"reasoning": _STRING, "educational_insights": _STRING},
+                    "required": ["reasoning", "educational_insights"],
+                },
+            },
+            "required": list(TEXT_RESULT_SCHEMA.fields),
+        },
+    },
+    "required": ["textResult"],
+}
+
+IMAGE_ANALYSIS_SCHEMA = Schema("image", {
+    "ai_generated_score": Field(_score, 0.0),
+    "description": Field(_string, ""),
+    "manipulation_indicators": Field(_string_list, []),
+    "context_analysis": Field(_string, ""),
+})
+
+VIDEO_ANALYSIS_SCHEMA = Schema("video", {
+    "manipulation_score": Field(_score, 0.0),
+    "deepfake_indicators": Field(_string_list, []),
+    "audio_visual_consistency": Field(_string, ""),
+    "content_summary": Field(_string, ""),
+    "credibility_assessment": Field(_string, ""),
+})
+
+AUDIO_ANALYSIS_SCHEMA = Schema("audio", {
+    "scam_score": Field(_score, 0.0),
+    "scam_indicators": Field(_string_list, []),
+    "deceptive_tactics": Field(_string_list, []),
+    "transcription_summary": Field(_string, ""),
+    "credibility_assessment": Field(_string, ""),
+})
+
+
+# --- Parsing ---
+
+def decode_json_object(text: str) -> Dict[str, Any]:
+    """Decodes the first JSON object in the text, skipping code fences and surrounding prose."""
+    start = text.find("{")
+    if start == -1:
+        raise ResponseParseError("no_json", "Response contains no JSON object.")
+    try:
+        value, _ = _decoder.raw_decode(text, start)
+    except json.JSONDecodeError as e:
+        raise ResponseParseError("invalid_json", f"JSON parse error: {e.msg} at position {e.pos}")
+    return value
+
+
+def parse_model_json(schema: Schema, text: Optional[str], wrapper_key: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Decodes model output and validates it against `schema`. If `wrapper_key` is given
+    the object is expected under that key (e.g. "textResult") and a bare object is
+    accepted as its content; the result is returned wrapped the same way.
+    Raises ResponseParseError on failure.
+    """
+    try:
+        if not text:
+            raise ResponseParseError("empty", "Response is empty.")
+        value = decode_json_object(text)
+        if wrapper_key is not None and isinstance(value.get(wrapper_key), dict):
+            wrapper, value = value, value[wrapper_key]
+        else:
+            wrapper = {}
+        try:
+            result, repaired = schema(value)
+        except ValueError as e:
+            raise ResponseParseError("missing_required", str(e))
+    except ResponseParseError as e:
+        metrics.increment(f"response_parsing.{schema.name}.failures.{e.reason}")
+        logging.warning(f"Could not parse {schema.name} response ({e.reason}): {e}")
+        raise
+
+    metrics.increment(f"response_parsing.{schema.name}.{'repaired' if repaired else 'ok'}")
+    if wrapper_key is None:
+        return result
+    return {**wrapper, wrapper_key: result}
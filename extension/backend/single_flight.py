@@ -0,0 +1,123 @@
+"""
+Request coalescing ("single flight") for expensive analyses.
+
+When many users request the same analysis at once, the first caller for a key
+(the leader) runs the work and concurrent callers with the same key wait for
+its result instead of starting their own model call. A waiter that has not
+received a result after `wait_timeout` seconds, or whose leader failed, falls
+back to running the work itself.
+
+Used by check_text.py (key: URL + article text hash) and check_media.py
+(key: media type + URL). AsyncSingleFlight is the asyncio equivalent used by
+check_text_async.py.
+"""
+import os
+import copy
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+import metrics
+
+COALESCE_WAIT_SECONDS = float(os.getenv("COALESCE_WAIT_SECONDS", "90"))
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls by key within this process."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any], wait_timeout: float = COALESCE_WAIT_SECONDS) -> Tuple[Any, bool]:
+        """
+        Runs fn() for the first caller of `key` and shares its result with concurrent
+        callers of the same key. Returns (result, shared) where `shared` tells whether
+        the result came from another caller's run. Waiters receive a deep copy.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if leader:
+            try:
+                call.result = fn()
+                return call.result, False
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.done.set()
+
+        metrics.increment(f"single_flight.{self.name}.waits")
+        if call.done.wait(wait_timeout) and call.error is None:
+            metrics.increment(f"single_flight.{self.name}.shared")
+            logging.info(f"Coalesced {self.name} request onto in-flight call for key '{key[:80]}'.")
+            return copy.deepcopy(call.result), True
+
+        metrics.increment(f"single_flight.{self.name}.fallbacks")
+        logging.warning(f"In-flight {self.name} call for key '{key[:80]}' did not deliver in time, running it again.")
+        return fn(), False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """asyncio variant of SingleFlight for a single event loop."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]],
+                 wait_timeout: float = COALESCE_WAIT_SECONDS) -> Tuple[Any, bool]:
+        """Same contract as SingleFlight.do, with `fn` returning an awaitable."""
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = asyncio.get_running_loop().create_future()
+            try:
+                result = await fn()
+                call.set_result(result)
+                return result, False
+            except asyncio.CancelledError:
+                call.cancel()
+                raise
+            except BaseException as e:
+                call.set_exception(e)
+                call.exception() # Mark retrieved so unobserved failures are not logged
+                raise
+            finally:
+                self._calls.pop(key, None)
+
+        metrics.increment(f"single_flight.{self.name}.waits")
+        try:
+            result = await asyncio.wait_for(asyncio.shield(call), wait_timeout)
+            metrics.increment(f"single_flight.{self.name}.shared")
+            logging.info(f"Coalesced {self.name} request onto in-flight call for key '{key[:80]}'.")
+            return copy.deepcopy(result), True
+        except asyncio.CancelledError:
+            if not call.cancelled(): # We were cancelled ourselves, not the leader
+                raise
+        except Exception:
+            pass
+        metrics.increment(f"single_flight.{self.name}.fallbacks")
+        logging.warning(f"In-flight {self.name} call for key '{key[:80]}' did not deliver in time, running it again.")
+        return await fn(), False
+
+    def in_flight(self) -> int:
+        return len(self._calls)
@@ -144,6 +144,83 @@ class BackendTests(unittest.TestCase):
         except requests.exceptions.RequestException as e:
             self.fail(f"Request failed: {e}")
 
+    def test_06_analyze_text_stream(self):
+        """Test streaming text analysis (Server-Sent Events).
+        Expects 200 with an event stream ending in a 'result' or 'error' event if the token is valid,
+        401 Unauthorized if the token is invalid/missing.
+        """
+        print(f"\nTesting POST {self.text_analyze_url}?stream=1 (Streaming Text Analysis - Expect 200 or 401)")
+        payload = {
+            "url": SAMPLE_TEXT_URL,
+            "article_text": SAMPLE_TEXT_CONTENT
+        }
+        try:
+            response = requests.post(f"{self.text_analyze_url}?stream=1", headers=self.headers, json=payload, timeout=60, stream=True)
+            print(f"Status Code: {response.status_code}")
+            self.assertIn(response.status_code, [200, 401],
+                          f"Expected 200 or 401, but got {response.status_code}. Response: {response.text}")
+            if response.status_code == 200:
+                self.assertTrue(response.headers.get("Content-Type", "").startswith("text/event-stream"))
+                events = [line.split(":", 1)[1].strip() for line in response.iter_lines(decode_unicode=True)
+                          if line and line.startswith("event:")]
+                print("Events received:", events)
+                self.assertIn(events[-1], ["result", "error"], "Stream should end with a 'result' or 'error' event")
+            else:
+                self.assertIn("error", response.json(), "Error response should contain 'error' key")
+        except requests.exceptions.RequestException as e:
+            self.fail(f"Request failed: {e}")
+
+    def test_07_analyze_text_batch(self):
+        """Test batch text analysis.
+        Expects 200 with one result per item (duplicates share a result) if the token is valid,
+        401 Unauthorized if the token is invalid/missing.
+        """
+        batch_url = f"{TEXT_BACKEND_URL}/analyze_batch"
+        print(f"\nTesting POST {batch_url} (Batch Text Analysis - Expect 200 or 401)")
+        item = {"url": SAMPLE_TEXT_URL, "article_text": SAMPLE_TEXT_CONTENT}
+        payload = {"items": [item, item, {"url": SAMPLE_TEXT_URL}]}
+        try:
+            response = requests.post(batch_url, headers=self.headers, json=payload, timeout=90)
+            print(f"Status Code: {response.status_code}")
+            self.assertIn(response.status_code, [200, 401],
+                          f"Expected 200 or 401, but got {response.status_code}. Response: {response.text}")
+            response_data = response.json()
+            if response.status_code == 200:
+                results = response_data["results"]
+                self.assertEqual([entry["index"] for entry in results], [0, 1, 2])
+                self.assertEqual(results[0]["result"], results[1]["result"], "Duplicate items should share a result")
+                self.assertEqual(results[2]["status"], 400, "Item without article_text should be rejected")
+                self.assertEqual(response_data["summary"]["total"], 3)
+            else:
+                self.assertIn("error", response_data, "Error response should contain 'error' key")
+        except requests.exceptions.RequestException as e:
+            self.fail(f"Request failed: {e}")
+
+    def test_08_analyze_images_batch(self):
+        """Test batch image analysis.
+        Expects 200 with one result per URL (duplicates share a result) for a paid user,
+        401/403 if the token is invalid/missing or the user is not on the paid tier.
+        """
+        batch_url = f"{MEDIA_BACKEND_URL}/analyze_images"
+        print(f"\nTesting POST {batch_url} (Batch Image Analysis - Expect 200, 401, or 403)")
+        payload = {"media_urls": [SAMPLE_IMAGE_URL, SAMPLE_IMAGE_URL, "not-a-url"]}
+        try:
+            response = requests.post(batch_url, headers=self.headers, json=payload, timeout=90)
+            print(f"Status Code: {response.status_code}")
+            self.assertIn(response.status_code, [200, 401, 403],
+                          f"Expected 200, 401 or 403, but got {response.status_code}. Response: {response.text}")
+            response_data = response.json()
+            if response.status_code == 200:
+                results = response_data["results"]
+                self.assertEqual([entry["index"] for entry in results], [0, 1, 2])
+                self.assertEqual(results[0]["result"], results[1]["result"], "Duplicate URLs should share a result")
+                self.assertEqual(results[2]["status"], 400, "Invalid URL should be rejected")
+                self.assertEqual(response_data["summary"]["total"], 3)
+            else:
+                self.assertIn("error", response_data, "Error response should contain 'error' key")
+        except requests.exceptions.RequestException as e:
+            self.fail(f"Request failed: {e}")
+
 if __name__ == '__main__':
     print("Starting backend tests...")
     print(f"Text Backend URL: {TEXT_BACKEND_URL}")
@@ -0,0 +1,118 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+import check_media
+import check_text
+from auth_cache import user_cache
+
+TEXT_TOKEN = "unit-test-text-token"
+MEDIA_TOKEN = "unit-test-media-token"
+
+
+def items(count, text="Some article text."):
+    return [{"url": f"https://example.com/{i}", "article_text": text} for i in range(count)]
+
+
+class BatchPayloadTests(unittest.TestCase):
+    """Requests are authenticated from the token cache, so no call to Google is made."""
+
+    @classmethod
+    def setUpClass(cls):
+        user_cache.put(TEXT_TOKEN, {"id": 1, "tier": "free", "google_id": "g1", "email": None})
+        user_cache.put(MEDIA_TOKEN, {"id": 2, "tier": check_media.PAID_TIER, "google_id": "g2", "email": None})
+
+    def post(self, app, path, token, **kwargs):
+        return app.test_client().post(path, headers={"Authorization": f"Bearer {token}"}, **kwargs)
+
+    def test_analyze_batch_rejects_bad_payloads(self):
+        for body in ([{"url": "u", "article_text": "t"}], "items", 3, {"items": "x"}, {"items": []}, {}):
+            with self.subTest(body=body):
+                response = self.post(check_text.app, "/analyze_batch", TEXT_TOKEN, json=body)
+                self.assertEqual(response.status_code, 400)
+        too_many = {"items": items(check_text.BATCH_MAX_ITEMS + 1)}
+        self.assertEqual(self.post(check_text.app, "/analyze_batch", TEXT_TOKEN, json=too_many).status_code, 400)
+        not_json = self.post(check_text.app, "/analyze_batch", TEXT_TOKEN, data="items", content_type="text/plain")
+        self.assertEqual(not_json.status_code, 400)
+
+    def test_analyze_images_rejects_bad_payloads(self):
+        for body in (["https://example.com/a.png"], "media_urls", {"media_urls": "x"}, {"media_urls": []}):
+            with self.subTest(body=body):
+                response = self.post(check_media.app, "/analyze_images", MEDIA_TOKEN, json=body)
+                self.assertEqual(response.status_code, 400)
+
+    def test_missing_token_is_rejected(self):
+        response = check_text.app.test_client().post("/analyze_batch", json={"items": items(1)})
+        self.assertEqual(response.status_code, 401)
+
+
+class BatchSlotTests(unittest.TestCase):
+
+    def setUp(self):
+        patches = [
+            mock.patch.object(check_text, "get_cached_analysis_results", return_value={}),
+            mock.patch.object(check_text, "serve_cached_result", side_effect=lambda result: result),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.running = 0
+        self.max_running = 0
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def fake_analysis(self, url, article_text):
+        with self.lock:
+            self.calls.append(url)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.05)
+        with self.lock:
+            self.running -= 1
+        return {"textResult": {"label": "LABEL_0", "score": 0.9}}
+
+    def test_concurrency_is_capped_and_duplicates_run_once(self):
+        batch = items(10) + items(2) # The last two repeat the first two
+        with mock.patch.object(check_text, "analyze_article", side_effect=self.fake_analysis):
+            results = list(check_text.run_analysis_batch("user-a", batch))
+        self.assertEqual(sorted(entry["index"] for entry in results), list(range(12)))
+        self.assertTrue(all(entry["status"] == 200 for entry in results))
+        self.assertEqual(len(self.calls), 10)
+        self.assertLessEqual(self.max_running, check_text.BATCH_USER_CONCURRENCY)
+        time.sleep(0.05) # Done callbacks run on the executor threads
+        self.assertNotIn("user-a", check_text.user_batch_slots)
+
+    def test_invalid_items_get_400_entries(self):
+        batch = [{"url": "https://example.com/ok", "article_text": "text"}, {"url": "only url"}, "not an object"]
+        with mock.patch.object(check_text, "analyze_article", side_effect=self.fake_analysis):
+            results = sorted(check_text.run_analysis_batch("user-b", batch), key=lambda entry: entry["index"])
+        self.assertEqual([entry["status"] for entry in results], [200, 400, 400])
+
+    def test_busy_slots_time_out_with_429(self):
+        slots = check_text.checkout_user_batch_slots("user-c")
+        for _ in range(check_text.BATCH_USER_CONCURRENCY):
+            slots.acquire()
+        try:
+            with mock.patch.object(check_text, "BATCH_SLOT_WAIT_SECONDS", 0.05), \
+                 mock.patch.object(check_text, "analyze_article", side_effect=self.fake_analysis):
+                results = list(check_text.run_analysis_batch("user-c", items(3)))
+        finally:
+            for _ in range(check_text.BATCH_USER_CONCURRENCY):
+                slots.release()
+            check_text.return_user_batch_slots("user-c")
+        self.assertEqual([entry["status"] for entry in results], [429, 429, 429])
+        self.assertEqual(self.calls, [])
+        self.assertNotIn("user-c", check_text.user_batch_slots)
+
+    def test_abandoned_batch_releases_its_entry(self):
+        with mock.patch.object(check_text, "analyze_article", side_effect=self.fake_analysis):
+            entries = check_text.run_analysis_batch("user-d", items(8))
+            next(entries)
+            entries.close()
+            time.sleep(0.2) # Items already started finish on the executor
+        self.assertNotIn("user-d", check_text.user_batch_slots)
+
+
+if __name__ == "__main__":
+    unittest.main()
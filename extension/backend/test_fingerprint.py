@@ -0,0 +1,77 @@
+import random
+import unittest
+
+from fingerprint import HammingIndex, simhash, hamming_distance, to_signed64, from_signed64, SIMHASH_BITS
+
+ARTICLE = " ".join(f"word{i % 37} token{i % 11} item{i}" for i in range(120))
+
+
+def flip_bits(value: int, count: int, rng: random.Random) -> int:
+    for bit in rng.sample(range(SIMHASH_BITS), count):
+        value ^= 1 << bit
+    return value
+
+
+class HammingIndexTests(unittest.TestCase):
+
+    def test_band_widths_cover_all_bits_evenly(self):
+        for max_distance in range(0, 12):
+            index = HammingIndex(max_distance)
+            self.assertEqual(sum(index.band_widths), SIMHASH_BITS)
+            self.assertLessEqual(max(index.band_widths) - min(index.band_widths), 1)
+        self.assertEqual(HammingIndex(6).band_widths, [10, 9, 9, 9, 9, 9, 9])
+
+    def test_probe_at_max_distance_is_found(self):
+        rng = random.Random(7)
+        for max_distance in (0, 3, 6):
+            index = HammingIndex(max_distance)
+            for key in range(200):
+                index.add(key, rng.getrandbits(SIMHASH_BITS), payload=f"p{key}")
+            for key in range(0, 200, 10):
+                stored = index._entries[key][0]
+                match = index.nearest(flip_bits(stored, max_distance, rng))
+                self.assertIsNotNone(match)
+                self.assertLessEqual(match[2], max_distance)
+
+    def test_probe_beyond_max_distance_is_not_found(self):
+        index = HammingIndex(3)
+        index.add("a", 0)
+        self.assertIsNone(index.nearest((1 << 4) - 1))
+        self.assertEqual(index.nearest(0b111), ("a", None, 3))
+
+    def test_exclude_age_and_eviction(self):
+        index = HammingIndex(2, max_entries=2)
+        index.add("old", 0, added_at=0.0)
+        self.assertIsNone(index.nearest(0, max_age_seconds=60))
+        self.assertIsNone(index.nearest(0, exclude="old"))
+        index.add("b", 1 << 40)
+        index.add("c", 1 << 50)
+        self.assertEqual(len(index), 2)
+        self.assertNotEqual(index.nearest(0)[0], "old") # Evicted as the oldest entry
+        index.remove("b")
+        self.assertEqual(len(index), 1)
+
+
+class SimHashTests(unittest.TestCase):
+
+    def test_small_edit_stays_close(self):
+        edited = ARTICLE.replace("item57", "changed")
+        self.assertLessEqual(hamming_distance(simhash(ARTICLE), simhash(edited)), 6)
+
+    def test_unrelated_text_is_far(self):
+        other = " ".join(f"other{i % 13} thing{i}" for i in range(120))
+        self.assertGreater(hamming_distance(simhash(ARTICLE), simhash(other)), 6)
+
+    def test_case_and_punctuation_are_ignored(self):
+        self.assertEqual(simhash(ARTICLE), simhash(ARTICLE.upper().replace(" ", " , ")))
+
+    def test_signed64_round_trip(self):
+        for value in (0, 1, (1 << 63) - 1, 1 << 63, (1 << 64) - 1):
+            signed = to_signed64(value)
+            self.assertGreaterEqual(signed, -(1 << 63))
+            self.assertLess(signed, 1 << 63)
+            self.assertEqual(from_signed64(signed), value)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import struct
+import unittest
+
+from image_ingest import ImageIngestError, image_dimensions, sniff_mime_type, validate_public_url
+
+
+class ValidatePublicUrlTests(unittest.TestCase):
+
+    def assertBlocked(self, url, reason="blocked_url"):
+        with self.assertRaises(ImageIngestError) as raised:
+            validate_public_url(url)
+        self.assertEqual(raised.exception.reason, reason)
+
+    def test_private_and_reserved_addresses_are_blocked(self):
+        for url in (
+            "http://127.0.0.1/a.png",
+            "http://localhost:8080/a.png",
+            "http://10.1.2.3/a.png",
+            "http://172.16.0.1/a.png",
+            "http://192.168.1.1/a.png",
+            "http://169.254.169.254/computeMetadata/v1/",
+            "http://100.64.0.1/a.png",
+            "http://0.0.0.0/a.png",
+            "http://224.0.0.1/a.png",
+            "http://[::1]/a.png",
+            "http://[fe80::1]/a.png",
+            "http://[fc00::1]/a.png",
+            "http://[::ffff:127.0.0.1]/a.png",
+            "http://[::ffff:10.0.0.1]/a.png",
+        ):
+            with self.subTest(url=url):
+                self.assertBlocked(url)
+
+    def test_public_addresses_pass(self):
+        validate_public_url("https://8.8.8.8/a.png")
+        validate_public_url("http://[2001:4860:4860::8888]:8080/a.png")
+
+    def test_invalid_urls(self):
+        for url in ("ftp://8.8.8.8/a.png", "file:///etc/passwd", "http:///a.png", "not a url"):
+            with self.subTest(url=url):
+                self.assertBlocked(url, "invalid_url")
+
+
+class SniffTests(unittest.TestCase):
+
+    def test_mime_types_from_magic_bytes(self):
+        self.assertEqual(sniff_mime_type(b"\x89PNG\r\n\x1a\n" + b"\x00" * 24), "image/png")
+        self.assertEqual(sniff_mime_type(b"\xff\xd8\xff\xe0" + b"\x00" * 28), "image/jpeg")
+        self.assertEqual(sniff_mime_type(b"GIF89a" + b"\x00" * 26), "image/gif")
+        self.assertEqual(sniff_mime_type(b"RIFF\x00\x00\x00\x00WEBPVP8 " + b"\x00" * 16), "image/webp")
+        self.assertIsNone(sniff_mime_type(b"<!DOCTYPE html><html>"))
+
+    def test_png_dimensions_from_header(self):
+        header = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", 640, 480) + b"\x08\x02\x00\x00\x00"
+        self.assertEqual(image_dimensions(header, "image/png"), (640, 480))
+
+
+if __name__ == "__main__":
+    unittest.main()
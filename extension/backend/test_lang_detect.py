@@ -0,0 +1,33 @@
+import unittest
+
+from lang_detect import detect
+
+
+class LangDetectTests(unittest.TestCase):
+
+    def test_single_language_scripts(self):
+        self.assertEqual(detect("สวัสดีครับ วันนี้อากาศดีมาก และเราจะไปตลาดด้วยกัน")[0], "th")
+        self.assertEqual(detect("오늘은 날씨가 매우 좋습니다 그리고 우리는 시장에 갑니다")[0], "ko")
+
+    def test_japanese_beats_chinese_with_kana(self):
+        self.assertEqual(detect("今日はとても良い天気です。私たちは市場に行きます。")[0], "ja")
+        self.assertEqual(detect("今天天气很好，我们一起去市场买东西，然后回家做饭。")[0], "zh")
+
+    def test_latin_stopwords(self):
+        english = "The government said that the new policy will be introduced in the coming weeks and it is expected to help."
+        spanish = "El gobierno dijo que la nueva política se introducirá en las próximas semanas y que se espera que ayude."
+        language, confidence = detect(english)
+        self.assertEqual(language, "en")
+        self.assertGreater(confidence, 0.5)
+        self.assertEqual(detect(spanish)[0], "es")
+
+    def test_no_letters(self):
+        self.assertEqual(detect("1234 5678 !!!"), ("en", 0.0))
+        self.assertEqual(detect(""), ("en", 0.0))
+
+    def test_short_text_has_low_confidence(self):
+        self.assertLess(detect("Hola")[1], 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
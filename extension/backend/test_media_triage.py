@@ -0,0 +1,73 @@
+import os
+import unittest
+
+from media_triage import TRIAGE_LOGO_MAX_DIMENSION, read_digital_source_type, triage
+
+IPTC = "http://cv.iptc.org/newscodes/digitalsourcetype/"
+
+
+def xmp(source_type: str) -> bytes:
+    return (f'<x:xmpmeta xmlns:x="adobe:ns:meta/"><rdf:RDF><rdf:Description '
+            f'Iptc4xmpExt:DigitalSourceType="{IPTC}{source_type}"/></rdf:RDF></x:xmpmeta>').encode()
+
+
+class FlatThumbnail:
+    """Stands in for a decoded Pillow image with a single gray level."""
+
+    def __init__(self, size):
+        self.size = size
+
+    def convert(self, mode):
+        return self
+
+    def histogram(self):
+        return [self.size[0] * self.size[1]] + [0] * 255
+
+
+class MediaTriageTests(unittest.TestCase):
+
+    def test_digital_source_type_forms(self):
+        self.assertEqual(read_digital_source_type(b"\xff\xd8" + xmp("trainedAlgorithmicMedia")), "trainedAlgorithmicMedia")
+        element = (f"<x:xmpmeta><Iptc4xmpExt:DigitalSourceType>{IPTC}digitalCapture"
+                   f"</Iptc4xmpExt:DigitalSourceType></x:xmpmeta>").encode()
+        self.assertEqual(read_digital_source_type(element), "digitalCapture")
+        resource = f'<x:xmpmeta><Iptc4xmpExt:DigitalSourceType rdf:resource="{IPTC}compositeWithTrainedAlgorithmicMedia"/></x:xmpmeta>'.encode()
+        self.assertEqual(read_digital_source_type(resource), "compositeWithTrainedAlgorithmicMedia")
+
+    def test_markers_outside_xmp_are_ignored(self):
+        data = os.urandom(4096) + b"jumb c2pa trainedAlgorithmicMedia" + os.urandom(4096)
+        self.assertIsNone(read_digital_source_type(data))
+        self.assertEqual(triage(data, 800, 600).decision, "analyze")
+
+    def test_provenance_decisions(self):
+        payload = os.urandom(4096)
+        generated = triage(payload + xmp("trainedAlgorithmicMedia"), 800, 600)
+        self.assertEqual((generated.decision, generated.reason), ("provenance", "ai_generated_metadata"))
+        edited = triage(payload + xmp("compositeWithTrainedAlgorithmicMedia"), 800, 600)
+        self.assertEqual((edited.decision, edited.reason), ("provenance", "ai_edited_metadata"))
+        captured = triage(payload + xmp("digitalCapture"), 800, 600)
+        self.assertEqual(captured.decision, "analyze")
+
+    def test_size_and_shape_skips(self):
+        payload = os.urandom(4096)
+        self.assertEqual(triage(b"GIF89a", 1, 1).reason, "too_small")
+        self.assertEqual(triage(payload, 32, 32).reason, "too_small")
+        self.assertEqual(triage(payload, 2000, 100).reason, "extreme_aspect_ratio")
+
+    def test_low_entropy_skips_only_small_images(self):
+        payload = os.urandom(4096)
+        small = TRIAGE_LOGO_MAX_DIMENSION
+        self.assertEqual(triage(payload, small, small, FlatThumbnail((small, small))).reason, "low_entropy")
+        large = triage(payload, 1600, 1200, FlatThumbnail((1536, 1152)))
+        self.assertEqual(large.decision, "analyze") # Flat screenshots are still analyzed
+
+    def test_bytes_per_pixel_fallback_without_thumbnail(self):
+        self.assertEqual(triage(b"\x00" * 1100, 300, 300).reason, "low_entropy")
+        self.assertEqual(triage(os.urandom(60000), 250, 250).decision, "analyze")
+
+    def test_header_dimensions_fall_back_to_thumbnail(self):
+        self.assertEqual(triage(os.urandom(4096), None, None, FlatThumbnail((40, 40))).reason, "too_small")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import time
+import unittest
+
+from query_cache import MemoryLRUBackend, QueryCache, make_cache_key, normalize_query
+
+
+class QueryCacheTests(unittest.TestCase):
+
+    def test_normalized_queries_share_a_key(self):
+        self.assertEqual(normalize_query("  Hello,   WORLD!! "), "hello world")
+        self.assertEqual(make_cache_key("search", "Hello world"), make_cache_key("search", "hello, world"))
+        self.assertNotEqual(make_cache_key("search", "hello"), make_cache_key("fact_check", "hello"))
+
+    def test_falsy_values_are_hits(self):
+        cache = QueryCache(MemoryLRUBackend(max_entries=10))
+        self.assertEqual(cache.get("search", "q"), (False, None))
+        cache.set("search", "q", [], 60)
+        self.assertEqual(cache.get("search", "Q"), (True, []))
+
+    def test_zero_ttl_is_not_stored(self):
+        cache = QueryCache(MemoryLRUBackend(max_entries=10))
+        cache.set("search", "q", [1], 0)
+        self.assertEqual(cache.get("search", "q"), (False, None))
+
+    def test_expiry_and_lru_eviction(self):
+        backend = MemoryLRUBackend(max_entries=2)
+        backend.set("short", 1, 0.01)
+        time.sleep(0.02)
+        self.assertEqual(backend.get("short"), (False, None))
+
+        backend.set("a", 1, 60)
+        backend.set("b", 2, 60)
+        backend.get("a") # "b" is now least recently used
+        backend.set("c", 3, 60)
+        self.assertEqual(backend.get("b"), (False, None))
+        self.assertEqual(backend.get("a"), (True, 1))
+        self.assertEqual(backend.get("c"), (True, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import json
+import unittest
+
+from response_parsing import (
+    IMAGE_ANALYSIS_SCHEMA,
+    TEXT_RESULT_SCHEMA,
+    ResponseParseError,
+    parse_model_json,
+)
+
+
+def text_result(**fields):
+    return json.dumps({"textResult": {"label": "LABEL_0", "score": 0.9, **fields}})
+
+
+class ResponseParsingTests(unittest.TestCase):
+
+    def test_valid_response_gets_defaults(self):
+        result = parse_model_json(TEXT_RESULT_SCHEMA, text_result(), wrapper_key="textResult")["textResult"]
+        self.assertEqual(result["label"], "LABEL_0")
+        self.assertEqual(result["score"], 0.9)
+        self.assertEqual(result["sentiment"], {"label": "neutral", "score": 0.5})
+        self.assertEqual(result["fact_check"], [])
+
+    def test_code_fences_and_prose_are_skipped(self):
+        text = "Here you go:\n```json\n" + text_result() + "\n```\nThanks"
+        self.assertEqual(parse_model_json(TEXT_RESULT_SCHEMA, text, wrapper_key="textResult")["textResult"]["label"], "LABEL_0")
+
+    def test_bare_object_is_wrapped(self):
+        text = json.dumps({"label": "fake", "score": 0.8})
+        parsed = parse_model_json(TEXT_RESULT_SCHEMA, text, wrapper_key="textResult")
+        self.assertEqual(parsed["textResult"]["label"], "LABEL_1")
+
+    def test_coercions(self):
+        text = json.dumps({"textResult": {
+            "label": "Credible",
+            "score": "85%",
+            "sentiment": {"label": "mixed", "score": 70},
+            "bias": {"summary": ["a", "b"], "indicators": "Sensational Language"},
+            "highlights": "one highlight",
+            "fact_check": [{"source": "Google Search", "rating": 1}, "not an object"],
+            "extra": "kept",
+        }})
+        result = parse_model_json(TEXT_RESULT_SCHEMA, text, wrapper_key="textResult")["textResult"]
+        self.assertEqual(result["label"], "LABEL_0")
+        self.assertAlmostEqual(result["score"], 0.85)
+        self.assertEqual(result["sentiment"], {"label": "neutral", "score": 0.7})
+        self.assertEqual(result["bias"], {"summary": "a\nb", "indicators": ["Sensational Language"]})
+        self.assertEqual(result["highlights"], ["one highlight"])
+        self.assertEqual(len(result["fact_check"]), 1)
+        self.assertEqual(result["fact_check"][0]["rating"], "1")
+        self.assertEqual(result["extra"], "kept")
+
+    def test_scores_are_clamped(self):
+        for raw, expected in ((-0.2, 0.0), (1.5, 0.015), (250, 1.0), ("0.42", 0.42)):
+            parsed = parse_model_json(IMAGE_ANALYSIS_SCHEMA, json.dumps({"ai_generated_score": raw}))
+            self.assertAlmostEqual(parsed["ai_generated_score"], expected)
+        parsed = parse_model_json(IMAGE_ANALYSIS_SCHEMA, json.dumps({"ai_generated_score": True}))
+        self.assertEqual(parsed["ai_generated_score"], 0.0)
+
+    def test_defaults_are_not_shared(self):
+        first = parse_model_json(IMAGE_ANALYSIS_SCHEMA, "{}")
+        first["manipulation_indicators"].append("x")
+        self.assertEqual(parse_model_json(IMAGE_ANALYSIS_SCHEMA, "{}")["manipulation_indicators"], [])
+
+    def test_failures(self):
+        cases = {
+            "empty": "",
+            "no_json": "no object here",
+            "invalid_json": '{"textResult": {',
+            "missing_required": json.dumps({"textResult": {"label": "maybe", "score": 0.5}}),
+        }
+        for reason, text in cases.items():
+            with self.assertRaises(ResponseParseError) as raised:
+                parse_model_json(TEXT_RESULT_SCHEMA, text, wrapper_key="textResult")
+            self.assertEqual(raised.exception.reason, reason)
+
+
+if __name__ == "__main__":
+    unittest.main()
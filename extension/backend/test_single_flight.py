@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from single_flight import AsyncSingleFlight, SingleFlight
+
+
+class SingleFlightTests(unittest.TestCase):
+
+    def test_concurrent_callers_share_one_run(self):
+        flight = SingleFlight("test")
+        calls = []
+        started = threading.Event()
+
+        def work():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return {"value": 1}
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do("key", work)))
+        leader.start()
+        started.wait(1)
+        followers = [threading.Thread(target=lambda: results.append(flight.do("key", work))) for _ in range(3)]
+        for thread in followers:
+            thread.start()
+        for thread in [leader] + followers:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(shared for _, shared in results), [False, True, True, True])
+        owned = [result for result, shared in results if not shared][0]
+        self.assertTrue(all(result == owned and result is not owned for result, shared in results if shared))
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_followers_rerun_after_leader_error(self):
+        flight = SingleFlight("test")
+        started = threading.Event()
+        release = threading.Event()
+
+        def failing():
+            started.set()
+            release.wait(1)
+            raise RuntimeError("boom")
+
+        errors = []
+
+        def lead():
+            try:
+                flight.do("key", failing)
+            except RuntimeError as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=lead)
+        leader.start()
+        started.wait(1)
+        results = []
+        follower = threading.Thread(target=lambda: results.append(flight.do("key", lambda: "fresh")))
+        follower.start()
+        time.sleep(0.05)
+        release.set()
+        leader.join()
+        follower.join()
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(results, [("fresh", False)])
+
+    def test_wait_timeout_falls_back_to_own_run(self):
+        flight = SingleFlight("test")
+        started = threading.Event()
+        leader = threading.Thread(target=lambda: flight.do("key", lambda: (started.set(), time.sleep(0.3), "slow")[2]))
+        leader.start()
+        started.wait(1)
+        self.assertEqual(flight.do("key", lambda: "own", wait_timeout=0.01), ("own", False))
+        leader.join()
+
+
+class AsyncSingleFlightTests(unittest.TestCase):
+
+    def test_concurrent_callers_share_one_run(self):
+        flight = AsyncSingleFlight("test")
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return [1]
+
+        async def run():
+            return await asyncio.gather(*(flight.do("key", work) for _ in range(4)))
+
+        results = asyncio.run(run())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(shared for _, shared in results), [False, True, True, True])
+        self.assertEqual(flight.in_flight(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+from text_prep import (
+    CHARS_PER_TOKEN,
+    SENTENCE_MAX_CHARS,
+    chunk_sentence,
+    estimate_tokens,
+    prepare_article,
+    split_sentences,
+)
+
+HEADLINE = "Minister announces new water policy"
+CLAIM = "The ministry said 42% of households in Springfield lost water for 3 days in March 2024."
+FILLER = "People talked about it at length and many shared their views with friends and neighbours."
+
+
+class TextPrepTests(unittest.TestCase):
+
+    def test_short_article_is_kept_whole(self):
+        article = prepare_article(f"{HEADLINE}\n{CLAIM} {FILLER}")
+        self.assertFalse(article.truncated)
+        self.assertEqual(article.headline, HEADLINE)
+        self.assertIn(CLAIM, article.text)
+        self.assertEqual(article.claims, [CLAIM])
+
+    def test_long_article_stays_within_budget(self):
+        body = "\n".join(f"Paragraph {i}: {FILLER} {CLAIM}" for i in range(400))
+        article = prepare_article(f"{HEADLINE}\n{body}", token_budget=500)
+        self.assertTrue(article.truncated)
+        self.assertLessEqual(len(article.text), 500 * CHARS_PER_TOKEN)
+        self.assertTrue(article.text.startswith(HEADLINE))
+
+    def test_unpunctuated_text_stays_within_budget(self):
+        article = prepare_article("word " * 20000, token_budget=300)
+        self.assertLessEqual(estimate_tokens(article.text), 300)
+
+    def test_non_latin_sentences_split_and_fall_back_to_claims(self):
+        hindi = "।".join(["यह एक लंबा वाक्य है जिसमें कई शब्द हैं और कोई संख्या नहीं है"] * 6) + "।"
+        self.assertGreater(len(split_sentences(hindi)), 1)
+        chinese = "。".join(["这是一个很长的句子其中包含许多汉字但是没有空格也没有数字"] * 400) + "。"
+        article = prepare_article(chinese, token_budget=400)
+        self.assertLessEqual(estimate_tokens(article.text), 400)
+        self.assertTrue(article.claims)
+
+    def test_chunk_sentence(self):
+        self.assertEqual(chunk_sentence("short"), ["short"])
+        chunks = chunk_sentence("x" * (SENTENCE_MAX_CHARS * 2 + 5))
+        self.assertEqual(len(chunks), 3)
+        self.assertTrue(all(len(chunk) <= SENTENCE_MAX_CHARS for chunk in chunks))
+        spaced = chunk_sentence("word " * 200)
+        self.assertTrue(all(len(chunk) <= SENTENCE_MAX_CHARS for chunk in spaced))
+        self.assertNotIn("", spaced)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,192 @@
+"""
+Server-side preparation of article text before analysis.
+
+The extension sends whatever it scraped, including navigation, cookie banners
+and repeated blocks, and long articles go into the prompt unbounded.
+prepare_article() turns raw text into a PreparedArticle:
+- boilerplate lines (subscribe prompts, share links, copyright lines, ...) are dropped;
+- repeated paragraphs are kept once;
+- sentences end at . ! ? (before a capital or digit) and at । 。 ！ ？; over-long
+  or unpunctuated runs are cut into SENTENCE_MAX_CHARS chunks;
+- if the rest exceeds the token budget (ARTICLE_TOKEN_BUDGET, estimated at
+  ~4 characters per token), the headline and lead come first and the remaining
+  budget goes to the most claim-dense sentences, in article order; the result
+  never exceeds the budget;
+- the most claim-dense sentences are also picked as fact-check claims (the
+  first sentences if none score, e.g. for scripts without spaces), the
+  headline as the search query, and a boilerplate-free excerpt as the
+  language-detection sample.
+"""
+import os
+import re
+import math
+from typing import List, Tuple
+
+# --- Configuration ---
+ARTICLE_TOKEN_BUDGET = int(os.getenv("ARTICLE_TOKEN_BUDGET", "2000"))
+CHARS_PER_TOKEN = 4 # Rough estimate for English news text
+LEAD_SENTENCES = 2 # Always kept after the headline
+HEADLINE_MAX_CHARS = 200
+LANGUAGE_SAMPLE_CHARS = 4000 # lang_detect inspects the first few KB
+CLAIM_MIN_CHARS = 40
+CLAIM_MAX_CHARS = 500
+SENTENCE_MAX_CHARS = 300 # Longer "sentences" (unpunctuated text) are cut into chunks of this size
+
+BOILERPLATE_MAX_CHARS = 160 # Only short lines are considered boilerplate
+BOILERPLATE_PATTERN = re.compile(
+    r"^(advertisement|sponsored|share( this)?( article| story)?|read more|related( articles| stories)?|"
+    r"click here|sign up|log ?in|subscribe|follow us|image( source| caption)?|photo:|video:)\b|"
+    r"(newsletter|cookies?|all rights reserved|privacy policy|terms of (use|service)|"
+    r"©|copyright \d{4}|skip to (main )?content|accept (all )?cookies)",
+    re.IGNORECASE
+)
+# Latin-style terminators need a following capital or digit; Devanagari (।) and CJK (。！？) terminators always end a sentence
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.!?])[\"')\]]*\s+(?=[\"'(\[]?[A-Z0-9])|(?<=[।。！？])[\"')\]」』]*\s*")
+
+# Signals that a sentence makes a checkable assertion
+CLAIM_SIGNAL_PATTERNS = [
+    (re.compile(r"\d"), 1.0), # Numbers, dates, amounts
+    (re.compile(r"%|\bper ?cent\b|\b(million|billion|thousand)\b", re.IGNORECASE), 1.5),
+    (re.compile(r"\b(said|says|stated|announced|reported|claimed|claims|confirmed|denied|according to)\b", re.IGNORECASE), 1.5),
+    (re.compile(r"\b(is|are|was|were|has|have|will)\b", re.IGNORECASE), 0.5),
+    (re.compile(r"[\"“”]"), 0.5), # Quotations
+]
+PROPER_NOUN_PATTERN = re.compile(r"(?<!^)(?<![.!?]\s)\b[A-Z][a-z]+")
+
+
+class PreparedArticle:
+    """Result of prepare_article; `text` is what goes into the prompt."""
+
+    def __init__(self, text: str, headline: str, claims: List[str], language_sample: str,
+                 original_chars: int, truncated: bool):
+        self.text = text
+        self.headline = headline
+        self.search_query = headline
+        self.claims = claims
+        self.language_sample = language_sample
+        self.original_chars = original_chars
+        self.truncated = truncated
+
+    @property
+    def estimated_tokens(self) -> int:
+        return estimate_tokens(self.text)
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def split_paragraphs(article_text: str) -> List[str]:
+    return [" ".join(line.split()) for line in article_text.splitlines() if line.strip()]
+
+
+def is_boilerplate(paragraph: str) -> bool:
+    return len(paragraph) <= BOILERPLATE_MAX_CHARS and bool(BOILERPLATE_PATTERN.search(paragraph))
+
+
+def dedupe_paragraphs(paragraphs: List[str]) -> List[str]:
+    """Keeps the first occurrence of each paragraph, comparing case- and punctuation-insensitively."""
+    seen, unique = set(), []
+    for paragraph in paragraphs:
+        key = re.sub(r"\W+", " ", paragraph).strip().casefold()
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(paragraph)
+    return unique
+
+
+def chunk_sentence(sentence: str, max_chars: int = SENTENCE_MAX_CHARS) -> List[str]:
+    """Cuts an over-long sentence into chunks of at most max_chars, at spaces where there are any."""
+    if len(sentence) <= max_chars:
+        return [sentence]
+    chunks, current = [], ""
+    for word in sentence.split(" "):
+        while len(word) > max_chars: # Unspaced text (CJK, URLs)
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(word[:max_chars])
+            word = word[max_chars:]
+        if current and len(current) + 1 + len(word) > max_chars:
+            chunks.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def split_sentences(paragraph: str) -> List[str]:
+    return [
+        chunk
+        for sentence in SENTENCE_SPLIT_PATTERN.split(paragraph) if sentence.strip()
+        for chunk in chunk_sentence(sentence.strip())
+    ]
+
+
+def claim_density(sentence: str) -> float:
+    """Scores how much checkable assertion a sentence carries, per word (length-normalized)."""
+    words = len(sentence.split())
+    if words < 6:
+        return 0.0
+    signals = sum(weight * len(pattern.findall(sentence)) for pattern, weight in CLAIM_SIGNAL_PATTERNS)
+    signals += 0.75 * len(PROPER_NOUN_PATTERN.findall(sentence))
+    return signals / math.sqrt(words)
+
+
+def prepare_article(article_text: str, token_budget: int = ARTICLE_TOKEN_BUDGET, claim_limit: int = 3) -> PreparedArticle:
+    """Cleans, bounds and summarizes article text for analysis (see module docstring)."""
+    paragraphs = dedupe_paragraphs([p for p in split_paragraphs(article_text) if not is_boilerplate(p)])
+    if not paragraphs: # Everything looked like boilerplate; analyze the raw text instead
+        paragraphs = split_paragraphs(article_text)
+
+    headline = ""
+    if paragraphs and len(paragraphs[0]) <= HEADLINE_MAX_CHARS:
+        headline = paragraphs[0]
+    body = paragraphs[1:] if headline else paragraphs
+
+    # (paragraph index, sentence index, sentence) for every body sentence, in article order
+    sentences: List[Tuple[int, int, str]] = [
+        (p_index, s_index, sentence)
+        for p_index, paragraph in enumerate(body)
+        for s_index, sentence in enumerate(split_sentences(paragraph))
+    ]
+    densities = {(p, s): claim_density(sentence) for p, s, sentence in sentences}
+
+    full_text = "\n\n".join(paragraphs)
+    budget_chars = token_budget * CHARS_PER_TOKEN
+    truncated = len(full_text) > budget_chars
+    if truncated:
+        # The lead goes first, then the most claim-dense sentences, all within the budget
+        selected, used = set(), len(headline)
+        candidates = sentences[:LEAD_SENTENCES] + sorted(sentences[LEAD_SENTENCES:], key=lambda item: densities[item[:2]], reverse=True)
+        for p, s, sentence in candidates:
+            if used + len(sentence) + 2 > budget_chars: # +2 for the separator
+                continue
+            selected.add((p, s))
+            used += len(sentence) + 2
+        kept_paragraphs = {}
+        for p, s, sentence in sentences:
+            if (p, s) in selected:
+                kept_paragraphs.setdefault(p, []).append(sentence)
+        text = "\n\n".join(([headline] if headline else []) + [" ".join(kept) for kept in kept_paragraphs.values()])
+        text = text[:budget_chars] # Hard cap; the selection above already stays within it
+    else:
+        text = full_text
+
+    claims = [
+        sentence for p, s, sentence in sorted(sentences, key=lambda item: densities[item[:2]], reverse=True)
+        if CLAIM_MIN_CHARS <= len(sentence) <= CLAIM_MAX_CHARS and densities[(p, s)] > 0
+    ][:claim_limit]
+    if not claims: # Nothing scored (e.g. scripts without spaces): fall back to the first sentences
+        claims = [sentence for _, _, sentence in sentences if len(sentence) >= CLAIM_MIN_CHARS // 2][:claim_limit]
+
+    return PreparedArticle(
+        text=text,
+        headline=headline or (body[0][:HEADLINE_MAX_CHARS] if body else ""),
+        claims=claims,
+        language_sample=" ".join(body or paragraphs)[:LANGUAGE_SAMPLE_CHARS],
+        original_chars=len(article_text),
+        truncated=truncated,
+    )